@@ -63,6 +63,19 @@ else:
         HAS_ROCKETCEA = False
         CEA_Obj = None
 
+# Client du micro-service CEA (racine du dépôt), utilisé quand RocketCEA
+# n'est pas importable ici (remplace le sous-processus cea_bridge.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    from cea_client import get_client as get_cea_client, CEAError
+    HAS_CEA_CLIENT = True
+except ImportError as e:
+    print(f"⚠️ Client CEA non disponible: {e}")
+    HAS_CEA_CLIENT = False
+
+# Pression ambiante (bar) de l'isp_sl renvoyée par le service
+P_AMBIENT_SL = 1.01325
+
 
 # Essayer d'importer ezdxf, sinon on désactive l'export DXF
 try:
@@ -4244,54 +4257,46 @@ class RocketApp:
                     # use_fallback stays True
 
             if use_fallback:
-                # --- FALLBACK MODE (Bridge or Gaz Parfait) ---
-                bridge_success = False
+                # --- FALLBACK MODE (Service CEA or Gaz Parfait) ---
+                service_success = False
                 
-                # ... Rest of fallback logic ...
-                if os.path.exists("cea_bridge.py"):
+                # Micro-service CEA: pressures in bar (the service's unit), two
+                # points (eps at Pe, then that eps with throat transport)
+                if HAS_CEA_CLIENT:
                     try:
-                        import subprocess
-                        print("🚀 Tentative d'utilisation de cea_bridge.py...")
+                        client = get_cea_client()
+                        point = dict(fuel=str(fuel), oxidizer=str(ox), of_ratio=mr, pc=pc, pe=pe_des)
+                        eps = client.evaluate(**point)["eps_from_pe"]
+                        res = client.evaluate(expansion_ratio=eps, transport=True, **point)
                         
-                        cmd = ["py", "-3.10", "cea_bridge.py", 
-                               "--ox", str(ox), "--fuel", str(fuel), 
-                               "--pc", str(pc), "--pe", str(pe_des), 
-                               "--mr", str(mr), "--pamb", str(pamb)]
-                               
-                        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+                        cstar_mps = res["c_star"] * 0.3048
+                        isp_vac = res["isp_vac"]
+                        if abs(pamb - P_AMBIENT_SL) <= 0.01 * P_AMBIENT_SL:
+                            # Sea level: the service's Isp, flow separation included
+                            isp_amb = res["isp_sl"]
+                        else:
+                            # Same back-pressure correction, from the run's own chamber pressure (bar)
+                            isp_amb = isp_vac - res["c_star"] * (pamb / res["chamber"]["p"]) * eps / 32.174
                         
-                        if result.returncode == 0:
-                            data = json.loads(result.stdout)
-                            if data.get("status") == "success":
-                                res = data["results"]
-                                
-                                eps = res["eps"]
-                                cstar_mps = res["cstar_m_s"]
-                                isp_vac = res["isp_vac_s"]
-                                isp_amb = res["isp_amb_s"]
-                                
-                                tc_k = res["tc_k"]
-                                tt_k = res["tt_k"]
-                                te_k = res["te_k"]
-                                
-                                gamma = res["gamma"]
-                                molwt = res["mol_wt"]
-                                Cp_si = res["cp_si"]
-                                Mu_si = res["mu_si"]
-                                Pr = res["pr"]
-                                
-                                print("✅ Bridge CEA succès!")
-                                bridge_success = True
-                            else:
-                                print(f"❌ Erreur Bridge: {data.get('message')}")
+                        tc_k = res["chamber"]["t"]
+                        tt_k = res["throat"]["t"]
+                        te_k = res["exit"]["t"]
+                        
+                        gamma = res["chamber"]["gamma"]
+                        molwt = res["chamber"]["mw"]
+                        Cp_si = res["throat"]["cp"]
+                        Mu_si = res["throat"]["mu"]
+                        Pr = res["throat"]["pr"]
+                        
+                        if cstar_mps > 1:
+                            print("✅ Service CEA succès!")
+                            service_success = True
                         else:
-                             print(f"❌ Echec appel Bridge. Return code: {result.returncode}")
-                             print(f"Stderr: {result.stderr}")
-
+                            print("❌ Service CEA: C*=0")
                     except Exception as e:
-                        print(f"❌ Exception Bridge: {e}")
+                        print(f"❌ Exception service CEA: {e}")
 
-                if not bridge_success:
+                if not service_success:
                     # --- FALLBACK ULTIME (Gaz Parfait) ---
                     print("⚠️ Mode Fallback (Gaz Parfait)")
                     gamma = 1.2
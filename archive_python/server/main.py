@@ -49,27 +49,56 @@ def get_material_info(material_name: str):
     return mat
 
 # === CEA ENDPOINT ===
+# Evaluations go to the CEA micro-service through the shared client (one
+# keep-alive pool, batching and cache); RocketCEA in-process if it is down
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+BAR_TO_PSIA = 14.5038
+P_AMBIENT_SL_PSIA = 14.696
+
+def _calculate_cea_local(fuel, oxidizer, of_ratio, pc, expansion_ratio):
+    """Same values as the service (pc in bar), from an in-process CEA_Obj working in psia"""
+    from rocketcea.cea_obj import CEA_Obj
+    
+    cea = CEA_Obj(oxName=oxidizer, fuelName=fuel)
+    pc_psia = pc * BAR_TO_PSIA
+    
+    # Get performance at chamber conditions
+    isp_vac, cstar, tc = cea.get_IvacCstrTc(Pc=pc_psia, MR=of_ratio, eps=expansion_ratio)
+    # Sea-level Isp as the service computes it (back pressure, flow separation)
+    isp_sl, _ = cea.estimate_Ambient_Isp(Pc=pc_psia, MR=of_ratio, eps=expansion_ratio, Pamb=P_AMBIENT_SL_PSIA)
+    
+    # Get additional properties
+    mw, gamma = cea.get_Throat_MolWt_gamma(Pc=pc_psia, MR=of_ratio, eps=expansion_ratio)
+    return isp_vac, float(isp_sl), cstar, tc, gamma, mw
+
 @app.post("/api/cea/calculate")
 def calculate_cea(data: dict):
     """Run NASA CEA calculation"""
     try:
-        from rocketcea.cea_obj import CEA_Obj
-        
         fuel = data.get("fuel", "RP-1")
         oxidizer = data.get("oxidizer", "LOX")
         of_ratio = data.get("of_ratio", 2.5)
         pc = data.get("pc", 50.0)  # bar
         expansion_ratio = data.get("expansion_ratio", 40.0)
         
-        cea = CEA_Obj(oxName=oxidizer, fuelName=fuel)
-        
-        # Get performance at chamber conditions
-        isp_vac, cstar, tc = cea.get_IvacCstrTc(Pc=pc, MR=of_ratio, eps=expansion_ratio)
-        isp_sl = cea.get_Isp(Pc=pc, MR=of_ratio, eps=expansion_ratio)
+        try:
+            from cea_client import get_client, CEAUnavailable
+        except ImportError:
+            get_client, CEAUnavailable = None, None
         
-        # Get additional properties
-        gamma = cea.get_Throat_MolWt_gamma(Pc=pc, MR=of_ratio, eps=expansion_ratio)[1]
-        mw = cea.get_Throat_MolWt_gamma(Pc=pc, MR=of_ratio, eps=expansion_ratio)[0]
+        values = None
+        if get_client is not None:
+            try:
+                res = get_client().evaluate(fuel=fuel, oxidizer=oxidizer, of_ratio=of_ratio, pc=pc,
+                                            expansion_ratio=expansion_ratio)
+                values = (res["isp_vac"], res["isp_sl"], res["c_star"], res["t_chamber"],
+                          res["throat"]["gamma"], res["throat"]["mw"])
+            except CEAUnavailable as e:
+                print(f"[CEA] service unavailable ({e}), running RocketCEA in-process")
+        if values is None:
+            values = _calculate_cea_local(fuel, oxidizer, of_ratio, pc, expansion_ratio)
+        isp_vac, isp_sl, cstar, tc, gamma, mw = values
         
         return {
             "status": "success",
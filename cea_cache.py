@@ -0,0 +1,262 @@
+"""
+Cache persistant des résultats CEA
+Results of live CEA runs are stored in SQLite under quantized inputs:
+each input is snapped to a multiple of its step (CEA_CACHE_QUANT) and the
+point is computed at the snapped value, so every request falling in the
+same quantum gets the same answer whoever asked first.
+A bounded in-memory LRU sits in front of the database and is warm-loaded
+from its most recently used rows at startup. Rows are tagged with the
+RocketCEA version and RESULT_FORMAT; rows of another version are dropped
+when the cache opens.
+The database is opened in WAL mode so several processes can share it.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cea_engine import rocketcea_version
+
+
+CEA_CACHE_PATH = os.environ.get("CEA_CACHE_PATH", str(Path(__file__).parent / "data" / "cea_cache.sqlite"))
+CEA_CACHE_MAX_ENTRIES = int(os.environ.get("CEA_CACHE_MAX_ENTRIES", "500000"))
+CEA_CACHE_MEMORY = int(os.environ.get("CEA_CACHE_MEMORY", "20000"))
+
+# Quantization step per input ("pc=0.01,of_ratio=0.001,..."); 0 disables snapping
+DEFAULT_QUANT = {"pc": 0.01, "of_ratio": 0.001, "expansion_ratio": 0.01, "pe": 0.0001, "fac_cr": 0.01}
+QUANT_INPUTS = tuple(DEFAULT_QUANT)
+
+# Bumped when the stored results change meaning (2: pressures in bar, not psia)
+RESULT_FORMAT = 2
+
+# last_used updates of memory hits are written in groups
+TOUCH_FLUSH = 256
+# Fraction of the rows removed when the database is full
+EVICT_FRACTION = 0.1
+
+
+def parse_quant(spec: str) -> Dict[str, float]:
+    quant = dict(DEFAULT_QUANT)
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        try:
+            name, value = item.split("=")
+            if name.strip() not in quant:
+                raise ValueError(name)
+            quant[name.strip()] = float(value)
+        except ValueError:
+            print(f"[CEACache] ignoring quantization entry '{item}'")
+    return quant
+
+
+class CEACache:
+    """SQLite-backed result cache with an in-memory LRU front"""
+
+    def __init__(self, path: str = CEA_CACHE_PATH, max_entries: int = CEA_CACHE_MAX_ENTRIES,
+                 memory_entries: int = CEA_CACHE_MEMORY, quant: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.memory_entries = max(0, memory_entries)
+        self.quant = quant or parse_quant(os.environ.get("CEA_CACHE_QUANT", ""))
+        self.version = f"{rocketcea_version()}/r{RESULT_FORMAT}"
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self) -> "CEACache":
+        """Open the database and warm-load the memory front (service startup)"""
+        with self._lock:
+            if self._db is None:
+                self._db = self._open()
+                self._warm_load()
+        return self
+
+    # ------------------------------------------------------------------
+    # Database
+    # ------------------------------------------------------------------
+    def _open(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        except sqlite3.Error as e:
+            print(f"[CEACache] warning: cannot open {self.path} ({e}), using memory only")
+            self.path = ":memory:"
+            db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""CREATE TABLE IF NOT EXISTS results (
+                          key TEXT PRIMARY KEY,
+                          version TEXT NOT NULL,
+                          value TEXT NOT NULL,
+                          last_used REAL NOT NULL)""")
+        db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+        stale = db.execute("DELETE FROM results WHERE version != ?", (self.version,)).rowcount
+        db.commit()
+        if stale:
+            print(f"[CEACache] dropped {stale} results of another RocketCEA version")
+        return db
+
+    def _warm_load(self):
+        if not self.memory_entries:
+            return
+        rows = self._db.execute(
+            "SELECT key, value FROM results ORDER BY last_used DESC LIMIT ?", (self.memory_entries,)
+        ).fetchall()
+        # Oldest first so that the most recent end up at the MRU end
+        for key, value in reversed(rows):
+            self._memory[key] = json.loads(value)
+        if rows:
+            print(f"[CEACache] warm-loaded {len(rows)} results from {self.path}")
+
+    def _flush_touches(self):
+        if self._touched:
+            self._db.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                                 [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        drop = count - self.max_entries + int(self.max_entries * EVICT_FRACTION)
+        self._db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)", (drop,)
+        )
+        self.evictions += drop
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    def snap(self, name: str, value: float) -> float:
+        step = self.quant.get(name, 0.0)
+        if not step:
+            return value
+        # round() again so that 50.01 is not stored as 50.010000000000005
+        return round(round(value / step) * step, 12)
+
+    def quantize(self, oxidizer: str, fuel: str, fac_cr: float, pc: float, mr: float, eps: float,
+                 pe: float, transport: bool) -> Tuple[str, Dict[str, float]]:
+        """Cache key and the snapped inputs the point must be computed at"""
+        snapped = {
+            "pc": self.snap("pc", pc),
+            "of_ratio": self.snap("of_ratio", mr),
+            "expansion_ratio": self.snap("expansion_ratio", eps),
+            "pe": self.snap("pe", pe),
+            "fac_cr": self.snap("fac_cr", fac_cr) if fac_cr and fac_cr > 1.0 else 0.0,
+        }
+        key = json.dumps([oxidizer, fuel, int(bool(transport))] + [snapped[n] for n in QUANT_INPUTS])
+        return key, snapped
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+    def _remember(self, key: str, value: Dict):
+        if not self.memory_entries:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            missing = []
+            for key in keys:
+                value = self._memory.get(key)
+                if value is None:
+                    missing.append(key)
+                    continue
+                self._memory.move_to_end(key)
+                self._touched[key] = now
+                self.memory_hits += 1
+                found[key] = value
+            try:
+                for start in range(0, len(missing) if self._db else 0, 500):
+                    part = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(part))})", part
+                    ).fetchall()
+                    for key, value in rows:
+                        value = json.loads(value)
+                        found[key] = value
+                        self._touched[key] = now
+                        self._remember(key, value)
+                        self.disk_hits += 1
+                if self._db and len(self._touched) >= TOUCH_FLUSH:
+                    self._flush_touches()
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[CEACache] warning: read failed: {e}")
+            self.misses += len([k for k in missing if k not in found])
+        return found
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: List[Tuple[str, Dict]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._db is None:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO results (key, version, value, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, self.version, json.dumps(value), now) for key, value in items]
+                )
+                self._flush_touches()
+                self._evict()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[CEACache] warning: write failed: {e}")
+
+    def put(self, key: str, value: Dict):
+        self.put_many([(key, value)])
+
+    def close(self):
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                self._flush_touches()
+                self._db.commit()
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            try:
+                entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] if self._db else None
+            except sqlite3.Error:
+                entries = None
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "path": self.path,
+                "rocketcea_version": self.version,
+                "quantization": self.quant,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
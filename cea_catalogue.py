@@ -0,0 +1,108 @@
+"""
+Catalogue des ergols du micro-service CEA
+Built once at startup from rocketcea.blends plus the extra CEA names, with
+a normalized name index for ?q= searches (prefix, substring, then fuzzy)
+and an ETag so that clients can revalidate with If-None-Match.
+"""
+import difflib
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional
+
+
+# Extended fuels not in blends but supported by CEA
+EXTRA_FUELS = [
+    "RP-1", "JP-4", "JP-5", "JP-10", "Jet-A", "Biodiesel",
+    "C6H6", "C7H8", "C8H18", "C10H22", "C12H26",
+    "B5H9", "B10H14", "Al", "Mg", "Li", "Be",
+    "PBAN", "AN", "HMX", "RDX", "Syntin", "ALICE",
+    "Aerozine-50", "Diborane", "Pentaborane", "Decaborane"
+]
+
+# Extended oxidizers not in blends but supported by CEA
+EXTRA_OXIDIZERS = [
+    "FLOX70", "FLOX80", "MON-1", "MON-10", "NTO",
+    "RFNA", "WFNA", "Ozone", "O3", "Oxygen", "Fluorine",
+    "AK-20", "AK-27"
+]
+
+FUZZY_CUTOFF = 0.6
+MAX_FUZZY = 10
+
+
+def normalize(name: str) -> str:
+    """Case, dashes and spaces do not matter in searches (rp1 finds RP-1)"""
+    return re.sub(r"[\s_\-]", "", name).lower()
+
+
+def _entries(cards: dict, extras: List[str], kind: str) -> List[Dict]:
+    entries = []
+    for name in set(cards.keys()) | set(extras):
+        try:
+            card = cards.get(name, "")
+            entries.append({
+                "name": name,
+                "type": kind,
+                "card": str(card)[:200] if card else "",
+                "source": "blends" if name in cards else "cea_standard"
+            })
+        except Exception:
+            entries.append({"name": name, "type": kind, "card": "", "source": "cea_standard"})
+    return sorted(entries, key=lambda x: x["name"])
+
+
+class Catalogue:
+    def __init__(self):
+        self.fuels: List[Dict] = []
+        self.oxidizers: List[Dict] = []
+        self.body = b""
+        self.etag = ""
+        self.error: Optional[str] = None
+        self._index: Dict[str, List[Dict]] = {}
+
+    def build(self) -> "Catalogue":
+        try:
+            from rocketcea.blends import fuelCards, oxCards
+            self.fuels = _entries(fuelCards, EXTRA_FUELS, "fuel")
+            self.oxidizers = _entries(oxCards, EXTRA_OXIDIZERS, "oxidizer")
+            self.error = None
+        except Exception as e:
+            self.fuels, self.oxidizers, self.error = [], [], str(e)
+
+        # Several entries may share a normalized name (e.g. "MON-1" / "MON1")
+        self._index = {}
+        for entry in self.fuels + self.oxidizers:
+            self._index.setdefault(normalize(entry["name"]), []).append(entry)
+
+        self.body = json.dumps(self.payload(self.fuels, self.oxidizers)).encode()
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"'
+        return self
+
+    def payload(self, fuels: List[Dict], oxidizers: List[Dict]) -> Dict:
+        if self.error:
+            return {"error": self.error, "fuels": [], "oxidizers": []}
+        return {
+            "fuels": fuels,
+            "oxidizers": oxidizers,
+            "fuel_count": len(fuels),
+            "ox_count": len(oxidizers)
+        }
+
+    def search(self, query: str) -> Dict:
+        """Prefix matches first, then substrings, then close spellings"""
+        q = normalize(query)
+        keys = sorted(self._index)
+        prefix = [k for k in keys if k.startswith(q)]
+        substring = [k for k in keys if q in k and not k.startswith(q)]
+        fuzzy = [k for k in difflib.get_close_matches(q, keys, n=MAX_FUZZY, cutoff=FUZZY_CUTOFF)
+                 if q not in k]
+        matches = [entry for k in prefix + substring + fuzzy for entry in self._index[k]]
+        out = self.payload([e for e in matches if e["type"] == "fuel"],
+                           [e for e in matches if e["type"] == "oxidizer"])
+        out["query"] = query
+        return out
+
+    def search_etag(self, query: str) -> str:
+        """Results only change with the catalogue: derive the tag from both"""
+        return f'"{hashlib.sha1((self.etag + query).encode()).hexdigest()[:16]}"'
@@ -0,0 +1,267 @@
+"""
+Client Python du micro-service CEA
+Shared by the Python front-ends (legacy API server, desktop app) instead
+of building a CEA_Obj in-process or starting one cea_bridge.py
+interpreter per evaluation.
+
+- one httpx.AsyncClient per client: keep-alive connection pool
+- identical requests already in flight share one future
+- points arriving within CEA_CLIENT_WINDOW_MS go out as one /cea/batch
+- answers are kept in a local LRU (read-through)
+
+SyncCEAClient runs the async client on a background event loop for
+synchronous code; calls made from several threads share its batches.
+"""
+import asyncio
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+
+CEA_SERVICE_URL = os.environ.get("CEA_SERVICE_URL", "http://localhost:8002")
+CEA_CLIENT_WINDOW_MS = float(os.environ.get("CEA_CLIENT_WINDOW_MS", "2"))
+CEA_CLIENT_MAX_BATCH = int(os.environ.get("CEA_CLIENT_MAX_BATCH", "512"))
+CEA_CLIENT_CACHE = int(os.environ.get("CEA_CLIENT_CACHE", "4096"))
+CEA_CLIENT_TIMEOUT = float(os.environ.get("CEA_CLIENT_TIMEOUT", "60"))
+CEA_CLIENT_CONNECTIONS = int(os.environ.get("CEA_CLIENT_CONNECTIONS", "8"))
+# Retries of a request refused with 503 (all service workers busy)
+BUSY_RETRIES = 3
+
+POINT_FIELDS = ("fuel", "oxidizer", "of_ratio", "pc", "expansion_ratio", "pe", "fac_cr")
+RESULT_FIELDS = ("isp_vac", "isp_sl", "c_star", "t_chamber", "gamma", "mw", "eps_from_pe",
+                 "expansion_state", "source", "error_bound")
+STATIONS = ("chamber", "throat", "exit")
+
+
+class CEAError(Exception):
+    """The service answered with an error for this point"""
+
+
+class CEAUnavailable(CEAError):
+    """The service could not be reached"""
+
+
+class CEAClient:
+    def __init__(self, base_url: str = CEA_SERVICE_URL, window_ms: float = CEA_CLIENT_WINDOW_MS,
+                 max_batch: int = CEA_CLIENT_MAX_BATCH, cache_size: int = CEA_CLIENT_CACHE,
+                 timeout: float = CEA_CLIENT_TIMEOUT, max_connections: int = CEA_CLIENT_CONNECTIONS):
+        self.base_url = base_url
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._http: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # Pending points per transport flag (a batch has a single flag)
+        self._pending: Dict[bool, list] = {False: [], True: []}
+        self._timers: Dict[bool, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks: hold the batches in flight
+        self._sending: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.points_sent = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                response = await self._client().request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                raise CEAUnavailable(f"CEA service unreachable at {self.base_url}: {e}")
+            if response.status_code == 503 and attempt < BUSY_RETRIES:
+                await asyncio.sleep(float(response.headers.get("retry-after", 0.5 * 2 ** attempt)))
+                continue
+            if response.status_code >= 400:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except ValueError:
+                    detail = response.text
+                raise CEAError(f"{path} failed ({response.status_code}): {detail}")
+            return response
+        raise CEAError(f"{path}: CEA service busy")
+
+    async def post(self, path: str, body: Dict) -> Dict:
+        """Any other POST endpoint (/cea/optimize, /cea/profile...), over the same pool"""
+        return (await self._request("POST", path, json=body)).json()
+
+    async def propellants(self, q: Optional[str] = None) -> Dict:
+        return (await self._request("GET", "/propellants", params={"q": q} if q else None)).json()
+
+    # ------------------------------------------------------------------
+    # Points
+    # ------------------------------------------------------------------
+    async def evaluate(self, fuel: str = "RP-1", oxidizer: str = "LOX", of_ratio: float = 2.5,
+                       pc: float = 50.0, expansion_ratio: float = 40.0, pe: float = 1.013,
+                       fac_cr: float = 0.0, transport: bool = False) -> Dict:
+        """One /cea point (same fields and answer as the endpoint)"""
+        point = {"fuel": fuel, "oxidizer": oxidizer, "of_ratio": float(of_ratio), "pc": float(pc),
+                 "expansion_ratio": float(expansion_ratio), "pe": float(pe), "fac_cr": float(fac_cr)}
+        key = tuple(point[f] for f in POINT_FIELDS) + (bool(transport),)
+        self.requests += 1
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return copy.deepcopy(cached)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._enqueue(bool(transport), key, point, future)
+        # shield: a cancelled caller must not cancel the answer of the others
+        return copy.deepcopy(await asyncio.shield(future))
+
+    async def evaluate_many(self, points: List[Dict]) -> List:
+        """Several points at once; failed points come back as CEAError instances"""
+        return await asyncio.gather(*(self.evaluate(**p) for p in points), return_exceptions=True)
+
+    def _enqueue(self, transport: bool, key: tuple, point: Dict, future: asyncio.Future):
+        pending = self._pending[transport]
+        pending.append((key, point, future))
+        if len(pending) >= self.max_batch:
+            self._flush(transport)
+        elif transport not in self._timers:
+            self._timers[transport] = asyncio.get_running_loop().call_later(self.window, self._flush, transport)
+
+    def _flush(self, transport: bool):
+        timer = self._timers.pop(transport, None)
+        if timer is not None:
+            timer.cancel()
+        batch, self._pending[transport] = self._pending[transport], []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch, transport))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list, transport: bool):
+        self.batches += 1
+        self.points_sent += len(batch)
+        try:
+            if len(batch) == 1:
+                results = [await self.post("/cea", dict(batch[0][1], transport=transport))]
+            else:
+                body = {f: [point[f] for _, point, _ in batch] for f in POINT_FIELDS}
+                body["transport"] = transport
+                results = self._rows(await self.post("/cea/batch", body))
+            for (key, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    self._remember(key, result)
+                    future.set_result(result)
+        except Exception as e:
+            error = e if isinstance(e, CEAError) else CEAError(str(e))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            for key, _, _ in batch:
+                self._inflight.pop(key, None)
+
+    @staticmethod
+    def _rows(response: Dict) -> list:
+        """Columnar /cea/batch answer -> one /cea-like dict (or CEAError) per point"""
+        rows = []
+        for i in range(response["count"]):
+            if response["error_code"][i]:
+                rows.append(CEAError(response["error"][i] or f"error code {response['error_code'][i]}"))
+                continue
+            row = {f: response[f][i] for f in RESULT_FIELDS if f in response}
+            for station in STATIONS:
+                if station in response:
+                    row[station] = {f: values[i] for f, values in response[station].items()}
+            rows.append(row)
+        return rows
+
+    def _remember(self, key: tuple, result: Dict):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "points_sent": self.points_sent,
+            "cache_entries": len(self._cache),
+        }
+
+
+class SyncCEAClient:
+    """Blocking facade: the async client runs on its own event loop thread"""
+
+    def __init__(self, **kwargs):
+        self._client = CEAClient(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="cea-client", daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=self._client.timeout * 2)
+
+    def evaluate(self, **point) -> Dict:
+        return self._run(self._client.evaluate(**point))
+
+    def evaluate_many(self, points: List[Dict]) -> List:
+        return self._run(self._client.evaluate_many(points))
+
+    def post(self, path: str, body: Dict) -> Dict:
+        return self._run(self._client.post(path, body))
+
+    def propellants(self, q: Optional[str] = None) -> Dict:
+        return self._run(self._client.propellants(q))
+
+    def stats(self) -> Dict:
+        return self._client.stats()
+
+    def close(self):
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_default: Optional[SyncCEAClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> SyncCEAClient:
+    """Process-wide blocking client (one connection pool, one cache)"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SyncCEAClient()
+        return _default
@@ -0,0 +1,437 @@
+"""
+Pool de CEA_Obj réutilisés pour le micro-service CEA
+Objects are kept in a bounded LRU keyed by (oxidizer, fuel, fac_CR).
+Each entry has its own lock (a CEA_Obj caches its last call), and every
+call into the Fortran core also holds CORE_LOCK: its common blocks are
+process-global, so two different objects must not run at the same time.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from rocketcea.cea_obj import CEA_Obj, py_cea
+from rocketcea.separated_Cf import sepNozzleCf
+
+
+CEA_POOL_SIZE = int(os.environ.get("CEA_POOL_SIZE", "64"))
+
+# Unit of every pressure the service takes and returns. RocketCEA defaults
+# to psia, so each setupCards call passes it explicitly
+PC_UNITS = "bar"
+# Sea-level ambient pressure, in PC_UNITS
+P_AMBIENT_SL = 1.01325
+G0_FT = 32.174  # ft/s², Cstar is in ft/s
+
+# CEA printout units ('calories' output) to SI
+CAL_TO_J = 4184.0          # cal/(g.K) -> J/(kg.K)
+MILLIPOISE_TO_PAS = 1e-4   # millipoise -> Pa.s
+MCAL_TO_W = 0.4184         # mcal/(cm.s.K) -> W/(m.K)
+
+# The Fortran core is not re-entrant
+CORE_LOCK = threading.Lock()
+
+
+def rocketcea_version() -> str:
+    """Installed RocketCEA version, the tag of cached results and tables"""
+    import rocketcea
+    return getattr(rocketcea, "__version__", "unknown")
+
+
+def pool_key(oxidizer: str, fuel: str, fac_cr: Optional[float] = None) -> Tuple:
+    """fac_CR <= 1 means infinite-area combustor, same object as no fac_CR"""
+    return (oxidizer, fuel, float(fac_cr) if fac_cr and fac_cr > 1.0 else None)
+
+
+class PooledCEA:
+    def __init__(self, obj: CEA_Obj):
+        self.obj = obj
+        self.lock = threading.Lock()
+        self.uses = 0
+
+
+class CEAPool:
+    """Bounded LRU of initialized CEA_Obj"""
+
+    def __init__(self, max_size: int = CEA_POOL_SIZE):
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[Tuple, PooledCEA]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry(self, key: Tuple) -> PooledCEA:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            oxidizer, fuel, fac_cr = key
+            if fac_cr:
+                obj = CEA_Obj(oxName=oxidizer, fuelName=fuel, fac_CR=fac_cr)
+            else:
+                obj = CEA_Obj(oxName=oxidizer, fuelName=fuel)
+            entry = PooledCEA(obj)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                # An evicted object still in use stays valid for its holder
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    @contextmanager
+    def acquire(self, oxidizer: str, fuel: str, fac_cr: Optional[float] = None):
+        """Exclusive use of the pooled object for a propellant pair"""
+        entry = self._entry(pool_key(oxidizer, fuel, fac_cr))
+        with entry.lock, CORE_LOCK:
+            entry.uses += 1
+            yield entry.obj
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": [
+                    {"oxidizer": k[0], "fuel": k[1], "fac_cr": k[2], "uses": e.uses}
+                    for k, e in reversed(self._entries.items())
+                ]
+            }
+
+
+# ----------------------------------------------------------------------
+# Single-pass evaluation
+# ----------------------------------------------------------------------
+def _station(i: int, transport: bool) -> Dict:
+    """State of one CEA station, read from the Fortran common blocks"""
+    totn = py_cea.prtout.totn[i]
+    state = {
+        "t": float(py_cea.prtout.ttt[i]),                    # K
+        "p": float(py_cea.prtout.ppp[i]),                    # bar
+        "mw": float(1.0 / totn) if totn else float(py_cea.prtout.wm[i]),
+        "gamma": float(py_cea.prtout.gammas[i]),
+        "mach": float(py_cea.rockt.vmoc[i]),
+        "area_ratio": float(py_cea.rockt.aeat[i]),
+    }
+    if transport:
+        state.update(
+            cp=float(py_cea.trpts.cpeql[i]) * CAL_TO_J,      # J/(kg.K), equilibrium
+            mu=float(py_cea.trpts.vis[i]) * MILLIPOISE_TO_PAS,
+            k=float(py_cea.trpts.coneql[i]) * MCAL_TO_W,
+            pr=float(py_cea.trpts.preql[i]),
+        )
+    return state
+
+
+def back_pressure_isp(isp_vac, c_star, eps, p_chamber, p_ambient=P_AMBIENT_SL):
+    """
+    Isp at p_ambient of an attached nozzle flow (RocketCEA's back-pressure
+    correction). p_chamber: combustion-end pressure of the run; both in PC_UNITS
+    """
+    return isp_vac - c_star * (p_ambient / p_chamber) * eps / G0_FT
+
+
+def separation_pressure(p_chamber, p_ambient=P_AMBIENT_SL):
+    """Wall pressure at which the flow separates (Kalt & Badal, as RocketCEA), in PC_UNITS"""
+    return 2.0 / 3.0 * (p_chamber / p_ambient) ** -0.2 * p_ambient
+
+
+def ambient_isp(cea: CEA_Obj, pc: float, mr: float, result: Dict, p_ambient: float = P_AMBIENT_SL) -> Tuple[float, str]:
+    """
+    (Isp at p_ambient, expansion state) of an evaluate() result, as
+    RocketCEA's estimate_Ambient_Isp. A separated flow takes one more CEA
+    run (vacuum Isp at the separation area ratio), which overwrites the
+    common blocks: call after every station has been read.
+    """
+    p_chamber, p_exit = result["chamber"]["p"], result["exit"]["p"]
+    eps = result["exit"]["area_ratio"]
+    if p_exit >= separation_pressure(p_chamber, p_ambient):
+        state = "underexpanded" if p_exit >= p_ambient else "overexpanded"
+        return back_pressure_isp(result["isp_vac"], result["c_star"], eps, p_chamber, p_ambient), state
+    cf_ratio_sep, _, _, _, _, cf_vac, eps_sep, _ = sepNozzleCf(result["throat"]["gamma"], eps, p_chamber, p_ambient)
+    cea.setupCards(Pc=pc, MR=mr, eps=eps_sep, pc_units=PC_UNITS)
+    isp_vac_sep = float(py_cea.rockt.vaci[cea.i_exit])
+    cf_ambient = cf_vac * isp_vac_sep / result["isp_vac"] * cf_ratio_sep
+    return cf_ambient * result["c_star"] / G0_FT, "separated"
+
+
+def eps_at_pc_over_pe(cea: CEA_Obj, pc: float, mr: float, pc_over_pe: float) -> float:
+    """Area ratio of the Pc/Pe exit, get_eps_at_PcOvPe with pc in PC_UNITS"""
+    cea.setupCards(Pc=pc, MR=mr, PcOvPe=pc_over_pe, pc_units=PC_UNITS)
+    return float(py_cea.rockt.aeat[cea.i_exit])
+
+
+def evaluate(cea: CEA_Obj, pc: float, mr: float, eps: Optional[float], pc_over_pe: Optional[float] = None,
+             transport: bool = False) -> Dict:
+    """
+    Run CEA once for (Pc, MR, eps) plus the Pc/Pe exit station and return
+    every quantity of the /cea response (pc in bar, PC_UNITS), with a second
+    run when the flow separates at sea level. Call with the pool lock held.
+    Stations after the run: [injector face (fac only)], chamber, throat,
+    Pc/Pe exit, eps exit.
+    eps=None expands to Pc/Pe (ideally expanded nozzle): the exit is the
+    Pc/Pe station and eps is read from it.
+    Transport properties make RocketCEA re-read its data files on every
+    run (~7x slower), so they are only computed on request.
+    """
+    use_pcope = pc_over_pe is not None and pc_over_pe > 1.0
+    if eps is None and not use_pcope:
+        raise ValueError("eps=None needs a Pc/Pe ratio > 1")
+    cea.setupCards(Pc=pc, MR=mr, eps=eps, PcOvPe=pc_over_pe if use_pcope else None,
+                   show_transport=1 if transport else 0, pc_units=PC_UNITS)
+    i_chm, i_thrt = cea.i_chm, cea.i_thrt
+    i_exit = i_thrt + (2 if use_pcope and eps is not None else 1)
+    if eps is None:
+        eps = float(py_cea.rockt.aeat[i_exit])
+    elif use_pcope and abs(py_cea.rockt.aeat[i_exit] - eps) > 1e-6 * eps:
+        # Pc/Pe did not land between throat and exit (e.g. subsonic ratio):
+        # fall back to the eps-only run and the separate Pc/Pe lookup
+        result = evaluate(cea, pc, mr, eps, transport=transport)
+        try:
+            result["eps_from_pe"] = eps_at_pc_over_pe(cea, pc, mr, pc_over_pe)
+        except Exception:
+            pass
+        return result
+
+    isp_vac = float(py_cea.rockt.vaci[i_exit])
+    cstar = float(py_cea.rockt.cstr)
+    chamber, throat, exit_ = (_station(i, transport) for i in (i_chm, i_thrt, i_exit))
+
+    result = {
+        "isp_vac": isp_vac,
+        "isp_sl": 0.0,
+        "c_star": cstar,
+        "t_chamber": chamber["t"] * 1.8,  # Rankine, as get_IvacCstrTc
+        "gamma": throat["gamma"],
+        "mw": throat["mw"],
+        "eps_from_pe": float(py_cea.rockt.aeat[i_thrt + 1]) if use_pcope else eps,
+        "p_exit": exit_["p"],
+        "expansion_state": None,
+        "chamber": chamber,
+        "throat": throat,
+        "exit": exit_,
+    }
+    # Sea-level Isp from the pressures of the run itself (bar), not the requested pc;
+    # left at 0 like isp_vac when CEA found no solution
+    if isp_vac > 0:
+        result["isp_sl"], result["expansion_state"] = ambient_isp(cea, pc, mr, result)
+    return result
+
+
+# CEA keeps 8 station columns (later ones wrap around and overwrite them):
+# chamber, throat and at most 6 area-ratio stations per run (5 with fac)
+CEA_COLUMNS = 8
+
+
+def evaluate_profile(cea: CEA_Obj, pc: float, mr: float, subsonic: list, supersonic: list,
+                     transport: bool = True) -> Dict:
+    """
+    States at the given subsonic and supersonic area ratios, in as few CEA
+    runs as the column limit allows. Call with the pool lock held.
+    Returns chamber, throat and one station dict per requested ratio.
+    """
+    stations = [("subsonic", i, a) for i, a in enumerate(subsonic)] + \
+               [("supersonic", i, a) for i, a in enumerate(supersonic)]
+    out = {"subsonic": [None] * len(subsonic), "supersonic": [None] * len(supersonic), "runs": 0}
+    if not stations:
+        # Chamber and throat only
+        cea.setupCards(Pc=pc, MR=mr, eps=None, show_transport=1 if transport else 0, pc_units=PC_UNITS)
+        out["runs"] = 1
+        out["chamber"] = _station(cea.i_chm, transport)
+        out["throat"] = _station(cea.i_thrt, transport)
+        return out
+
+    per_run = CEA_COLUMNS - (2 if cea.fac_CR is None else 3)
+    for start in range(0, len(stations), per_run):
+        part = stations[start:start + per_run]
+        sub = [a for branch, _, a in part if branch == "subsonic"]
+        sup = [a for branch, _, a in part if branch == "supersonic"]
+        cea.setupCards(Pc=pc, MR=mr, eps=sup or None, subar=sub or None, show_transport=1 if transport else 0,
+                       pc_units=PC_UNITS)
+        out["runs"] += 1
+        if start == 0:
+            out["chamber"] = _station(cea.i_chm, transport)
+            out["throat"] = _station(cea.i_thrt, transport)
+        # Columns after the throat: subsonic ratios first, then supersonic, in input order
+        for k, (branch, index, area) in enumerate(sorted(part, key=lambda s: s[0] != "subsonic")):
+            column = cea.i_thrt + 1 + k
+            if abs(py_cea.rockt.aeat[column] - area) > 1e-4 * area:
+                raise RuntimeError(f"CEA station order mismatch at area ratio {area}")
+            out[branch][index] = _station(column, transport)
+    return out
+
+
+# ----------------------------------------------------------------------
+# Optimization
+# ----------------------------------------------------------------------
+# Ratios of the coarse grid bracketing the Isp peak
+OPT_COARSE_POINTS = 9
+OPT_MAX_ITER = 60
+GOLDEN = 0.3819660112501051  # (3 - sqrt(5)) / 2
+
+
+def _brent_min(f, a: float, b: float, x: float, fx: float, tol: float) -> Tuple[float, float]:
+    """Brent's method on [a, b] starting from x: parabolic steps, golden section when they misbehave"""
+    w = v = x
+    fw = fv = fx
+    d = e = 0.0
+    for _ in range(OPT_MAX_ITER):
+        xm = 0.5 * (a + b)
+        if abs(x - xm) <= 2 * tol - 0.5 * (b - a):
+            break
+        if abs(e) > tol:
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            e_prev, e = e, d
+            if abs(p) >= abs(0.5 * q * e_prev) or p <= q * (a - x) or p >= q * (b - x):
+                e = (a - x) if x >= xm else (b - x)
+                d = GOLDEN * e
+            else:
+                d = p / q
+                if (x + d) - a < 2 * tol or b - (x + d) < 2 * tol:
+                    d = tol if xm >= x else -tol
+        else:
+            e = (a - x) if x >= xm else (b - x)
+            d = GOLDEN * e
+        u = x + d if abs(d) >= tol else x + (tol if d >= 0 else -tol)
+        fu = f(u)
+        if fu <= fx:
+            if u >= x:
+                a = x
+            else:
+                b = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    return x, fx
+
+
+def optimize_mixture(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float], pc: float,
+                     of_min: float, of_max: float, eps: float, p_ambient: Optional[float] = None,
+                     optimize_eps: bool = False, eps_max: Optional[float] = None,
+                     of_tol: float = 1e-3) -> Dict:
+    """
+    Mixture ratio maximizing Isp at chamber pressure pc: vacuum Isp at eps
+    (p_ambient=None), or Isp at p_ambient with either a fixed eps or the
+    ideal expansion pe = p_ambient (optimize_eps), which is the eps
+    maximizing ambient Isp, capped by eps_max.
+    A coarse grid brackets the peak, Brent's method refines it. Probes are
+    memoized; each one is a single CEA run, plus one when eps hits eps_max
+    and one per ambient Isp of a separated nozzle flow.
+    """
+    memo = {}
+    runs = 0
+
+    with pool.acquire(oxidizer, fuel, fac_cr) as cea:
+        def run(mr: float, exit_eps: Optional[float]) -> Dict:
+            nonlocal runs
+            runs += 1
+            return evaluate(cea, pc, mr, exit_eps, pc / p_ambient if exit_eps is None else None)
+
+        def isp(mr: float) -> float:
+            if mr in memo:
+                return memo[mr][0]
+            try:
+                if optimize_eps:
+                    result = run(mr, None)
+                    if eps_max and result["exit"]["area_ratio"] > eps_max:
+                        result = run(mr, eps_max)
+                else:
+                    result = run(mr, eps)
+            except Exception:
+                result = None
+            if result is None or not result["isp_vac"] > 0:
+                value = -math.inf
+            elif p_ambient is None:
+                value = result["isp_vac"]
+            else:
+                value = ambient_isp(cea, pc, mr, result, p_ambient)[0]
+            memo[mr] = (value, result)
+            return value
+
+        step = (of_max - of_min) / (OPT_COARSE_POINTS - 1)
+        grid = [of_min + i * step for i in range(OPT_COARSE_POINTS)]
+        values = [isp(mr) for mr in grid]
+        best = max(range(len(grid)), key=lambda i: values[i])
+        if values[best] == -math.inf:
+            raise ValueError(f"CEA returned no solution for O/F in [{of_min}, {of_max}]")
+        lo, hi = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+        mr, _ = _brent_min(lambda m: -isp(m), lo, hi, grid[best], -values[best], of_tol)
+
+    value, result = memo[mr]
+    return {
+        "of_ratio": mr,
+        "expansion_ratio": result["exit"]["area_ratio"],
+        "isp": value,
+        "at_bound": mr - of_min < 2 * of_tol or of_max - mr < 2 * of_tol,
+        "evaluations": len(memo),
+        "cea_runs": runs,
+        "probes": sorted([m, v if v > -math.inf else None] for m, (v, _) in memo.items()),
+        "result": result,
+    }
+
+
+# ----------------------------------------------------------------------
+# Batches
+# ----------------------------------------------------------------------
+# Up to this size a batch is not split: it runs on the worker owning its pair
+BATCH_INLINE_MAX = 32
+
+# Per-point error codes
+ERR_OK = 0
+ERR_INVALID_INPUT = 1   # non-positive Pc, MR or eps
+ERR_NO_SOLUTION = 2     # CEA ran but returned no performance (bad point)
+ERR_CEA_FAILURE = 3     # exception (unknown propellant, Fortran error...)
+
+def evaluate_points(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float],
+                    points: list, transport: bool = False) -> list:
+    """
+    Evaluate (index, pc, mr, eps, pc_over_pe) points of one propellant pair.
+    Returns (index, error_code, message, result) tuples. Runs in the service
+    process or in a CEA worker (see cea_workers).
+    """
+    out = []
+    try:
+        with pool.acquire(oxidizer, fuel, fac_cr) as cea:
+            for index, pc, mr, eps, pc_over_pe in points:
+                if not (pc > 0 and mr > 0 and eps >= 1.0):
+                    out.append((index, ERR_INVALID_INPUT, "pc, of_ratio must be > 0 and expansion_ratio >= 1", None))
+                    continue
+                try:
+                    result = evaluate(cea, pc, mr, eps, pc_over_pe, transport)
+                except Exception as e:
+                    out.append((index, ERR_CEA_FAILURE, str(e), None))
+                    continue
+                if not result["isp_vac"] > 0:
+                    out.append((index, ERR_NO_SOLUTION, "CEA returned no solution", None))
+                    continue
+                out.append((index, ERR_OK, None, result))
+    except Exception as e:
+        # Object construction failed: the whole group shares the error
+        done = {o[0] for o in out}
+        out.extend((p[0], ERR_CEA_FAILURE, str(e), None) for p in points if p[0] not in done)
+    return out
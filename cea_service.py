@@ -2,11 +2,20 @@
 Micro-service Python UNIQUEMENT pour NASA CEA
 Port: 8002
 """
-from fastapi import FastAPI
+import json
+import os
+import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from rocketcea.cea_obj import CEA_Obj
-from typing import Optional
+from typing import List, Optional, Union
+
+from cea_engine import CEAPool, pool_key, ERR_OK, P_AMBIENT_SL
+from cea_tables import TableSet, row as table_row
+from cea_cache import CEACache
+from cea_workers import WorkerPool, WorkersBusy, WorkerTimeout
+from cea_catalogue import Catalogue
 
 app = FastAPI(title="CEA Microservice")
 
@@ -19,6 +28,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# CEA runs in worker processes, routed by propellant pair
+# (CEA_WORKERS=0: in this process, with its own CEA_Obj pool)
+workers = WorkerPool(local_pool=CEAPool())
+
+MAX_BATCH_POINTS = 20000
+MAX_PROFILE_POINTS = 600
+
+# Pairs whose CEA_Obj is built at startup ("oxidizer:fuel[:fac_cr]", comma separated)
+CEA_WARM_PAIRS = os.environ.get("CEA_WARM_PAIRS", "LOX:RP-1,LOX:LH2,LOX:CH4,N2O4:MMH")
+
+# Fuel/oxidizer catalogue, built at startup
+catalogue = Catalogue()
+
+# Precomputed response tables (python cea_tables.py build ...), live CEA otherwise
+tables = TableSet()
+
+# Persistent cache of live CEA results (SQLite, quantized inputs)
+cea_cache = CEACache()
+
 class CEARequest(BaseModel):
     fuel: str = "RP-1"
     oxidizer: str = "LOX"
@@ -27,6 +55,19 @@ class CEARequest(BaseModel):
     expansion_ratio: float = 40.0
     pe: float = 1.013  # bar - exit pressure for expansion ratio calculation
     fac_cr: float = 0.0  # Finite Area Combustor contraction ratio (0 = infinite)
+    transport: bool = False  # Also return Cp, mu, k, Pr per station (slower)
+
+class StationState(BaseModel):
+    t: float           # K
+    p: float           # bar
+    mw: float
+    gamma: float
+    mach: float
+    area_ratio: float
+    cp: Optional[float] = None   # J/(kg.K), equilibrium
+    mu: Optional[float] = None   # Pa.s
+    k: Optional[float] = None    # W/(m.K), equilibrium
+    pr: Optional[float] = None
 
 class CEAResponse(BaseModel):
     isp_vac: float
@@ -36,100 +77,293 @@ class CEAResponse(BaseModel):
     gamma: float
     mw: float
     eps_from_pe: float  # Expansion ratio calculated from exit pressure
+    expansion_state: Optional[str] = None
+    chamber: Optional[StationState] = None
+    throat: Optional[StationState] = None
+    exit: Optional[StationState] = None
+    source: str = "cea"  # "table" (precomputed table) or "cache" (earlier CEA run)
+    error_bound: Optional[float] = None  # Relative error bound of a table answer
 
 @app.post("/cea", response_model=CEAResponse)
 def calculate_cea(req: CEARequest):
     """Run NASA CEA calculation"""
-    cea = CEA_Obj(oxName=req.oxidizer, fuelName=req.fuel)
+    # Finite area combustor if contraction ratio specified (pooled per fac_cr)
+    # One CEA run gives chamber/throat/exit states, transport properties and
+    # the expansion ratio matching the exit pressure (Pc/Pe station).
+    # Inputs are snapped to the cache quantization first.
+    cache_key, q = cea_cache.quantize(req.oxidizer, req.fuel, req.fac_cr, req.pc, req.of_ratio,
+                                      req.expansion_ratio, req.pe, req.transport)
+    pc_over_pe = q["pc"] / q["pe"] if q["pe"] > 0 else None
+    result = None
+    if not req.transport:
+        # Tables hold no transport properties
+        result = tables.lookup(pool_key(req.oxidizer, req.fuel, q["fac_cr"]),
+                               q["pc"], q["of_ratio"], q["expansion_ratio"], pc_over_pe)
+    if result is None:
+        cached = cea_cache.get(cache_key)
+        if cached is not None:
+            result = dict(cached, source="cache")
+    if result is None:
+        try:
+            result = workers.evaluate(req.oxidizer, req.fuel, pool_key(req.oxidizer, req.fuel, q["fac_cr"])[2],
+                                      q["pc"], q["of_ratio"], q["expansion_ratio"], pc_over_pe, req.transport)
+        except WorkersBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except WorkerTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e), headers={"Retry-After": "5"})
+        if result["isp_vac"] > 0:
+            cea_cache.put(cache_key, result)
+    
+    return CEAResponse(**result)
+
+class CEABatchRequest(BaseModel):
+    """Columnar batch: every field is either one value for all points or one value per point"""
+    fuel: Union[str, List[str]] = "RP-1"
+    oxidizer: Union[str, List[str]] = "LOX"
+    of_ratio: Union[float, List[float]] = 2.5
+    pc: Union[float, List[float]] = 50.0  # bar
+    expansion_ratio: Union[float, List[float]] = 40.0
+    pe: Union[float, List[float]] = 1.013  # bar
+    fac_cr: Union[float, List[float]] = 0.0
+    transport: bool = False
+
+BATCH_COLUMNS = ("fuel", "oxidizer", "of_ratio", "pc", "expansion_ratio", "pe", "fac_cr")
+RESULT_COLUMNS = ("isp_vac", "isp_sl", "c_star", "t_chamber", "gamma", "mw", "eps_from_pe", "expansion_state",
+                  "source", "error_bound")
+STATIONS = ("chamber", "throat", "exit")
+
+@app.post("/cea/batch")
+def calculate_cea_batch(req: CEABatchRequest):
+    """Evaluate many points in one request, spread over the CEA workers"""
+    start = time.time()
+    columns = {name: getattr(req, name) for name in BATCH_COLUMNS}
+    lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail=f"Array fields must have the same length (got {sorted(lengths)})")
+    n = lengths.pop() if lengths else 1
+    if n > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=422, detail=f"Batch too large ({n} > {MAX_BATCH_POINTS} points)")
+    col = {name: v if isinstance(v, list) else [v] * n for name, v in columns.items()}
     
-    # Use finite area combustor if contraction ratio specified
-    if req.fac_cr > 1.0:
-        cea = CEA_Obj(oxName=req.oxidizer, fuelName=req.fuel, fac_CR=req.fac_cr)
+    # Group by propellant pair, inputs snapped to the cache quantization
+    groups = {}
+    cache_keys = [None] * n
+    for i in range(n):
+        cache_keys[i], q = cea_cache.quantize(col["oxidizer"][i], col["fuel"][i], col["fac_cr"][i], col["pc"][i],
+                                              col["of_ratio"][i], col["expansion_ratio"][i], col["pe"][i], req.transport)
+        pc_over_pe = q["pc"] / q["pe"] if q["pe"] > 0 else None
+        key = pool_key(col["oxidizer"][i], col["fuel"][i], q["fac_cr"])
+        groups.setdefault(key, []).append((i, q["pc"], q["of_ratio"], q["expansion_ratio"], pc_over_pe))
     
-    isp_vac, cstar, tc = cea.get_IvacCstrTc(Pc=req.pc, MR=req.of_ratio, eps=req.expansion_ratio)
-    isp_sl = cea.get_Isp(Pc=req.pc, MR=req.of_ratio, eps=req.expansion_ratio)
-    gamma = cea.get_Throat_MolWt_gamma(Pc=req.pc, MR=req.of_ratio, eps=req.expansion_ratio)[1]
-    mw = cea.get_Throat_MolWt_gamma(Pc=req.pc, MR=req.of_ratio, eps=req.expansion_ratio)[0]
+    # Points covered by a table within tolerance are interpolated in one
+    # vectorized pass per pair; the rest go to CEA
+    pairs = set(groups)
+    results = []
+    if not req.transport:
+        for key, points in list(groups.items()):
+            cols = tables.lookup_many(key, [p[1] for p in points], [p[2] for p in points], [p[3] for p in points],
+                                      [p[4] if p[4] else float("nan") for p in points])
+            if cols is None:
+                continue
+            results.extend((p[0], ERR_OK, None, table_row(cols, k))
+                           for k, p in enumerate(points) if cols["served"][k])
+            remaining = [p for k, p in enumerate(points) if not cols["served"][k]]
+            if remaining:
+                groups[key] = remaining
+            else:
+                del groups[key]
+    
+    # Then the persistent cache
+    cached = cea_cache.get_many([cache_keys[p[0]] for points in groups.values() for p in points])
+    if cached:
+        for key, points in list(groups.items()):
+            results.extend((p[0], ERR_OK, None, dict(cached[cache_keys[p[0]]], source="cache"))
+                           for p in points if cache_keys[p[0]] in cached)
+            remaining = [p for p in points if cache_keys[p[0]] not in cached]
+            if remaining:
+                groups[key] = remaining
+            else:
+                del groups[key]
     
-    # Calculate correct expansion ratio from exit pressure
-    # This is the key fix - use CEA's proper isentropic calculation
-    pc_over_pe = req.pc / req.pe
     try:
-        eps_from_pe = cea.get_eps_at_PcOvPe(Pc=req.pc, MR=req.of_ratio, PcOvPe=pc_over_pe)
-    except:
-        # Fallback if method not available
-        eps_from_pe = req.expansion_ratio
+        computed = workers.run_batch(groups, req.transport)
+    except WorkersBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    cea_cache.put_many([(cache_keys[index], result) for index, code, _, result in computed if code == ERR_OK])
+    results.extend(computed)
+    
+    # Back to columns, in request order
+    out = {name: [None] * n for name in RESULT_COLUMNS}
+    stations = {}
+    error_code = [ERR_OK] * n
+    error = [None] * n
+    for index, code, message, result in results:
+        error_code[index] = code
+        error[index] = message
+        if result is None:
+            continue
+        for name in RESULT_COLUMNS:
+            out[name][index] = result.get(name, "cea" if name == "source" else None)
+        for station in STATIONS:
+            for field, value in result[station].items():
+                stations.setdefault(station, {}).setdefault(field, [None] * n)[index] = value
     
-    return CEAResponse(
-        isp_vac=isp_vac,
-        isp_sl=isp_sl,
-        c_star=cstar,
-        t_chamber=tc,
-        gamma=gamma,
-        mw=mw,
-        eps_from_pe=eps_from_pe
-    )
+    return {
+        "count": n,
+        "groups": len(pairs),
+        "failed": sum(1 for c in error_code if c != ERR_OK),
+        "error_code": error_code,
+        "error": error,
+        **out,
+        **stations,
+        "elapsed": round(time.time() - start, 4)
+    }
 
-@app.get("/propellants")
-def get_propellants():
-    """Get all available fuel and oxidizer cards from RocketCEA + extended lists"""
+class CEAOptimizeRequest(BaseModel):
+    fuel: str = "RP-1"
+    oxidizer: str = "LOX"
+    pc: float = 50.0  # bar
+    fac_cr: float = 0.0
+    of_min: float = 1.0
+    of_max: float = 8.0
+    expansion_ratio: float = 40.0  # Fixed eps (ignored with optimize_expansion)
+    objective: str = "vac"  # "vac", "sl" or "ambient"
+    p_ambient: float = P_AMBIENT_SL  # bar, for objective "ambient"
+    optimize_expansion: bool = False  # Also pick eps: ideal expansion pe = p_ambient
+    max_expansion_ratio: Optional[float] = None
+    of_tolerance: float = 1e-3
+
+@app.post("/cea/optimize")
+def optimize_cea(req: CEAOptimizeRequest):
+    """O/F maximizing Isp (and optionally the matching optimal expansion ratio)"""
+    if req.objective not in ("vac", "sl", "ambient"):
+        raise HTTPException(status_code=422, detail="objective must be 'vac', 'sl' or 'ambient'")
+    if not 0 < req.of_min < req.of_max or req.pc <= 0 or req.of_tolerance <= 0:
+        raise HTTPException(status_code=422, detail="Need 0 < of_min < of_max, pc > 0 and of_tolerance > 0")
+    if req.objective == "vac" and req.optimize_expansion:
+        raise HTTPException(status_code=422, detail="Vacuum Isp grows with eps: optimize_expansion needs an ambient pressure")
+    p_ambient = {"vac": None, "sl": P_AMBIENT_SL, "ambient": req.p_ambient}[req.objective]
+    if p_ambient is not None and not 0 < p_ambient < req.pc:
+        raise HTTPException(status_code=422, detail="p_ambient must be between 0 and pc")
+    
+    start = time.time()
+    fac_cr = pool_key(req.oxidizer, req.fuel, req.fac_cr)[2]
     try:
-        from rocketcea.blends import fuelCards, oxCards
-        
-        # Extended fuels not in blends but supported by CEA
-        extra_fuels = [
-            "RP-1", "JP-4", "JP-5", "JP-10", "Jet-A", "Biodiesel",
-            "C6H6", "C7H8", "C8H18", "C10H22", "C12H26",
-            "B5H9", "B10H14", "Al", "Mg", "Li", "Be",
-            "PBAN", "AN", "HMX", "RDX", "Syntin", "ALICE",
-            "Aerozine-50", "Diborane", "Pentaborane", "Decaborane"
-        ]
-        
-        # Extended oxidizers not in blends but supported by CEA
-        extra_oxidizers = [
-            "FLOX70", "FLOX80", "MON-1", "MON-10", "NTO", 
-            "RFNA", "WFNA", "Ozone", "O3", "Oxygen", "Fluorine",
-            "AK-20", "AK-27"
-        ]
-        
-        # Combine blends + extras, remove duplicates
-        all_fuel_names = set(fuelCards.keys()) | set(extra_fuels)
-        all_ox_names = set(oxCards.keys()) | set(extra_oxidizers)
-        
-        fuels = []
-        for name in all_fuel_names:
-            try:
-                card = fuelCards.get(name, "")
-                fuels.append({
-                    "name": name,
-                    "type": "fuel",
-                    "card": str(card)[:200] if card else "",
-                    "source": "blends" if name in fuelCards else "cea_standard"
-                })
-            except:
-                fuels.append({"name": name, "type": "fuel", "card": "", "source": "cea_standard"})
-        
-        oxidizers = []
-        for name in all_ox_names:
-            try:
-                card = oxCards.get(name, "")
-                oxidizers.append({
-                    "name": name,
-                    "type": "oxidizer",
-                    "card": str(card)[:200] if card else "",
-                    "source": "blends" if name in oxCards else "cea_standard"
-                })
-            except:
-                oxidizers.append({"name": name, "type": "oxidizer", "card": "", "source": "cea_standard"})
-        
-        return {
-            "fuels": sorted(fuels, key=lambda x: x["name"]),
-            "oxidizers": sorted(oxidizers, key=lambda x: x["name"]),
-            "fuel_count": len(fuels),
-            "ox_count": len(oxidizers)
-        }
-    except Exception as e:
-        return {"error": str(e), "fuels": [], "oxidizers": []}
+        out = workers.call("optimize", (req.oxidizer, req.fuel, fac_cr, req.pc, req.of_min, req.of_max,
+                                        req.expansion_ratio, p_ambient, req.optimize_expansion,
+                                        req.max_expansion_ratio, req.of_tolerance))
+    except WorkersBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except WorkerTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e), headers={"Retry-After": "5"})
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    out["objective"] = req.objective
+    out["result"] = CEAResponse(**out["result"])
+    out["elapsed"] = round(time.time() - start, 4)
+    return out
+
+class CEAProfileRequest(BaseModel):
+    fuel: str = "RP-1"
+    oxidizer: str = "LOX"
+    of_ratio: float = 2.5
+    pc: float = 50.0  # bar
+    fac_cr: float = 0.0
+    area_ratio: List[float]  # A/At at each wall station, in contour order
+    supersonic: Optional[List[bool]] = None  # Branch per station (default: downstream of the smallest A/At)
+    transport: bool = True
+
+PROFILE_FIELDS = ("t", "p", "gamma", "mw", "mach", "cp", "mu", "k", "pr")
+
+@app.post("/cea/profile")
+def cea_profile(req: CEAProfileRequest):
+    """Gas state along the nozzle contour for the wall heat-transfer loop"""
+    start = time.time()
+    n = len(req.area_ratio)
+    if not n or n > MAX_PROFILE_POINTS:
+        raise HTTPException(status_code=422, detail=f"area_ratio needs 1 to {MAX_PROFILE_POINTS} values")
+    if min(req.area_ratio) < 1.0 - 1e-9:
+        raise HTTPException(status_code=422, detail="Area ratios must be >= 1")
+    if req.supersonic is not None and len(req.supersonic) != n:
+        raise HTTPException(status_code=422, detail="supersonic must have one value per area ratio")
+    supersonic = req.supersonic
+    if supersonic is None:
+        throat = req.area_ratio.index(min(req.area_ratio))
+        supersonic = [i > throat for i in range(n)]
+    
+    # One CEA station per distinct (branch, ratio); A/At = 1 is the throat
+    wanted = {"subsonic": [], "supersonic": []}
+    slot = []
+    for area, sup in zip(req.area_ratio, supersonic):
+        if area <= 1.0 + 1e-9:
+            slot.append(None)
+            continue
+        branch = "supersonic" if sup else "subsonic"
+        key = round(area, 6)
+        if key not in wanted[branch]:
+            wanted[branch].append(key)
+        slot.append((branch, wanted[branch].index(key)))
+    
+    fac_cr = pool_key(req.oxidizer, req.fuel, req.fac_cr)[2]
+    try:
+        out = workers.call("profile", (req.oxidizer, req.fuel, fac_cr, req.pc, req.of_ratio,
+                                       wanted["subsonic"], wanted["supersonic"], req.transport))
+    except WorkersBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except WorkerTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e), headers={"Retry-After": "5"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    states = [out["throat"] if s is None else out[s[0]][s[1]] for s in slot]
+    return {
+        "count": n,
+        "area_ratio": req.area_ratio,
+        "supersonic": supersonic,
+        **{f: [state.get(f) for state in states] for f in PROFILE_FIELDS},
+        "chamber": out["chamber"],
+        "throat": out["throat"],
+        "cea_runs": out["runs"],
+        "elapsed": round(time.time() - start, 4)
+    }
+
+@app.on_event("startup")
+def start_workers():
+    # Not at import: spawned workers re-import this module
+    catalogue.build()
+    tables.load()
+    cea_cache.open()
+    workers.start()
+    pairs = []
+    for item in filter(None, (p.strip() for p in CEA_WARM_PAIRS.split(","))):
+        parts = item.split(":")
+        try:
+            pairs.append(pool_key(parts[0], parts[1], float(parts[2]) if len(parts) > 2 else None))
+        except (IndexError, ValueError):
+            print(f"[CEA] ignoring warm-up pair '{item}'")
+    workers.warm(pairs)
+
+@app.on_event("shutdown")
+def stop_workers():
+    workers.stop()
+    cea_cache.close()
+
+@app.get("/propellants")
+def get_propellants(request: Request, q: Optional[str] = None):
+    """Fuel and oxidizer catalogue; ?q= searches names (prefix, then fuzzy)"""
+    etag = catalogue.search_etag(q) if q else catalogue.etag
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+    sent = [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]
+    if etag in sent or "*" in sent:
+        return Response(status_code=304, headers=headers)
+    body = json.dumps(catalogue.search(q)).encode() if q else catalogue.body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/stats")
+def stats():
+    """CEA_Obj pool usage (hits, misses, evictions), table coverage and result cache"""
+    return {"workers": workers.stats(), "pool": workers.local_pool.stats(), "tables": tables.stats(),
+            "cache": cea_cache.stats()}
 
 @app.get("/health")
 def health():
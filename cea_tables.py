@@ -0,0 +1,454 @@
+"""
+Tables de réponse CEA précalculées
+Offline builder and runtime lookup for the CEA micro-service.
+
+Per propellant pair, two rectilinear tables are built:
+- "eps":  (ln Pc, MR, ln eps)   -> performance and station states
+- "pcope": (ln Pc, MR, ln Pc/Pe) -> expansion ratio matching the exit pressure
+Each axis starts from a coarse grid and is refined by inserting interval
+midpoints where linear interpolation misses CEA by more than the build
+tolerance. The largest midpoint error measured on every axis interval is
+stored with the table; the error bound of a cell is the sum over its
+three intervals. Values are .npy files opened memory-mapped, so a table
+costs no memory until it is read and is shared by all processes.
+
+Build:  python cea_tables.py build --oxidizer LOX --fuel RP-1 --mr 1.5 4.0
+List:   python cea_tables.py list
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from cea_engine import (
+    CEAPool, evaluate, eps_at_pc_over_pe, back_pressure_isp, separation_pressure, pool_key, rocketcea_version,
+    P_AMBIENT_SL, PC_UNITS
+)
+
+
+CEA_TABLES_DIR = Path(os.environ.get("CEA_TABLES_DIR", Path(__file__).parent / "data" / "cea_tables"))
+# Largest error bound (relative) a table answer may have before falling back to CEA
+CEA_TABLE_TOLERANCE = float(os.environ.get("CEA_TABLE_TOLERANCE", "2e-3"))
+
+STATIONS = ("chamber", "throat", "exit")
+STATION_FIELDS = ("t", "p", "mw", "gamma", "mach", "area_ratio")
+
+EPS_FIELDS = ("isp_vac", "c_star", "t_chamber", "gamma", "mw", "p_exit") + tuple(
+    f"{station}_{field}" for station in STATIONS for field in STATION_FIELDS
+)
+PCOPE_FIELDS = ("eps_from_pe",)
+
+# Interpolated in log space (pressures vary exponentially along the axes)
+LOG_FIELDS = {"p_exit", "chamber_p", "throat_p", "exit_p", "eps_from_pe"}
+# Fields checked during refinement
+ERROR_FIELDS = {
+    "eps": ("isp_vac", "c_star", "t_chamber", "gamma", "mw", "exit_t", "exit_p"),
+    "pcope": ("eps_from_pe",),
+}
+
+DEFAULT_RANGES = {"pc": (5.0, 300.0), "mr": (1.0, 6.0), "eps": (2.0, 200.0), "pcope": (2.0, 5000.0)}
+
+
+def table_name(oxidizer: str, fuel: str, fac_cr: Optional[float], kind: str) -> str:
+    fac = f"fac{fac_cr:g}" if fac_cr else "iac"
+    return re.sub(r"[^A-Za-z0-9.+-]", "_", f"{oxidizer}__{fuel}__{fac}__{kind}")
+
+
+# ----------------------------------------------------------------------
+# Builder
+# ----------------------------------------------------------------------
+def _sampler(cea, kind: str):
+    """Function (pc, mr, x) -> stored field vector (log fields in log), NaN on failure"""
+    fields = EPS_FIELDS if kind == "eps" else PCOPE_FIELDS
+    log_mask = np.array([f in LOG_FIELDS for f in fields])
+
+    def sample(pc: float, mr: float, x: float) -> np.ndarray:
+        try:
+            if kind == "eps":
+                result = evaluate(cea, pc, mr, x)
+                if not result["isp_vac"] > 0:
+                    raise ValueError("no solution")
+                flat = dict(result)
+                for station in STATIONS:
+                    for field in STATION_FIELDS:
+                        flat[f"{station}_{field}"] = result[station][field]
+                row = np.array([flat[f] for f in fields], dtype=np.float64)
+            else:
+                row = np.array([eps_at_pc_over_pe(cea, pc, mr, x)], dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                row[log_mask] = np.log(row[log_mask])
+            return row
+        except Exception:
+            return np.full(len(fields), np.nan)
+
+    return sample
+
+
+def _interval_errors(axes, values, sample, axis: int, check: np.ndarray, scale: np.ndarray):
+    """
+    Largest relative error of linear interpolation at the midpoints of every
+    interval along one axis, measured on all nodes of the two other axes.
+    Returns (errors, midpoint samples) so that split intervals reuse them.
+    """
+    mids = 0.5 * (axes[axis][:-1] + axes[axis][1:])
+    others = [a for i, a in enumerate(axes) if i != axis]
+    exact = np.empty((len(mids), len(others[0]), len(others[1]), values.shape[-1]))
+    for m, mid in enumerate(mids):
+        for a, u in enumerate(others[0]):
+            for b, v in enumerate(others[1]):
+                coords = [u, v]
+                coords.insert(axis, mid)
+                exact[m, a, b] = sample(np.exp(coords[0]), coords[1], np.exp(coords[2]))
+
+    moved = np.moveaxis(values, axis, 0)
+    interp = 0.5 * (moved[:-1] + moved[1:])
+    with np.errstate(invalid="ignore"):
+        diff = np.abs(_physical(interp, scale) - _physical(exact, scale)) / np.abs(_physical(exact, scale))
+    diff = diff[..., check]
+    # Intervals crossing a failed point cannot be trusted
+    diff = np.where(np.isnan(diff), np.inf, diff)
+    return diff.reshape(len(mids), -1).max(axis=1), exact
+
+
+def _physical(values: np.ndarray, log_mask: np.ndarray) -> np.ndarray:
+    out = np.array(values, dtype=np.float64)
+    out[..., log_mask] = np.exp(out[..., log_mask])
+    return out
+
+
+def build_table(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float], kind: str,
+                pc_range: Tuple[float, float], mr_range: Tuple[float, float], x_range: Tuple[float, float],
+                nodes: int = 9, tolerance: float = 1e-3, max_nodes: int = 65,
+                out_dir: Path = CEA_TABLES_DIR) -> Dict:
+    """
+    Tabulate one kind for one pair. tolerance applies to a cell, i.e. to the
+    sum of its three interval errors: each axis is refined to a third of it.
+    """
+    axis_tolerance = tolerance / 3
+    fields = EPS_FIELDS if kind == "eps" else PCOPE_FIELDS
+    log_mask = np.array([f in LOG_FIELDS for f in fields])
+    check = np.array([f in ERROR_FIELDS[kind] for f in fields])
+    axes = [
+        np.linspace(np.log(pc_range[0]), np.log(pc_range[1]), nodes),
+        np.linspace(mr_range[0], mr_range[1], nodes),
+        np.linspace(np.log(x_range[0]), np.log(x_range[1]), nodes),
+    ]
+    start = time.time()
+    samples = 0
+
+    with pool.acquire(oxidizer, fuel, fac_cr) as cea:
+        raw = _sampler(cea, kind)
+        # Every pass re-checks all intervals: unchanged ones hit the memo
+        memo = {}
+
+        def sample(pc, mr, x):
+            nonlocal samples
+            key = (pc, mr, x)
+            if key not in memo:
+                samples += 1
+                memo[key] = raw(pc, mr, x)
+            return memo[key]
+
+        values = np.empty(tuple(len(a) for a in axes) + (len(fields),))
+        for i, lpc in enumerate(axes[0]):
+            for j, mr in enumerate(axes[1]):
+                for k, lx in enumerate(axes[2]):
+                    values[i, j, k] = sample(np.exp(lpc), mr, np.exp(lx))
+
+        errors = [None, None, None]
+        for refinement in range(32):
+            inserted = 0
+            for axis in range(3):
+                err, exact = _interval_errors(axes, values, sample, axis, check, log_mask)
+                errors[axis] = err
+                split = np.nonzero(err > axis_tolerance)[0]
+                room = max_nodes - len(axes[axis])
+                if room <= 0 or not len(split):
+                    continue
+                # Worst intervals first when the axis is about to be full
+                split = np.sort(split[np.argsort(-err[split])][:room])
+                mids = 0.5 * (axes[axis][split] + axes[axis][split + 1])
+                axes[axis] = np.insert(axes[axis], split + 1, mids)
+                moved = np.insert(np.moveaxis(values, axis, 0), split + 1, exact[split], axis=0)
+                values = np.ascontiguousarray(np.moveaxis(moved, 0, axis))
+                inserted += len(split)
+            print(f"[CEATables] {oxidizer}/{fuel} {kind} pass {refinement}: grid {values.shape[:3]}, "
+                  f"max error {max(float(np.max(e)) for e in errors):.2e}, +{inserted} nodes")
+            if not inserted:
+                break
+        else:
+            # Pass limit reached: measure the errors of the final grid
+            errors = [_interval_errors(axes, values, sample, axis, check, log_mask)[0] for axis in range(3)]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = table_name(oxidizer, fuel, fac_cr, kind)
+    np.save(out_dir / f"{name}.npy", values)
+    meta = {
+        "oxidizer": oxidizer,
+        "fuel": fuel,
+        "fac_cr": fac_cr,
+        "kind": kind,
+        "fields": list(fields),
+        "log_fields": [f for f in fields if f in LOG_FIELDS],
+        "axes": [np.exp(axes[0]).tolist(), axes[1].tolist(), np.exp(axes[2]).tolist()],
+        "errors": [np.where(np.isfinite(e), e, -1.0).tolist() for e in errors],
+        "tolerance": tolerance,
+        "samples": samples,
+        "build_seconds": round(time.time() - start, 1),
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rocketcea_version": rocketcea_version(),
+        "pc_units": PC_UNITS,
+    }
+    with open(out_dir / f"{name}.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"[CEATables] wrote {name}: grid {values.shape[:3]}, {samples} CEA runs in {meta['build_seconds']}s")
+    return meta
+
+
+# ----------------------------------------------------------------------
+# Lookup
+# ----------------------------------------------------------------------
+class Table:
+    """One memory-mapped table with its axes (interpolation coordinates) and cell errors"""
+
+    def __init__(self, meta: Dict, values: np.ndarray):
+        self.meta = meta
+        self.values = values
+        self.fields = meta["fields"]
+        self.index = {f: i for i, f in enumerate(self.fields)}
+        self.log_mask = np.array([f in meta["log_fields"] for f in self.fields])
+        axes = [np.asarray(a, dtype=np.float64) for a in meta["axes"]]
+        self.axes = [np.log(axes[0]), axes[1], np.log(axes[2])]
+        # -1 marks intervals next to a failed CEA point
+        self.errors = [np.where(np.asarray(e) < 0, np.inf, e) for e in meta["errors"]]
+        # Plain ndarray view of the mapping (np.memmap indexing is slow) as [cells, fields]
+        n0, n1, n2 = values.shape[:3]
+        self.flat = np.asarray(values).reshape(n0 * n1 * n2, len(self.fields))
+        self.strides = (n1 * n2, n2, 1)
+        self.corner_offsets = np.array([di * n1 * n2 + dj * n2 + dk
+                                        for di in (0, 1) for dj in (0, 1) for dk in (0, 1)])
+
+    @classmethod
+    def load(cls, json_path: Path) -> "Table":
+        with open(json_path) as f:
+            meta = json.load(f)
+        return cls(meta, np.load(json_path.with_suffix(".npy"), mmap_mode="r"))
+
+    def interpolate(self, pc: np.ndarray, mr: np.ndarray, x: np.ndarray):
+        """
+        Trilinear interpolation at n points. Returns (values [n, fields],
+        error bound [n]); points outside the table get NaN and an infinite bound.
+        """
+        coords = [np.log(pc), np.asarray(mr, dtype=np.float64), np.log(x)]
+        n = len(coords[0])
+        inside = np.ones(n, dtype=bool)
+        base = np.zeros(n, dtype=np.intp)
+        bound = np.zeros(n)
+        weights = []
+        for axis, errors, stride, q in zip(self.axes, self.errors, self.strides, coords):
+            inside &= (q >= axis[0]) & (q <= axis[-1])
+            i = np.minimum(np.maximum(np.searchsorted(axis, q, side="right") - 1, 0), len(axis) - 2)
+            base += i * stride
+            bound += errors[i]
+            t = (q - axis[i]) / (axis[i + 1] - axis[i])
+            weights.append(np.minimum(np.maximum(t, 0.0), 1.0))
+
+        # The 8 corners of every cell in one gather, weights as an outer product
+        u, v, w = weights
+        wu = np.stack([1 - u, u], axis=1)
+        wv = np.stack([1 - v, v], axis=1)
+        ww = np.stack([1 - w, w], axis=1)
+        corner_weights = (wu[:, :, None, None] * wv[:, None, :, None] * ww[:, None, None, :]).reshape(n, 8)
+        corners = self.flat[base[:, None] + self.corner_offsets[None, :]]
+        out = np.einsum("nc,ncf->nf", corner_weights, corners)
+        out[:, self.log_mask] = np.exp(out[:, self.log_mask])
+        out[~inside] = np.nan
+        bound[~inside] = np.inf
+        bound[np.isnan(out).any(axis=1)] = np.inf
+        return out, bound
+
+    def column(self, values: np.ndarray, field: str) -> np.ndarray:
+        return values[:, self.index[field]]
+
+    def describe(self) -> Dict:
+        m = self.meta
+        finite = [e[np.isfinite(e)] for e in self.errors]
+        return {
+            "kind": m["kind"],
+            "grid": [len(a) for a in m["axes"]],
+            "pc": [m["axes"][0][0], m["axes"][0][-1]],
+            "mr": [m["axes"][1][0], m["axes"][1][-1]],
+            ("eps" if m["kind"] == "eps" else "pc_over_pe"): [m["axes"][2][0], m["axes"][2][-1]],
+            "max_cell_error": float(sum(e.max() if len(e) else 0.0 for e in finite)),
+            "built": m.get("built"),
+            "rocketcea_version": m.get("rocketcea_version"),
+        }
+
+
+class TableSet:
+    """Tables of every propellant pair found in a directory, keyed like the CEA pool"""
+
+    def __init__(self, directory: Path = CEA_TABLES_DIR, tolerance: float = CEA_TABLE_TOLERANCE):
+        self.directory = Path(directory)
+        self.tolerance = tolerance
+        self.tables: Dict[Tuple, Dict[str, Table]] = {}
+        self.served = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> "TableSet":
+        tables = {}
+        version = rocketcea_version()
+        for path in sorted(self.directory.glob("*.json")) if self.directory.is_dir() else []:
+            try:
+                table = Table.load(path)
+            except Exception as e:
+                print(f"[CEATables] skipping {path.name}: {e}")
+                continue
+            if table.meta.get("pc_units") != PC_UNITS:
+                # Older tables ran CEA with pc in psia: their axes and pressures are off
+                print(f"[CEATables] skipping {path.name}: pc in {table.meta.get('pc_units', 'psia')}, "
+                      f"expected {PC_UNITS} (rebuild it)")
+                continue
+            if table.meta.get("rocketcea_version") != version:
+                print(f"[CEATables] warning: {path.name} built with RocketCEA "
+                      f"{table.meta.get('rocketcea_version')}, running {version}")
+            key = pool_key(table.meta["oxidizer"], table.meta["fuel"], table.meta.get("fac_cr"))
+            tables.setdefault(key, {})[table.meta["kind"]] = table
+        self.tables = tables
+        if tables:
+            print(f"[CEATables] {len(tables)} propellant pair(s) loaded from {self.directory}")
+        return self
+
+    def lookup_many(self, key: Tuple, pc, mr, eps, pc_over_pe) -> Optional[Dict]:
+        """
+        Interpolate n points of one pair. pc_over_pe holds NaN where the
+        request has no exit pressure. Returns None when the pair has no
+        table, else columns shaped like evaluate() plus "served" (bound
+        within tolerance) and "error_bound". Points whose nozzle flow
+        separates at sea level are never served.
+        """
+        kinds = self.tables.get(key)
+        if not kinds or "eps" not in kinds:
+            return None
+        pc = np.asarray(pc, dtype=np.float64)
+        mr = np.asarray(mr, dtype=np.float64)
+        eps = np.asarray(eps, dtype=np.float64)
+        pc_over_pe = np.asarray(pc_over_pe, dtype=np.float64)
+
+        table = kinds["eps"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values, bound = table.interpolate(pc, mr, eps)
+        cols = {f: table.column(values, f) for f in ("isp_vac", "c_star", "t_chamber", "gamma", "mw", "p_exit")}
+        cols["eps_from_pe"] = eps.copy()
+        for station in STATIONS:
+            cols[station] = {f: table.column(values, f"{station}_{f}") for f in STATION_FIELDS}
+        cols["isp_sl"] = back_pressure_isp(cols["isp_vac"], cols["c_star"], eps, cols["chamber"]["p"])
+        # A separated sea-level flow needs a CEA run at the separation area ratio
+        bound[cols["p_exit"] < separation_pressure(cols["chamber"]["p"])] = np.inf
+
+        use_pcope = pc_over_pe > 1.0
+        if use_pcope.any():
+            pcope = kinds.get("pcope")
+            if pcope is None:
+                bound[use_pcope] = np.inf
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    from_pe, pe_bound = pcope.interpolate(pc[use_pcope], mr[use_pcope], pc_over_pe[use_pcope])
+                cols["eps_from_pe"][use_pcope] = from_pe[:, 0]
+                bound[use_pcope] = np.maximum(bound[use_pcope], pe_bound)
+
+        cols["served"] = bound <= self.tolerance
+        cols["error_bound"] = bound
+        with self._lock:
+            served = int(cols["served"].sum())
+            self.served += served
+            self.fallbacks += len(bound) - served
+        return cols
+
+    def lookup(self, key: Tuple, pc: float, mr: float, eps: float, pc_over_pe: Optional[float]) -> Optional[Dict]:
+        """Single point: an evaluate()-like result, or None to run CEA"""
+        if key not in self.tables:
+            return None
+        cols = self.lookup_many(key, [pc], [mr], [eps], [pc_over_pe if pc_over_pe else np.nan])
+        if cols is None or not cols["served"][0]:
+            return None
+        return row(cols, 0)
+
+    def stats(self) -> Dict:
+        total = self.served + self.fallbacks
+        return {
+            "directory": str(self.directory),
+            "tolerance": self.tolerance,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "served_rate": round(self.served / total, 4) if total else 0.0,
+            "pairs": [
+                {"oxidizer": k[0], "fuel": k[1], "fac_cr": k[2],
+                 "tables": [t.describe() for t in kinds.values()]}
+                for k, kinds in self.tables.items()
+            ],
+        }
+
+
+def row(cols: Dict, i: int) -> Dict:
+    """Point i of lookup_many() columns as an evaluate() result"""
+    p_exit = float(cols["p_exit"][i])
+    return {
+        "isp_vac": float(cols["isp_vac"][i]),
+        "isp_sl": float(cols["isp_sl"][i]),
+        "c_star": float(cols["c_star"][i]),
+        "t_chamber": float(cols["t_chamber"][i]),
+        "gamma": float(cols["gamma"][i]),
+        "mw": float(cols["mw"][i]),
+        "eps_from_pe": float(cols["eps_from_pe"][i]),
+        "p_exit": p_exit,
+        "expansion_state": "underexpanded" if p_exit >= P_AMBIENT_SL else "overexpanded",
+        "chamber": {f: float(v[i]) for f, v in cols["chamber"].items()},
+        "throat": {f: float(v[i]) for f, v in cols["throat"].items()},
+        "exit": {f: float(v[i]) for f, v in cols["exit"].items()},
+        "source": "table",
+        "error_bound": float(cols["error_bound"][i]),
+    }
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build or list precomputed CEA tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="tabulate one propellant pair")
+    build.add_argument("--oxidizer", default="LOX")
+    build.add_argument("--fuel", default="RP-1")
+    build.add_argument("--fac-cr", type=float, default=0.0)
+    build.add_argument("--pc", type=float, nargs=2, default=DEFAULT_RANGES["pc"], metavar=("MIN", "MAX"))
+    build.add_argument("--mr", type=float, nargs=2, default=DEFAULT_RANGES["mr"], metavar=("MIN", "MAX"))
+    build.add_argument("--eps", type=float, nargs=2, default=DEFAULT_RANGES["eps"], metavar=("MIN", "MAX"))
+    build.add_argument("--pc-over-pe", type=float, nargs=2, default=DEFAULT_RANGES["pcope"], metavar=("MIN", "MAX"))
+    build.add_argument("--nodes", type=int, default=9, help="initial nodes per axis")
+    build.add_argument("--max-nodes", type=int, default=65, help="node limit per axis")
+    build.add_argument("--tolerance", type=float, default=1e-3, help="relative error bound per cell")
+    build.add_argument("--out", type=Path, default=CEA_TABLES_DIR)
+    lst = sub.add_parser("list", help="show the tables of a directory")
+    lst.add_argument("--dir", type=Path, default=CEA_TABLES_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        pool = CEAPool()
+        fac_cr = pool_key(args.oxidizer, args.fuel, args.fac_cr)[2]
+        for kind, x_range in (("eps", args.eps), ("pcope", args.pc_over_pe)):
+            build_table(pool, args.oxidizer, args.fuel, fac_cr, kind, tuple(args.pc), tuple(args.mr),
+                        tuple(x_range), args.nodes, args.tolerance, args.max_nodes, args.out)
+    else:
+        print(json.dumps(TableSet(args.dir).load().stats()["pairs"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
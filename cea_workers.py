@@ -0,0 +1,287 @@
+"""
+Processus de calcul CEA du micro-service
+The Fortran core is process-global and not re-entrant, so inside one
+process every CEA run is serialized. WorkerPool starts CEA_WORKERS
+processes at startup, each with its own CEAPool. Single points are routed
+by propellant pair (same pair -> same worker, whose CEA_Obj is warm);
+batches are spread over all workers. Each worker accepts at most
+CEA_WORKER_QUEUE pending tasks: when the preferred worker is full the
+least loaded one is used, and when all are full WorkersBusy is raised.
+CEA_WORKERS=0 keeps the in-process behaviour.
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Optional, Tuple
+
+from cea_engine import (
+    CEAPool, evaluate, evaluate_points, evaluate_profile, optimize_mixture, BATCH_INLINE_MAX, ERR_CEA_FAILURE
+)
+
+
+CEA_WORKERS = int(os.environ.get("CEA_WORKERS", str(os.cpu_count() or 1)))
+CEA_WORKER_QUEUE = int(os.environ.get("CEA_WORKER_QUEUE", "32"))
+CEA_WORKER_TIMEOUT = float(os.environ.get("CEA_WORKER_TIMEOUT", "60"))
+
+
+class WorkersBusy(Exception):
+    """Every worker already has CEA_WORKER_QUEUE pending tasks"""
+
+
+class WorkerTimeout(Exception):
+    """A task did not finish within CEA_WORKER_TIMEOUT"""
+
+
+def _evaluate_point(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float], pc: float, mr: float,
+                    eps: float, pc_over_pe: Optional[float], transport: bool) -> Dict:
+    with pool.acquire(oxidizer, fuel, fac_cr) as cea:
+        return evaluate(cea, pc, mr, eps, pc_over_pe, transport)
+
+
+def _evaluate_profile(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float], pc: float, mr: float,
+                      subsonic: list, supersonic: list, transport: bool) -> Dict:
+    with pool.acquire(oxidizer, fuel, fac_cr) as cea:
+        return evaluate_profile(cea, pc, mr, subsonic, supersonic, transport)
+
+
+def _warm(pool: CEAPool, oxidizer: str, fuel: str, fac_cr: Optional[float]) -> bool:
+    """Build the pair's CEA_Obj and run it once (the first run loads the thermo data)"""
+    try:
+        _evaluate_point(pool, oxidizer, fuel, fac_cr, 50.0, 2.0, 40.0, None, False)
+        return True
+    except Exception:
+        return False
+
+
+TASKS = {"point": _evaluate_point, "points": evaluate_points, "optimize": optimize_mixture,
+         "profile": _evaluate_profile, "warm": _warm}
+
+
+def _worker_main(inbox, outbox):
+    """Worker process: run tasks against the process' own CEA_Obj pool"""
+    pool = CEAPool()
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        task_id, kind, args = message
+        try:
+            outbox.put((task_id, True, TASKS[kind](pool, *args)))
+        except Exception as e:
+            outbox.put((task_id, False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.inbox = None
+        self.pending: Dict[int, Future] = {}
+        self.done = 0
+        self.restarts = 0
+
+
+class WorkerPool:
+    def __init__(self, workers: int = CEA_WORKERS, max_pending: int = CEA_WORKER_QUEUE,
+                 local_pool: Optional[CEAPool] = None):
+        self.size = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self.local_pool = local_pool or CEAPool()
+        self._workers = [_Worker(i) for i in range(self.size)]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ctx = None
+        self._outbox = None
+        self._collector = None
+        self._running = False
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _spawn(self, worker: _Worker):
+        worker.inbox = self._ctx.Queue()
+        worker.process = self._ctx.Process(target=_worker_main, args=(worker.inbox, self._outbox),
+                                           name=f"cea-worker-{worker.index}", daemon=True)
+        worker.process.start()
+
+    def start(self):
+        if not self.enabled or self._running:
+            return
+        import multiprocessing
+        # spawn, not fork: a forked child could inherit CORE_LOCK or the
+        # Fortran state of the parent mid-run
+        self._ctx = multiprocessing.get_context("spawn")
+        self._outbox = self._ctx.Queue()
+        for worker in self._workers:
+            self._spawn(worker)
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name="cea-collector", daemon=True)
+        self._collector.start()
+        print(f"[CEAWorkers] {self.size} worker processes started")
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        for worker in self._workers:
+            try:
+                worker.inbox.put(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._fail(worker, "service stopping")
+
+    def _collect(self):
+        """Hand results back to their futures; restart dead workers"""
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check > 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                task_id, ok, payload = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = None
+                for worker in self._workers:
+                    future = worker.pending.pop(task_id, None)
+                    if future is not None:
+                        worker.done += 1
+                        break
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        for worker in self._workers:
+            if self._running and not worker.process.is_alive():
+                # Fortran aborts kill the whole process: fail its tasks and replace it
+                print(f"[CEAWorkers] worker {worker.index} died (exit {worker.process.exitcode}), restarting")
+                self._fail(worker, f"worker died (exit {worker.process.exitcode})", respawn=True)
+
+    def _fail(self, worker: _Worker, reason: str, respawn: bool = False):
+        # The inbox is swapped under the lock that submit() holds while it
+        # registers and sends a task, so no task reaches a dead worker
+        with self._lock:
+            pending, worker.pending = worker.pending, {}
+            if respawn:
+                worker.restarts += 1
+                self._spawn(worker)
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    def _route(self, key: Optional[Tuple], force: bool) -> _Worker:
+        """Preferred worker of the pair if it has room, else the least loaded one"""
+        if key is not None:
+            preferred = self._workers[zlib.crc32(repr(key).encode()) % self.size]
+            if len(preferred.pending) < self.max_pending:
+                return preferred
+        worker = min(self._workers, key=lambda w: len(w.pending))
+        if len(worker.pending) >= self.max_pending and not force:
+            self.rejected += 1
+            raise WorkersBusy(f"all {self.size} CEA workers have {self.max_pending} pending tasks")
+        return worker
+
+    def submit(self, kind: str, args: tuple, key: Optional[Tuple] = None, force: bool = False) -> Future:
+        future = Future()
+        with self._lock:
+            worker = self._route(key, force)
+            task_id = next(self._ids)
+            worker.pending[task_id] = future
+            worker.inbox.put((task_id, kind, args))
+        return future
+
+    def call(self, kind: str, args: tuple):
+        """Run one task on the worker owning its pair (args start with oxidizer, fuel, fac_cr)"""
+        if not self.enabled:
+            return TASKS[kind](self.local_pool, *args)
+        future = self.submit(kind, args, key=tuple(args[:3]))
+        try:
+            return future.result(timeout=CEA_WORKER_TIMEOUT)
+        except FutureTimeout:
+            raise WorkerTimeout(f"CEA {kind} task did not finish within {CEA_WORKER_TIMEOUT:g}s")
+
+    def evaluate(self, oxidizer: str, fuel: str, fac_cr: Optional[float], pc: float, mr: float, eps: float,
+                 pc_over_pe: Optional[float], transport: bool = False) -> Dict:
+        """One point (in-process when disabled)"""
+        return self.call("point", (oxidizer, fuel, fac_cr, pc, mr, eps, pc_over_pe, transport))
+
+    def warm(self, pairs: list):
+        """Pre-build the CEA_Obj of each (oxidizer, fuel, fac_cr) on its worker, without waiting"""
+        for pair in pairs:
+            if not self.enabled:
+                ok = _warm(self.local_pool, *pair)
+                print(f"[CEAWorkers] warm-up {pair[0]}/{pair[1]}: {'ok' if ok else 'failed'}")
+                continue
+            future = self.submit("warm", tuple(pair), key=tuple(pair), force=True)
+            future.add_done_callback(lambda f, pair=pair: print(
+                f"[CEAWorkers] warm-up {pair[0]}/{pair[1]}: "
+                f"{'ok' if not f.exception() and f.result() else 'failed'}"))
+
+    def run_batch(self, groups: Dict[Tuple, list], transport: bool = False) -> list:
+        """groups: (oxidizer, fuel, fac_cr) -> points. Returns all evaluate_points tuples."""
+        if not self.enabled:
+            out = []
+            for (oxidizer, fuel, fac_cr), points in groups.items():
+                out.extend(evaluate_points(self.local_pool, oxidizer, fuel, fac_cr, points, transport))
+            return out
+
+        total = sum(len(points) for points in groups.values())
+        if not total:
+            return []
+        if total <= BATCH_INLINE_MAX:
+            # Small batch: one task per pair, on the pair's own worker
+            parts = [(key, points, key) for key, points in groups.items()]
+        else:
+            # Chunks sized so that every worker gets work
+            chunk = max(8, -(-total // (self.size * 2)))
+            parts = [(key, points[start:start + chunk], None)
+                     for key, points in groups.items() for start in range(0, len(points), chunk)]
+
+        # Back-pressure applies to the batch as a whole: once its first chunk
+        # is accepted, the rest is queued even past the per-worker limit
+        futures = []
+        for i, (key, part, route) in enumerate(parts):
+            futures.append((part, self.submit("points", key + (part, transport), key=route, force=i > 0)))
+        out = []
+        for part, future in futures:
+            try:
+                out.extend(future.result(timeout=CEA_WORKER_TIMEOUT))
+            except Exception as e:
+                out.extend((p[0], ERR_CEA_FAILURE, f"worker failed: {e}", None) for p in part)
+        return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.size,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "per_worker": [
+                    {"index": w.index, "alive": bool(w.process and w.process.is_alive()),
+                     "pending": len(w.pending), "done": w.done, "restarts": w.restarts}
+                    for w in self._workers
+                ],
+            }
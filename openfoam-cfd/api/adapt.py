@@ -0,0 +1,88 @@
+"""
+Solution-adaptive node redistribution
+
+One adapt cycle: a coarse solve, a gradient/shock sensor on its Mach and
+pressure fields, then node positions redistributed by equidistribution of
+the sensor (cells shrink where it is high) and a re-solve on the adapted
+grid, warm-started from the coarse field.
+"""
+
+import numpy as np
+from typing import Dict, Tuple
+
+# Coarse pass resolution = requested nx/ny divided by this
+ADAPT_COARSEN = 2
+# Monitor = 1 + strength * normalized sensor: largest/smallest cell ~ 1 + strength
+ADAPT_STRENGTH = 4.0
+# [1 2 1] smoothing passes on the monitor, keeps neighbouring cell sizes close
+ADAPT_SMOOTHING = 4
+# Most adapt cycles a request may ask for (each one is a full re-solve)
+ADAPT_MAX_CYCLES = 3
+
+
+def shock_sensor(x: np.ndarray, eta: np.ndarray, mach: np.ndarray, pressure: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Axial and radial sensors of fields given on an (nx, ny) grid
+    x: (nx,) axial node positions, eta: (ny,) radial positions normalized to [0, 1]
+    Each sensor is the largest gradient of Mach and ln(p) across the other
+    direction, every term scaled by its own maximum, so a shock counts as
+    much as the throat expansion.
+    """
+    log_p = np.log(np.maximum(pressure, 1e-12))
+    axial = np.zeros(len(x))
+    radial = np.zeros(len(eta))
+    for field in (mach, log_p):
+        if len(x) > 1:
+            gx = np.abs(np.gradient(field, x, axis=0)).max(axis=1)
+            axial += gx / gx.max() if gx.max() > 0 else 0.0
+        if len(eta) > 1:
+            gr = np.abs(np.gradient(field, eta, axis=1)).max(axis=0)
+            radial += gr / gr.max() if gr.max() > 0 else 0.0
+    return axial, radial
+
+
+def equidistribute(s: np.ndarray, sensor: np.ndarray, n_nodes: int, strength: float = ADAPT_STRENGTH,
+                   smoothing: int = ADAPT_SMOOTHING) -> np.ndarray:
+    """
+    n_nodes positions spanning s[0]..s[-1] with equal integral of the monitor
+    1 + strength * sensor / max(sensor) between neighbours
+    """
+    w = np.asarray(sensor, dtype=np.float64)
+    w = w / w.max() if w.max() > 0 else np.zeros_like(w)
+    for _ in range(smoothing):
+        w[1:-1] = 0.25 * w[:-2] + 0.5 * w[1:-1] + 0.25 * w[2:]
+    monitor = 1.0 + strength * w
+    # Cumulative trapezoid of the monitor, inverted by interpolation
+    cumulative = np.concatenate(([0.0], np.cumsum(0.5 * (monitor[1:] + monitor[:-1]) * np.diff(s))))
+    nodes = np.interp(np.linspace(0.0, cumulative[-1], n_nodes), cumulative, s)
+    nodes[0], nodes[-1] = s[0], s[-1]
+    return nodes
+
+
+def adapted_nodes(result: Dict, nx: int, ny: int, strength: float = ADAPT_STRENGTH) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Adapted axial positions (nx) and normalized radial positions (ny) from a
+    result with x-major structured fields ("x", "r", "mach", "pressure", "nx", "ny")
+    """
+    cnx, cny = int(result["nx"]), int(result["ny"])
+    x = np.asarray(result["x"], dtype=np.float64).reshape(cnx, cny)[:, 0]
+    r = np.asarray(result["r"], dtype=np.float64).reshape(cnx, cny)
+    r_top = r[:, -1:]
+    eta = np.mean(np.divide(r, r_top, out=np.zeros_like(r), where=r_top > 0), axis=0)
+    mach = np.asarray(result["mach"], dtype=np.float64).reshape(cnx, cny)
+    pressure = np.asarray(result["pressure"], dtype=np.float64).reshape(cnx, cny)
+
+    axial, radial = shock_sensor(x, eta, mach, pressure)
+    return equidistribute(x, axial, nx, strength), equidistribute(eta, radial, ny, strength)
+
+
+def coarse_params(params: Dict) -> Dict:
+    """Parameters of the coarse pass of an adapt cycle"""
+    return dict(params, nx=max(8, int(params["nx"]) // ADAPT_COARSEN),
+                ny=max(4, int(params["ny"]) // ADAPT_COARSEN))
+
+
+def cell_ratio(nodes: np.ndarray) -> float:
+    """Largest/smallest spacing of a node distribution"""
+    d = np.diff(nodes)
+    return float(d.max() / d.min()) if len(d) and d.min() > 0 else 1.0
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Cost model for CFD jobs
+Predicts peak RSS, disk footprint and wall time of a request on both
+backends from the effective mesh size. Each quantity is a straight line
+in the number of cells, starting from built-in priors and refitted on
+the telemetry of finished jobs.
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from adapt import coarse_params
+from multiblock import layout_cells
+
+
+BACKENDS = ("openfoam", "python")
+TARGETS = ("peak_rss", "disk", "wall")
+
+# Minimum mesh written by generate_openfoam_case
+OPENFOAM_MIN_NX = 80
+OPENFOAM_MIN_NY = 40
+
+# Wall time of the mapFields warm start after adapt cycles, as a fraction
+# of one rhoCentralFoam run on the same mesh
+MAPFIELDS_COST = 0.05
+
+# Samples of a (backend, target) pair needed before the fit replaces the prior
+MIN_SAMPLES = 5
+# Telemetry records kept on disk and used for fitting
+MAX_RECORDS = 500
+
+# Priors: (intercept, slope per cell). OpenFOAM wall time matches the
+# README timings (100x50 ~30s, 200x100 ~2min, 500x200 ~10min); memory and
+# disk are rhoCentralFoam's ~1.5 kB/cell plus ASCII fields for the kept
+# time directories and the JSON result. Python numbers were measured on
+# the in-process solver.
+PRIORS = {
+    "openfoam": {
+        "peak_rss": (150e6, 1500.0),
+        "disk": (1e6, 2500.0),
+        "wall": (5.0, 6e-3),
+    },
+    "python": {
+        "peak_rss": (1e6, 250.0),
+        "disk": (1e3, 140.0),
+        "wall": (0.01, 1.5e-6),
+    },
+}
+
+# Safety margins applied when checking a prediction against a limit
+MEMORY_HEADROOM = 0.8
+DISK_HEADROOM = 0.9
+# Wall-time budget of one job [s]: admission limit, and timeout of its OpenFOAM utilities
+MAX_WALL_SECONDS = float(os.environ.get("CFD_MAX_WALL_SECONDS", "3600"))
+
+
+def mesh_size(params: dict, backend: str) -> Dict[str, int]:
+    """
+    Mesh actually solved for a request (OpenFOAM clamps to a minimum size
+    and, with mesh_layout "multiblock", solves fewer cells than nx * ny).
+    solved_cells adds the adapt cycles: the coarse pass, one solve on the
+    full mesh per cycle and, on OpenFOAM, the mapFields warm start.
+    """
+    nx, ny = int(params["nx"]), int(params["ny"])
+    coarse = coarse_params(params)
+    cnx, cny = int(coarse["nx"]), int(coarse["ny"])
+    cycles = int(params.get("adapt_cycles") or 0)
+    if backend == "openfoam":
+        nx, ny = max(OPENFOAM_MIN_NX, nx), max(OPENFOAM_MIN_NY, ny)
+        cnx, cny = max(OPENFOAM_MIN_NX, cnx), max(OPENFOAM_MIN_NY, cny)
+    if backend == "openfoam" and params.get("mesh_layout") == "multiblock" and not cycles:
+        cells = layout_cells(params, nx, ny)["cells"]
+    else:
+        cells = nx * ny
+    solved = cells
+    if cycles > 0:
+        solved = cnx * cny + cycles * cells
+        if backend == "openfoam":
+            solved += int(MAPFIELDS_COST * cells)
+    return {"nx": nx, "ny": ny, "cells": cells, "solved_cells": solved}
+
+
+def container_memory_limit() -> Optional[int]:
+    """Memory limit [bytes] from CFD_MEMORY_LIMIT_MB or the cgroup, if any"""
+    env = os.environ.get("CFD_MEMORY_LIMIT_MB")
+    if env:
+        return int(float(env) * 1024**2)
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+@dataclass
+class Line:
+    """y = intercept + slope * cells"""
+    intercept: float
+    slope: float
+    samples: int = 0
+    calibrated: bool = False
+
+    def __call__(self, cells: float) -> float:
+        return self.intercept + self.slope * cells
+
+    def inverse(self, y: float) -> float:
+        """Largest cell count whose prediction stays below y"""
+        if self.slope <= 0:
+            return math.inf if y >= self.intercept else 0.0
+        return max(0.0, (y - self.intercept) / self.slope)
+
+
+def fit_line(xs: List[float], ys: List[float], prior: Line) -> Line:
+    """Least-squares line; falls back to the prior when the data is degenerate"""
+    n = len(xs)
+    if n < MIN_SAMPLES:
+        return Line(prior.intercept, prior.slope, n, False)
+    mx = sum(xs) / n
+    my = sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx <= 0:
+        # All jobs on the same mesh: keep the prior slope, move the intercept
+        return Line(max(0.0, my - prior.slope * mx), prior.slope, n, True)
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    if slope <= 0:
+        return Line(prior.intercept, prior.slope, n, False)
+    intercept = max(0.0, my - slope * mx)
+    return Line(intercept, slope, n, True)
+
+
+class CostModel:
+    """Telemetry-calibrated cost predictions"""
+
+    def __init__(self, telemetry_file: Path):
+        self.telemetry_file = telemetry_file
+        self.records: List[Dict] = []
+        self.lines: Dict[str, Dict[str, Line]] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._refit()
+
+    # ------------------------------------------------------------------
+    # Telemetry
+    # ------------------------------------------------------------------
+    def _load(self):
+        if not self.telemetry_file.exists():
+            return
+        try:
+            with open(self.telemetry_file) as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            print(f"[CostModel] warning: cannot read {self.telemetry_file}: {e}")
+        self.records = self.records[-MAX_RECORDS:]
+
+    def record(self, backend: str, params: dict, wall: float, peak_rss: int, disk: int):
+        """Store the measured cost of a finished job and refit"""
+        mesh = mesh_size(params, backend)
+        rec = {
+            "timestamp": time.time(),
+            "backend": backend,
+            "nx": mesh["nx"],
+            "ny": mesh["ny"],
+            "cells": mesh["cells"],
+            "solved_cells": mesh["solved_cells"],
+            "wall": round(wall, 3),
+            "peak_rss": int(peak_rss),
+            "disk": int(disk),
+        }
+        with self._lock:
+            self.records.append(rec)
+            try:
+                if len(self.records) > 2 * MAX_RECORDS:
+                    # Compact the file from time to time instead of growing forever
+                    self.records = self.records[-MAX_RECORDS:]
+                    tmp = self.telemetry_file.with_suffix(".tmp")
+                    with open(tmp, 'w') as f:
+                        f.writelines(json.dumps(r) + "\n" for r in self.records)
+                    os.replace(tmp, self.telemetry_file)
+                else:
+                    with open(self.telemetry_file, 'a') as f:
+                        f.write(json.dumps(rec) + "\n")
+            except OSError as e:
+                print(f"[CostModel] warning: cannot write telemetry: {e}")
+            self._refit()
+
+    def _refit(self):
+        lines = {}
+        recent = self.records[-MAX_RECORDS:]
+        for backend in BACKENDS:
+            lines[backend] = {}
+            for target in TARGETS:
+                prior = Line(*PRIORS[backend][target])
+                # Wall time follows every solve of the job, memory and disk the final mesh
+                size = "solved_cells" if target == "wall" else "cells"
+                points = [(r.get(size, r["cells"]), r[target]) for r in recent
+                          if r.get("backend") == backend and r.get(target, 0) > 0]
+                lines[backend][target] = fit_line([p[0] for p in points], [p[1] for p in points], prior)
+        self.lines = lines
+
+    # ------------------------------------------------------------------
+    # Predictions
+    # ------------------------------------------------------------------
+    def predict(self, params: dict, backend: str) -> Dict:
+        mesh = mesh_size(params, backend)
+        lines = self.lines[backend]
+        return dict(
+            mesh,
+            peak_rss=int(lines["peak_rss"](mesh["cells"])),
+            disk=int(lines["disk"](mesh["cells"])),
+            wall=round(lines["wall"](mesh["solved_cells"]), 3),
+        )
+
+    def limits(self, workers: int, disk_path: Path) -> Dict:
+        """Per-job budgets: memory is shared by the concurrent workers"""
+        memory = container_memory_limit()
+        try:
+            disk_free = shutil.disk_usage(disk_path).free
+        except OSError:
+            disk_free = None
+        return {
+            "peak_rss": int(memory * MEMORY_HEADROOM / max(1, workers)) if memory else None,
+            "disk": int(disk_free * DISK_HEADROOM) if disk_free is not None else None,
+            "wall": MAX_WALL_SECONDS,
+        }
+
+    def admit(self, params: dict, backend: str, limits: Dict, allow_downscale: bool = True) -> Dict:
+        """
+        Check a request against the limits. Returns the decision
+        ("accepted", "downscaled" or "rejected"), the prediction and,
+        when downscaled, the reduced nx/ny keeping the aspect ratio.
+        """
+        prediction = self.predict(params, backend)
+        over = [t for t in TARGETS if limits.get(t) is not None and prediction[t] > limits[t]]
+        decision = {"decision": "accepted", "prediction": prediction, "limits": limits,
+                    "exceeded": over}
+        if not over:
+            return decision
+
+        # Wall limits bound the solved cells, which grow in proportion to the mesh
+        work = prediction["solved_cells"] / prediction["cells"]
+        max_cells = min(self.lines[backend][t].inverse(limits[t]) / (work if t == "wall" else 1.0)
+                        for t in over)
+        min_cells = (mesh_size(dict(params, nx=OPENFOAM_MIN_NX, ny=OPENFOAM_MIN_NY), backend)["cells"]
+                     if backend == "openfoam" else 4)
+        if not allow_downscale or max_cells < min_cells:
+            decision["decision"] = "rejected"
+            return decision
+
+        scale = math.sqrt(max_cells / prediction["cells"])
+        nx = max(2, int(params["nx"] * scale))
+        ny = max(2, int(params["ny"] * scale))
+        if backend == "openfoam":
+            nx, ny = max(OPENFOAM_MIN_NX, nx), max(OPENFOAM_MIN_NY, ny)
+            # The clamp may push one direction back up: trim the other one
+            cells = lambda: mesh_size(dict(params, nx=nx, ny=ny), backend)["cells"]
+            while cells() > max_cells and nx > OPENFOAM_MIN_NX:
+                nx -= 1
+            while cells() > max_cells and ny > OPENFOAM_MIN_NY:
+                ny -= 1
+        decision["decision"] = "downscaled"
+        decision["nx"] = nx
+        decision["ny"] = ny
+        decision["prediction"] = self.predict(dict(params, nx=nx, ny=ny), backend)
+        return decision
+
+    def status(self) -> Dict:
+        return {
+            "records": len(self.records),
+            "telemetry_file": str(self.telemetry_file),
+            "models": {
+                backend: {target: asdict(line) for target, line in targets.items()}
+                for backend, targets in self.lines.items()
+            },
+        }
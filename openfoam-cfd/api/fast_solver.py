@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Fast quasi-1D nozzle solution
+Inverts the isentropic area-Mach relation along the nozzle contour for
+the whole x-array at once (safeguarded Newton, subsonic upstream of the
+throat, supersonic downstream) and broadcasts it over the radial grid.
+Used by /api/cfd/solve (interactive preview) and the Python backend.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from adapt import adapted_nodes, coarse_params, ADAPT_STRENGTH
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+NEWTON_MAX_ITER = 50
+NEWTON_TOL = 1e-10
+M_MIN = 1e-6
+M_MAX = 100.0
+
+# Parameters that change the solution (solver settings do not)
+GEOMETRY_KEYS = ("r_throat", "r_chamber", "r_exit", "l_chamber", "l_nozzle",
+                 "p_chamber", "p_ambient", "t_chamber", "gamma", "molar_mass", "nx", "ny",
+                 "adapt_cycles", "adapt_strength")
+
+
+def nozzle_radius(x: np.ndarray, r_chamber: float, r_throat: float, r_exit: float,
+                  l_chamber: float, l_nozzle: float) -> np.ndarray:
+    """Wall radius along x, same contour as the OpenFOAM blockMeshDict"""
+    t_conv = np.clip((x - 0.8 * l_chamber) / (0.2 * l_chamber), 0.0, 1.0)
+    t_div = np.clip((x - l_chamber) / l_nozzle, 0.0, 1.0)
+    converging = r_throat + (r_chamber - r_throat) * 0.5 * (1 + np.cos(t_conv * np.pi))
+    diverging = r_throat + (r_exit - r_throat) * t_div
+    return np.where(x <= l_chamber, converging, diverging)
+
+
+def area_mach(area_ratio: np.ndarray, gamma: float, supersonic: np.ndarray,
+              M0: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Mach number from A/A* for every point at once.
+    Newton on ln(A/A*) with a per-point bisection bracket [M_MIN, 1] or
+    [1, M_MAX]; a step leaving the bracket falls back to its midpoint.
+    M0 (e.g. a coarser solution) replaces the asymptotic starting points.
+    """
+    ratio = np.maximum(np.asarray(area_ratio, dtype=np.float64), 1.0)
+    supersonic = np.broadcast_to(supersonic, ratio.shape)
+    k = 0.5 * (gamma - 1)
+    e = (gamma + 1) / (2 * (gamma - 1))
+    target = np.log(ratio)
+
+    lo = np.where(supersonic, 1.0, M_MIN)
+    hi = np.where(supersonic, M_MAX, 1.0)
+    # Starting points from the low-speed and high-expansion asymptotes
+    c = 2 / (gamma + 1)
+    M_sub = c ** e / ratio
+    M_sup = (ratio / (c * k) ** e) ** (1 / (2 * e - 1))
+    M = np.where(supersonic, np.clip(M_sup, 1.01, M_MAX), np.clip(M_sub, M_MIN, 0.99))
+    if M0 is not None:
+        M = np.where(supersonic, np.clip(M0, 1.01, M_MAX), np.clip(M0, M_MIN, 0.99))
+
+    for _ in range(NEWTON_MAX_ITER):
+        t = 1 + k * M * M
+        f = -np.log(M) + e * np.log(2 * t / (gamma + 1)) - target
+        # f increases with M on the supersonic branch, decreases on the subsonic one
+        below = np.where(supersonic, f < 0, f > 0)
+        lo = np.where(below, M, lo)
+        hi = np.where(below, hi, M)
+        df = (M * M - 1) / (M * t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(df != 0, f / df, 0.0)
+        M_new = M - step
+        outside = ~((M_new > lo) & (M_new < hi)) | ~np.isfinite(M_new)
+        M_new = np.where(outside, 0.5 * (lo + hi), M_new)
+        if np.max(np.abs(M_new - M)) < NEWTON_TOL:
+            M = M_new
+            break
+        M = M_new
+    return np.where(ratio <= 1.0, 1.0, M)
+
+
+def solve_fields(params: dict, shock_diamonds: bool = False, x: Optional[np.ndarray] = None,
+                 eta: Optional[np.ndarray] = None, warm: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Quasi-1D isentropic fields on the (nx, ny) grid used by the preview
+    x / eta: axial node positions and radial positions normalized to [0, 1]
+    (uniform by default); warm: a solution on another grid whose Mach
+    number starts the Newton iterations.
+    """
+    nx = int(params["nx"])
+    ny = int(params["ny"])
+    gamma = params["gamma"]
+    R_gas = 8314.0 / (params["molar_mass"] * 1000)
+    p_chamber = params["p_chamber"]
+    t_chamber = params["t_chamber"]
+    r_throat = params["r_throat"]
+    r_exit = params["r_exit"]
+    l_chamber = params["l_chamber"]
+    l_nozzle = params["l_nozzle"]
+
+    x = np.linspace(0, l_chamber + l_nozzle, nx) if x is None else np.asarray(x, dtype=np.float64)
+    r = r_exit * (np.linspace(0, 1, ny) if eta is None else np.asarray(eta, dtype=np.float64))
+
+    M0 = None
+    if warm is not None:
+        warm_x = np.asarray(warm["x"]).reshape(-1, warm["ny"])[:, 0]
+        warm_mach = np.asarray(warm["mach"]).reshape(-1, warm["ny"]).mean(axis=1)
+        M0 = np.interp(x, warm_x, warm_mach)
+
+    radius = nozzle_radius(x, params["r_chamber"], r_throat, r_exit, l_chamber, l_nozzle)
+    M = area_mach((radius / r_throat) ** 2, gamma, x > l_chamber, M0)
+
+    T_ratio = 1 + (gamma - 1) / 2 * M * M
+    temperature_1d = t_chamber / T_ratio
+    pressure_1d = p_chamber / T_ratio ** (gamma / (gamma - 1))
+
+    shape = (nx, ny)
+    mach = np.repeat(M[:, None], ny, axis=1)
+    if shock_diamonds:
+        # Oscillating pattern near the exit, fading away from the axis
+        phase = (x - l_chamber - l_nozzle) / 0.02
+        zone = x > l_chamber + l_nozzle * 0.9
+        effect = 0.1 * np.sin(phase * np.pi)[:, None] * np.exp(-2 * r / r_exit)[None, :]
+        mach = mach * np.where(zone[:, None], 1 + effect, 1.0)
+
+    temperature = np.repeat(temperature_1d[:, None], ny, axis=1)
+    pressure = np.repeat(pressure_1d[:, None], ny, axis=1)
+    rho = pressure / (R_gas * temperature)
+    vel_x = mach * np.sqrt(gamma * R_gas * temperature)
+
+    return {
+        "x": np.repeat(x, ny),
+        "r": np.tile(r, nx),
+        "pressure": pressure.ravel(),
+        "temperature": temperature.ravel(),
+        "mach": mach.ravel(),
+        "velocity_x": vel_x.ravel(),
+        "velocity_r": np.zeros(shape).ravel(),
+        "density": rho.ravel(),
+    }
+
+
+def solve_fields_adaptive(params: dict, shock_diamonds: bool = False) -> Dict[str, np.ndarray]:
+    """
+    solve_fields with params["adapt_cycles"] adapt cycles: a coarse solve,
+    then each cycle redistributes the nx/ny nodes on the sensor of the
+    previous solution and re-solves warm-started from it
+    """
+    cycles = int(params.get("adapt_cycles") or 0)
+    if cycles <= 0:
+        return solve_fields(params, shock_diamonds)
+    strength = params.get("adapt_strength")
+    if strength is None:
+        strength = ADAPT_STRENGTH
+    nx, ny = int(params["nx"]), int(params["ny"])
+    coarse = coarse_params(params)
+    fields = dict(solve_fields(coarse, shock_diamonds), nx=coarse["nx"], ny=coarse["ny"])
+    for _ in range(cycles):
+        x, eta = adapted_nodes(fields, nx, ny, strength)
+        fields = dict(solve_fields(params, shock_diamonds, x=x, eta=eta, warm=fields), nx=nx, ny=ny)
+    del fields["nx"], fields["ny"]
+    return fields
+
+
+def geometry_key(params: dict) -> str:
+    """Stable hash of everything that affects the solution"""
+    payload = json.dumps({k: params.get(k) for k in GEOMETRY_KEYS}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def encode_json(result: dict, pretty: bool = False) -> bytes:
+    """JSON bytes for a result dict holding numpy arrays or plain lists"""
+    if HAS_ORJSON:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(result, option=option)
+    # Nested arrays and numpy scalars too (monitor series)
+    return json.dumps(result, indent=2 if pretty else None, default=lambda v: v.tolist()).encode()
+
+
+class EncodedCache:
+    """LRU of encoded responses, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
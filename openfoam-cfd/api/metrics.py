@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the CFD service
+Phase timings are recorded with span(), which observes a histogram and
+keeps the duration in the job's own "timings" dict. Gauges describing
+the current state (jobs, queue, runners) are refreshed at scrape time.
+"""
+
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+)
+
+
+# Solver phases span from sub-second (case generation) to tens of minutes
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+JOB_STATES = ("pending", "running", "completed", "failed")
+
+PHASE_SECONDS = Histogram(
+    "cfd_phase_seconds", "Duration of job phases",
+    ["phase", "backend"], buckets=PHASE_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "cfd_queue_wait_seconds", "Time between submission and start of a job",
+    ["backend"], buckets=PHASE_BUCKETS
+)
+JOBS_FINISHED = Counter(
+    "cfd_jobs_finished_total", "Finished jobs by backend and outcome",
+    ["backend", "outcome"]
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"]
+)
+JOBS = Gauge("cfd_jobs", "Jobs currently known to the service by state", ["state"])
+QUEUE_DEPTH = Gauge("cfd_queue_depth", "Jobs waiting for a worker")
+WORKERS_BUSY = Gauge("cfd_workers_busy", "Workers currently running a job")
+RUNNERS_BUSY = Gauge("cfd_runners_busy", "OpenFOAM runners currently held by a job")
+SOLVER_RSS = Gauge("cfd_solver_resident_memory_bytes", "Resident memory of the OpenFOAM utilities")
+
+
+@contextmanager
+def span(phase: str, backend: str, timings: Optional[Dict] = None, job_id: str = None):
+    """Time a block; failures are recorded too, under the same phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.labels(phase, backend).observe(elapsed)
+        if timings is not None:
+            timings[phase] = round(timings.get(phase, 0.0) + elapsed, 4)
+        if job_id:
+            print(f"[Span] job={job_id} backend={backend} phase={phase} seconds={elapsed:.3f}")
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render(jobs: Dict[str, Dict], queue_depth: int, workers_busy: int,
+           runners_busy: int, solver_rss: Callable[[], int]) -> bytes:
+    """Refresh the state gauges and encode the default registry"""
+    states = Tally(job.get("status") for job in jobs.values())
+    for state in JOB_STATES:
+        JOBS.labels(state).set(states.get(state, 0))
+    QUEUE_DEPTH.set(queue_depth)
+    WORKERS_BUSY.set(workers_busy)
+    RUNNERS_BUSY.set(runners_busy)
+    SOLVER_RSS.set(solver_rss())
+    return generate_latest()
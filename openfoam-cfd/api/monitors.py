@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Time series of the OpenFOAM job monitors
+case_templates.write_monitors adds function objects to each case; they
+append to <case>/postProcessing while the solver runs:
+  - probes/<t>/{p,T,U,Ma}: values at the throat and exit probes
+  - lines/<t>/axis_*.xy, wall_*.xy: samples along the axis and the wall
+  - massFlow, momentum, pressureForce/<t>/surfaceFieldValue.dat: exit-plane
+    integrals over the wedge (scaled to the full nozzle here)
+Finished jobs keep a copy in <result>/monitors (copy_monitors), so the
+series outlive the case directory.
+"""
+
+import json
+import math
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+MONITORS_SUBDIR = "monitors"
+META_FILE = "monitors.json"
+PROBE_FIELDS = ("p", "T", "U", "Ma")
+VECTOR_FIELDS = ("U",)
+
+
+def monitor_dir(case_dir: Path, result_dir: Path) -> Optional[Path]:
+    """Directory holding the monitor outputs and monitors.json: saved copy, else the live case"""
+    saved = result_dir / MONITORS_SUBDIR
+    if (saved / META_FILE).exists():
+        return saved
+    if (case_dir / "system" / META_FILE).exists():
+        return case_dir / "postProcessing"
+    return None
+
+
+def read_meta(directory: Path) -> Dict:
+    for path in (directory / META_FILE, directory.parent / "system" / META_FILE):
+        if path.exists():
+            with open(path) as f:
+                return json.load(f)
+    return {}
+
+
+def copy_monitors(case_dir: Path, result_dir: Path) -> int:
+    """Copy postProcessing and monitors.json of a case to <result>/monitors. Returns bytes copied."""
+    meta = case_dir / "system" / META_FILE
+    if not meta.exists():
+        return 0
+    target = result_dir / MONITORS_SUBDIR
+    source = case_dir / "postProcessing"
+    if source.exists():
+        shutil.copytree(source, target, dirs_exist_ok=True)
+    target.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(meta, target / META_FILE)
+    return sum(p.stat().st_size for p in target.rglob("*") if p.is_file())
+
+
+def _time_dirs(directory: Path) -> List[Path]:
+    """Start-time subdirectories (one per run or restart), in time order"""
+    out = []
+    if directory.exists():
+        for d in directory.iterdir():
+            try:
+                out.append((float(d.name), d))
+            except ValueError:
+                continue
+    return [d for _, d in sorted(out, key=lambda t: t[0])]
+
+
+def read_table(path: Path) -> np.ndarray:
+    """Rows of an OpenFOAM function object file ('#' comments, vectors in parentheses)"""
+    with open(path, "rb") as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith(b"#")]
+    if not lines:
+        return np.empty((0, 0))
+    width = len(lines[0].translate(None, b"()").split())
+    values = np.fromstring(b" ".join(lines).translate(None, b"()"), sep=" ")
+    return values[:len(values) // width * width].reshape(-1, width)
+
+
+def _series(directory: Path, name: str) -> np.ndarray:
+    """Table of one output file across all start times, without repeated times"""
+    tables = [read_table(d / name) for d in _time_dirs(directory) if (d / name).exists()]
+    tables = [t for t in tables if len(t)]
+    if not tables:
+        return np.empty((0, 0))
+    table = np.concatenate(tables) if len(tables) > 1 else tables[0]
+    # A restart rewrites the times after its start: keep the last value of each time
+    _, last = np.unique(table[::-1, 0], return_index=True)
+    return table[len(table) - 1 - last]
+
+
+def read_probes(directory: Path, meta: Dict) -> Dict:
+    """{"time": [...], "probes": {name: {field: series}}}; vector fields as (n, 3)"""
+    names = meta.get("probes", [])
+    out = {"time": np.empty(0), "probes": {name: {} for name in names}}
+    for field in PROBE_FIELDS:
+        table = _series(directory / "probes", field)
+        if not table.size or not names:
+            continue
+        out["time"] = np.ascontiguousarray(table[:, 0])
+        components = (table.shape[1] - 1) // len(names)
+        for k, name in enumerate(names):
+            values = table[:, 1 + k * components:1 + (k + 1) * components]
+            out["probes"][name][field] = np.ascontiguousarray(values[:, 0] if components == 1 else values)
+    return out
+
+
+def read_exit(directory: Path, meta: Dict) -> Dict:
+    """Mass flow [kg/s] and thrust [N] through the exit plane, full nozzle"""
+    scale = meta.get("scale", 1.0)
+    mass = _series(directory / "massFlow", "surfaceFieldValue.dat")
+    momentum = _series(directory / "momentum", "surfaceFieldValue.dat")
+    pressure = _series(directory / "pressureForce", "surfaceFieldValue.dat")
+    out = {"time": np.ascontiguousarray(mass[:, 0]) if mass.size else np.empty(0),
+           "mass_flow": scale * mass[:, 1] if mass.size else np.empty(0)}
+    n = min(len(momentum), len(pressure))
+    if n:
+        # Thrust = momentum flux + (p - p_ambient) A, A the exit-plane area
+        area = math.pi * meta.get("plane_radius", 0.0) ** 2
+        out["thrust_time"] = np.ascontiguousarray(momentum[:n, 0])
+        out["thrust"] = scale * (momentum[:n, 1] + pressure[:n, 1]) - meta.get("p_ambient", 0.0) * area
+    return out
+
+
+def read_lines(directory: Path, time: Optional[str] = None) -> Dict:
+    """Samples of the axis and wall lines at one sample time (latest by default)"""
+    times = _time_dirs(directory / "lines")
+    out = {"times": [d.name for d in times], "time": None, "lines": {}}
+    if not times:
+        return out
+    chosen = next((d for d in times if d.name == time), None) if time else times[-1]
+    if chosen is None:
+        raise KeyError(time)
+    out["time"] = chosen.name
+    for path in sorted(chosen.glob("*.xy")):
+        # <set>_<field>_<field>....xy, columns: x then the fields (vectors: 3 columns)
+        line, *fields = path.stem.split("_")
+        table = read_table(path)
+        if not table.size:
+            continue
+        # Columns as contiguous arrays (served as JSON)
+        table = np.asfortranarray(table)
+        samples = out["lines"].setdefault(line, {"x": table[:, 0]})
+        column = 1
+        for field in fields:
+            width = 3 if field in VECTOR_FIELDS else 1
+            samples[field] = table[:, column] if width == 1 else np.ascontiguousarray(table[:, column:column + width])
+            column += width
+    return out
+
+
+def summary(directory: Path, meta: Dict) -> Dict:
+    """Latest probe and exit values plus the mass-flow drift, for monitoring and convergence checks"""
+    probes = read_probes(directory, meta)
+    exit_values = read_exit(directory, meta)
+    latest = {name: {field: np.asarray(values[-1]).tolist() for field, values in fields.items() if len(values)}
+              for name, fields in probes["probes"].items()}
+    out = {
+        "samples": len(probes["time"]),
+        "time": float(probes["time"][-1]) if len(probes["time"]) else None,
+        "probes": latest,
+        "line_times": [d.name for d in _time_dirs(directory / "lines")],
+    }
+    mass = exit_values["mass_flow"]
+    if len(mass):
+        out["mass_flow"] = float(mass[-1])
+        # Relative change of the mass flow over the last tenth of the samples
+        window = mass[-max(2, len(mass) // 10):]
+        out["mass_flow_drift"] = float(abs(window[-1] - window[0]) / max(abs(window[-1]), 1e-30))
+    if len(exit_values.get("thrust", ())):
+        out["thrust"] = float(exit_values["thrust"][-1])
+    return out
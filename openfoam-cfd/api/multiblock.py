@@ -0,0 +1,103 @@
+"""
+Multi-block layout of the OpenFOAM nozzle mesh
+The single-block mesh runs ny radial cells from inlet to far-field, so the
+plume gets the radial resolution of the throat. The multi-block layout
+splits the domain into four structured blocks with conformal interfaces:
+
+    +------------------+-------------------------------+ farfield_radius
+    |                  |           farfield            |
+    |                  +-------------------------------+ r_exit
+    | chamber | nozzle |             plume             |
+    +---------+--------+-------------------------------+ axis
+    0     l_chamber  x_exit                          x_end
+
+- chamber, nozzle: the cells of the single-block mesh over the same length,
+  graded towards the throat
+- plume: starts at the nozzle exit cell size and grows downstream
+  (plume_grading = last / first cell)
+- farfield: ambient air above the jet, starts at the size of the plume's
+  top cell and grows outwards (farfield_grading), with its own ny
+
+chamber, nozzle and plume share the radial nodes; plume and farfield share
+the axial nodes. The plume region is a cylinder of farfield_radius (the
+single block narrows to a cone); the farfield face at x_exit is a wall
+(nozzle lip).
+"""
+
+import math
+from typing import Dict
+
+# Plume length and far-field radius, in nozzle exit radii
+FARFIELD_LENGTH = 8.0
+FARFIELD_RADIUS = 3.0
+# Last/first axial plume cell
+PLUME_GRADING = 4.0
+# Outer/inner radial farfield cell
+FARFIELD_GRADING = 8.0
+
+LAYOUTS = ("single", "multiblock")
+
+
+def first_cell(length: float, n_cells: int, expansion: float) -> float:
+    """Size of the first cell of a block graded by expansion (last / first cell)"""
+    if n_cells <= 1 or expansion == 1.0:
+        return length / max(1, n_cells)
+    return length / sum(expansion ** (k / (n_cells - 1)) for k in range(n_cells))
+
+
+def cells_for(length: float, first: float, expansion: float) -> int:
+    """Number of cells of a graded block whose first cell is about first"""
+    mean = (expansion - 1.0) / math.log(expansion) if expansion != 1.0 else 1.0
+    return max(1, int(round(length / (first * mean))))
+
+
+def block_layout(params: dict, nx: int, ny: int) -> Dict:
+    """
+    Blocks of the multi-block mesh for a single-block size of nx x ny cells
+    Each block: x0/x1, r0/r1 (None = nozzle contour), nx, ny and the
+    expansion ratios x_grading (axial) and r_grading (radial).
+    """
+    l_chamber = params["l_chamber"]
+    x_exit = l_chamber + params["l_nozzle"]
+    r_exit = params["r_exit"]
+    x_end = x_exit + FARFIELD_LENGTH * r_exit
+    farfield_radius = FARFIELD_RADIUS * r_exit
+    throat = params.get("throat_grading", 1.0) or 1.0
+    radial = params.get("radial_grading", 3.0) or 1.0
+    plume_grading = params.get("plume_grading") or PLUME_GRADING
+    farfield_grading = params.get("farfield_grading") or FARFIELD_GRADING
+
+    # Chamber and nozzle keep the single-block cell count over their length
+    nx_chamber = max(2, int(round(nx * l_chamber / x_end)))
+    nx_nozzle = max(2, int(round(nx * params["l_nozzle"] / x_end)))
+    nozzle_exit_cell = first_cell(x_exit - l_chamber, nx_nozzle, throat) * throat
+    nx_plume = cells_for(x_end - x_exit, nozzle_exit_cell, plume_grading)
+
+    top_cell = first_cell(r_exit, ny, radial) * radial
+    ny_farfield = cells_for(farfield_radius - r_exit, top_cell, farfield_grading)
+
+    blocks = {
+        "chamber": dict(x0=0.0, x1=l_chamber, r0=0.0, r1=None, nx=nx_chamber, ny=ny,
+                        x_grading=1.0 / throat, r_grading=radial),
+        "nozzle": dict(x0=l_chamber, x1=x_exit, r0=0.0, r1=None, nx=nx_nozzle, ny=ny,
+                       x_grading=throat, r_grading=radial),
+        "plume": dict(x0=x_exit, x1=x_end, r0=0.0, r1=r_exit, nx=nx_plume, ny=ny,
+                      x_grading=plume_grading, r_grading=radial),
+        "farfield": dict(x0=x_exit, x1=x_end, r0=r_exit, r1=farfield_radius, nx=nx_plume, ny=ny_farfield,
+                         x_grading=plume_grading, r_grading=farfield_grading),
+    }
+    for block in blocks.values():
+        block["cells"] = block["nx"] * block["ny"]
+    return blocks
+
+
+def layout_cells(params: dict, nx: int, ny: int) -> Dict:
+    """Cell count of the multi-block layout against the single block of nx x ny cells"""
+    blocks = block_layout(params, nx, ny)
+    cells = sum(block["cells"] for block in blocks.values())
+    return {
+        "cells": cells,
+        "single_block_cells": nx * ny,
+        "savings": round(1.0 - cells / (nx * ny), 4),
+        "blocks": {name: {k: block[k] for k in ("nx", "ny", "cells")} for name, block in blocks.items()},
+    }
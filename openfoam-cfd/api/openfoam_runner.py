@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Persistent OpenFOAM runner processes
+One long-lived bash shell per worker slot, with the OpenFOAM environment
+sourced once. Utilities are sent over the shell's stdin and their output is
+streamed to a per-job log file.
+"""
+
+import asyncio
+import os
+import shlex
+import signal
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+
+OPENFOAM_BASHRC = os.environ.get("OPENFOAM_BASHRC", "/usr/lib/openfoam/openfoam2312/etc/bashrc")
+
+# Lines kept in memory for error messages (the full output goes to the log file)
+TAIL_LINES = 50
+
+# Period of the memory sampler while a command runs [s]
+RSS_SAMPLE_INTERVAL = 0.5
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_group_rss(pgid: int, exclude: int = None) -> int:
+    """Resident memory [bytes] of every process in a process group (Linux /proc)"""
+    total = 0
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except FileNotFoundError:
+        return 0
+    for pid in pids:
+        if exclude is not None and int(pid) == exclude:
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # pgrp is the 3rd field after the parenthesised command name
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[2]) != pgid:
+                continue
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (FileNotFoundError, ProcessLookupError, IndexError, ValueError):
+            continue
+    return total
+
+
+@contextmanager
+def traced_peak(peak: list):
+    """
+    Peak memory [bytes] allocated inside the block, in peak[0]. Counts
+    allocations (numpy arrays included) rather than process RSS, which
+    the rest of the server and never-returned freed pages would skew.
+    The in-process solve holds the event loop, so only worker threads
+    can add to it.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        yield peak
+    finally:
+        peak[0] = max(peak[0], tracemalloc.get_traced_memory()[1] - base)
+        if not tracing:
+            tracemalloc.stop()
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one utility run on a runner"""
+    command: str
+    returncode: int
+    elapsed: float
+    log_file: Optional[Path]
+    tail: str
+    peak_rss: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class RunnerError(Exception):
+    """Raised when a runner shell cannot be started or dies mid-command"""
+
+
+class OpenFOAMRunner:
+    """
+    Long-lived bash process holding a sourced OpenFOAM environment.
+    Commands run in a subshell so `cd` never leaks between jobs; the exit
+    code is reported on a sentinel line unique to this runner.
+    """
+
+    def __init__(self, slot: int, bashrc: str = OPENFOAM_BASHRC):
+        self.slot = slot
+        self.bashrc = bashrc
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.commands_run = 0
+        self.started_at: Optional[float] = None
+        self._sentinel = f"__SITH_RUNNER_{uuid.uuid4().hex}__"
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Spawn the shell and source the OpenFOAM environment once"""
+        await self.stop()
+        self.process = await asyncio.create_subprocess_exec(
+            "/bin/bash", "--noprofile", "--norc",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True
+        )
+        self.started_at = time.time()
+        result = await self._execute(f"source {shlex.quote(self.bashrc)}", None, None, None)
+        if not result.ok:
+            await self.stop()
+            raise RunnerError(f"Runner {self.slot}: sourcing {self.bashrc} failed:\n{result.tail}")
+        print(f"[Runner {self.slot}] OpenFOAM environment ready (pid {self.process.pid})")
+
+    async def stop(self):
+        """Terminate the shell and anything it is still running"""
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                await self.process.wait()
+        self.process = None
+
+    async def run(self, command: str, case_dir: Path, log_file: Optional[Path] = None,
+                  on_line: Callable[[str], None] = None, timeout: float = None) -> CommandResult:
+        """Run one utility inside case_dir. Output is appended to log_file."""
+        async with self._lock:
+            if not self.alive:
+                await self.start()
+            shell_cmd = f"( cd {shlex.quote(str(case_dir))} && {command} ) < /dev/null 2>&1"
+            try:
+                result = await asyncio.wait_for(
+                    self._execute(shell_cmd, log_file, on_line, command), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                # The shell is mid-command: kill it, the next run restarts a fresh one
+                await self.stop()
+                raise RunnerError(f"{command} timed out after {timeout:.0f}s")
+            except asyncio.CancelledError:
+                # Same when the job is cancelled: never hand a busy shell back to the pool
+                await self.stop()
+                raise
+            self.commands_run += 1
+            return result
+
+    async def _execute(self, shell_cmd: str, log_file: Optional[Path],
+                       on_line: Callable[[str], None], label: Optional[str]) -> CommandResult:
+        label = label or shell_cmd
+        start = time.time()
+        tail = deque(maxlen=TAIL_LINES)
+        log = open(log_file, 'a') if log_file else None
+        peak = [0]
+        sampler = asyncio.create_task(self._sample_rss(peak))
+        try:
+            if log:
+                log.write(f"\n===== {label} ({time.strftime('%Y-%m-%d %H:%M:%S')}, runner {self.slot}) =====\n")
+            self.process.stdin.write(f"{shell_cmd}; echo \"{self._sentinel} $?\"\n".encode())
+            await self.process.stdin.drain()
+
+            returncode = None
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                line_str = line.decode(errors="replace").rstrip()
+                # Output without a trailing newline shares its line with the sentinel
+                line_str, found, status = line_str.partition(self._sentinel)
+                if found:
+                    returncode = int(status.split()[-1])
+                    if not line_str:
+                        break
+                tail.append(line_str)
+                if log:
+                    log.write(line_str + "\n")
+                if on_line:
+                    on_line(line_str)
+                if found:
+                    break
+
+            if returncode is None:
+                # Shell exited before reporting: treat as a crash of the runner itself
+                await self.stop()
+                returncode = -1
+                tail.append(f"[runner {self.slot}] shell exited unexpectedly")
+
+            elapsed = time.time() - start
+            if log:
+                log.write(f"===== exit code {returncode} after {elapsed:.2f}s, "
+                          f"peak RSS {peak[0] / 1e6:.0f} MB =====\n")
+            return CommandResult(label, returncode, elapsed, log_file, "\n".join(tail), peak[0])
+        except (BrokenPipeError, ConnectionResetError) as e:
+            await self.stop()
+            raise RunnerError(f"Runner {self.slot} pipe closed: {e}")
+        finally:
+            sampler.cancel()
+            if log:
+                log.close()
+
+    async def _sample_rss(self, peak: list):
+        """Track the peak resident memory of the utilities spawned by this shell"""
+        while self.alive:
+            pid = self.process.pid
+            peak[0] = max(peak[0], process_group_rss(pid, exclude=pid))
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+class RunnerPool:
+    """Fixed set of runners, one per worker slot"""
+
+    def __init__(self, size: int, bashrc: str = OPENFOAM_BASHRC):
+        self.size = max(1, size)
+        self.runners: List[OpenFOAMRunner] = [OpenFOAMRunner(i, bashrc) for i in range(self.size)]
+        self._idle: Optional[asyncio.Queue] = None
+
+    def _queue(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for runner in self.runners:
+                self._idle.put_nowait(runner)
+        return self._idle
+
+    @property
+    def busy(self) -> int:
+        return self.size - self._queue().qsize()
+
+    async def start(self):
+        """Warm every slot up front so the first job does not pay the source cost"""
+        self._queue()
+        results = await asyncio.gather(*(r.start() for r in self.runners if not r.alive),
+                                       return_exceptions=True)
+        for err in results:
+            if isinstance(err, Exception):
+                print(f"[RunnerPool] warning: {err}")
+
+    async def close(self):
+        await asyncio.gather(*(r.stop() for r in self.runners))
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Hold a runner for the duration of a job"""
+        queue = self._queue()
+        runner = await queue.get()
+        try:
+            yield runner
+        finally:
+            queue.put_nowait(runner)
+
+    def resident_memory(self) -> int:
+        """Resident memory [bytes] of the utilities currently running on all runners"""
+        return sum(process_group_rss(r.process.pid, exclude=r.process.pid)
+                   for r in self.runners if r.alive)
+
+    def status(self) -> list:
+        return [
+            {
+                "slot": r.slot,
+                "alive": r.alive,
+                "pid": r.process.pid if r.alive else None,
+                "commands_run": r.commands_run,
+                "uptime": round(time.time() - r.started_at, 1) if r.alive and r.started_at else 0.0
+            }
+            for r in self.runners
+        ]
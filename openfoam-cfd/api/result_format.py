@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Columnar result format (cfd_result.bin)
+Written by the API (write_result) and scripts/postprocess.py, served as is
+by /api/cfd/result/{job_id}?format=columnar.
+
+    b"CFDR" | version (u32) | header length (u32) | header (JSON) | columns
+
+The header holds the metadata (nx, ny, solver, residual_history, ...)
+and, per column, its dtype, length and offset from the start of the column
+data. Columns are little-endian and 8-byte aligned: read_columnar maps the
+file and returns views on it, no copy and no Python lists.
+"""
+
+import gzip
+import io
+import json
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+import numpy as np
+
+
+MAGIC = b"CFDR"
+VERSION = 1
+COLUMNAR_FILE = "cfd_result.bin"
+COLUMNAR_MEDIA_TYPE = "application/vnd.cfd-result"
+ALIGN = 8
+
+# Fields every result carries, nx * ny points each (x-major: index = i * ny + j)
+RESULT_FIELDS = ("x", "r", "pressure", "temperature", "mach", "velocity_x", "velocity_r", "density")
+
+
+def validate_result(result: Dict, nx: Optional[int] = None, ny: Optional[int] = None,
+                    fill_missing: bool = True) -> Dict:
+    """
+    Result with every field as a 1-D float64 array of nx * ny points
+    nx/ny: structured size from the mesh, used when the result has none.
+    Missing fields are zero-filled when fill_missing (reported), otherwise
+    an error. Raises ValueError on inconsistent shapes.
+    """
+    out = dict(result)
+    n_points = None
+    for field in RESULT_FIELDS:
+        if field not in out:
+            continue
+        values = np.asarray(out[field], dtype=np.float64)
+        if values.ndim != 1:
+            raise ValueError(f"field '{field}' has shape {values.shape}, expected 1-D")
+        if n_points is None:
+            n_points = len(values)
+        elif len(values) != n_points:
+            raise ValueError(f"field '{field}' has {len(values)} points, expected {n_points}")
+        out[field] = values
+    if not n_points:
+        raise ValueError("result has no field data")
+
+    nx = out.get("nx") or nx
+    ny = out.get("ny") or ny
+    if not nx or not ny:
+        raise ValueError(f"structured size (nx, ny) unknown for {n_points} points")
+    if int(nx) * int(ny) != n_points:
+        raise ValueError(f"nx * ny = {int(nx)} x {int(ny)} does not match {n_points} points")
+    out["nx"], out["ny"] = int(nx), int(ny)
+
+    for field in RESULT_FIELDS:
+        if field not in out:
+            if not fill_missing:
+                raise ValueError(f"missing field '{field}'")
+            print(f"[result_format] Warning: missing field '{field}', filled with zeros")
+            out[field] = np.zeros(n_points)
+    return out
+
+
+def _plain(value):
+    """Metadata value as plain JSON (numpy scalars and small arrays included)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _write(f: BinaryIO, result: Dict):
+    columns, meta = {}, {}
+    for key, value in result.items():
+        # Field arrays become columns; everything else is metadata
+        if isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in "fiu":
+            columns[key] = np.ascontiguousarray(value, dtype=value.dtype.newbyteorder("<"))
+        else:
+            meta[key] = _plain(value)
+
+    layout, offset = {}, 0
+    for key, values in columns.items():
+        layout[key] = {"dtype": values.dtype.str, "length": len(values), "offset": offset}
+        offset += -(-values.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"meta": meta, "columns": layout}).encode()
+    # Column data starts on an ALIGN boundary
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGN)
+
+    f.write(MAGIC + struct.pack("<II", VERSION, len(header)) + header)
+    for values in columns.values():
+        f.write(memoryview(values).cast("B"))
+        f.write(b"\0" * (-values.nbytes % ALIGN))
+
+
+def write_columnar(result: Dict, path: Path):
+    """Write a result atomically (readers never see a partial file)"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _write(f, result)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def encode_columnar(result: Dict) -> bytes:
+    """Columnar bytes of a result held in memory"""
+    buf = io.BytesIO()
+    _write(buf, result)
+    return buf.getvalue()
+
+
+def decode_columnar(buffer) -> Dict:
+    """Result from columnar bytes (bytes, mmap); arrays are read-only views on buffer"""
+    if bytes(buffer[:4]) != MAGIC:
+        raise ValueError("not a columnar result (bad magic)")
+    version, header_len = struct.unpack_from("<II", buffer, 4)
+    if version != VERSION:
+        raise ValueError(f"unsupported columnar result version {version}")
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[start:start + header_len]))
+    data = start + header_len
+    result = dict(header["meta"])
+    for key, column in header["columns"].items():
+        result[key] = np.frombuffer(buffer, dtype=np.dtype(column["dtype"]), count=column["length"],
+                                    offset=data + column["offset"])
+    return result
+
+
+def read_columnar(path: Path) -> Dict:
+    """Load cfd_result.bin (mapped) or cfd_result.bin.gz (decompressed once)"""
+    path = Path(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            return decode_columnar(f.read())
+    with open(path, "rb") as f:
+        # The mapping outlives the file object; the arrays keep it alive
+        return decode_columnar(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+CFD job queue
+Jobs wait in a priority queue served by a fixed number of worker
+coroutines. The priority is submission time + predicted wall time:
+short jobs overtake long ones submitted shortly before them, but a long
+job is never starved since later submissions always sort after it once
+the wait exceeds the difference in predicted durations.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class JobScheduler:
+    """Shortest-expected-job-first queue with bounded starvation"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+        self._running: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: str, expected_wall: float, run: Callable[[], Awaitable]):
+        """Queue a job; run() is only called once a worker picks it up"""
+        now = time.time()
+        heapq.heappush(self._heap, (now + expected_wall, next(self._counter), job_id, expected_wall, now, run))
+        self._cancelled.discard(job_id)
+        self._event().set()
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet"""
+        if any(entry[2] == job_id for entry in self._heap):
+            self._cancelled.add(job_id)
+            return True
+        return False
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, None once it started"""
+        order = sorted(e for e in self._heap if e[2] not in self._cancelled)
+        for i, entry in enumerate(order):
+            if entry[2] == job_id:
+                return i + 1
+        return None
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for e in self._heap if e[2] not in self._cancelled)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    async def _worker(self, slot: int):
+        event = self._event()
+        while True:
+            while not self._heap:
+                event.clear()
+                await event.wait()
+            _, _, job_id, expected_wall, submitted, run = heapq.heappop(self._heap)
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                continue
+            self._running[job_id] = time.time()
+            try:
+                await run()
+            except Exception as e:
+                # run() reports its own failures in the job table
+                print(f"[Scheduler] job {job_id} raised: {e}")
+            finally:
+                self._running.pop(job_id, None)
+
+    def status(self) -> Dict:
+        now = time.time()
+        waiting = sorted(e for e in self._heap if e[2] not in self._cancelled)
+        return {
+            "workers": self.workers,
+            "running": [
+                {"job_id": job_id, "elapsed": round(now - started, 1)}
+                for job_id, started in self._running.items()
+            ],
+            "queued": [
+                {"job_id": e[2], "expected_wall": round(e[3], 1), "waiting": round(now - e[4], 1)}
+                for e in waiting
+            ],
+        }
@@ -4,19 +4,32 @@ OpenFOAM CFD Solver REST API
 High-fidelity compressible flow simulations for rocket nozzles
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Literal
 import subprocess
 import json
 import uuid
 import os
+import sys
 from pathlib import Path
 import asyncio
 import shutil
 import math
+import time
+
+from openfoam_runner import RunnerPool, RunnerError, OPENFOAM_BASHRC, traced_peak
+from storage import StorageJanitor, read_result, result_path, dir_size
+from cost_model import CostModel, MAX_WALL_SECONDS
+from scheduler import JobScheduler
+from metrics import span, render, cache_lookup, CONTENT_TYPE_LATEST, QUEUE_WAIT_SECONDS, JOBS_FINISHED
+from fast_solver import solve_fields_adaptive, geometry_key, encode_json, EncodedCache, nozzle_radius
+from adapt import adapted_nodes, coarse_params, cell_ratio, ADAPT_STRENGTH, ADAPT_MAX_CYCLES
+from result_format import validate_result, write_columnar, encode_columnar, COLUMNAR_FILE, COLUMNAR_MEDIA_TYPE
+from monitors import monitor_dir, read_meta, copy_monitors, read_probes, read_exit, read_lines, summary
+from multiblock import block_layout, layout_cells, FARFIELD_LENGTH, FARFIELD_RADIUS, PLUME_GRADING, FARFIELD_GRADING
 
 app = FastAPI(
     title="OpenFOAM CFD API",
@@ -38,9 +51,44 @@ RESULTS_DIR = Path(os.environ.get("RESULTS_DIR", "/app/results"))
 CASES_DIR.mkdir(parents=True, exist_ok=True)
 RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Mesh generation and case template scripts (generate_mesh.py, polymesh.py, case_templates.py)
+SCRIPTS_DIR = Path(os.environ.get("CFD_SCRIPTS_DIR", Path(__file__).resolve().parent.parent / "scripts"))
+
+# Case template profile and the CASES_DIR subdirectory of its rendered static
+# dictionaries (hard-linked into every case, so on the same filesystem)
+CASE_PROFILE = "plume"
+CASE_TEMPLATE_SUBDIR = ".templates"
+
+# Monitors: exit plane (and exit probe) this fraction of l_nozzle upstream of
+# the exit, wall line points
+MONITOR_PLANE_OFFSET = 0.005
+MONITOR_WALL_POINTS = 60
+
+# Number of concurrent solver slots, each backed by a persistent OpenFOAM shell
+CFD_WORKERS = int(os.environ.get("CFD_WORKERS", "2"))
+
 # Job storage
 jobs: Dict[str, Dict[str, Any]] = {}
 
+# Persistent runners (environment sourced once per slot)
+runner_pool = RunnerPool(CFD_WORKERS)
+
+# Retention policy for the cases/results volumes
+janitor = StorageJanitor.from_env(
+    CASES_DIR, RESULTS_DIR,
+    is_active=lambda job_id: jobs.get(job_id, {}).get("status") in ("pending", "running"),
+    on_evict=lambda job_id: jobs.pop(job_id, None)
+)
+
+# Cost predictions calibrated from the telemetry of finished jobs
+cost_model = CostModel(RESULTS_DIR / "telemetry.jsonl")
+
+# Job queue, shortest expected job first
+scheduler = JobScheduler(CFD_WORKERS)
+
+# Encoded /api/cfd/solve responses, keyed by geometry hash
+solve_cache = EncodedCache(int(float(os.environ.get("FAST_SOLVE_CACHE_MB", "256")) * 1024**2))
+
 
 class CFDRequest(BaseModel):
     """Input parameters for CFD simulation"""
@@ -59,13 +107,21 @@ class CFDRequest(BaseModel):
     molar_mass: float = 0.022        # Molar mass [kg/mol]
     
     # Mesh settings
-    nx: int = 150                    # Axial cells
-    ny: int = 50                     # Radial cells
+    nx: int = Field(150, ge=2)       # Axial cells
+    ny: int = Field(50, ge=1)        # Radial cells
+    throat_grading: float = Field(1.0, gt=0)  # Largest/smallest axial cell, smallest at the throat (1 = uniform)
+    radial_grading: float = Field(3.0, gt=0)  # Top/axis radial cell size ratio (< 1 clusters at the wall)
+    adapt_cycles: int = Field(0, ge=0, le=ADAPT_MAX_CYCLES)  # Coarse solve + node redistribution on its gradients (0 = off)
+    adapt_strength: float = Field(ADAPT_STRENGTH, ge=0)      # Largest/smallest adapted cell ~ 1 + strength
+    mesh_layout: Literal["single", "multiblock"] = "single"  # multiblock: chamber/nozzle/plume/farfield blocks
+    plume_grading: float = Field(PLUME_GRADING, gt=0)        # Multiblock: last/first axial plume cell
+    farfield_grading: float = Field(FARFIELD_GRADING, gt=0)  # Multiblock: outer/inner radial farfield cell
     
     # Solver settings  
     max_iter: int = 5000
     tolerance: float = 1e-6
     solver: str = "openfoam"         # openfoam or python
+    allow_downscale: bool = True     # Reduce nx/ny instead of rejecting oversized jobs
 
 
 class JobStatus(BaseModel):
@@ -76,6 +132,30 @@ class JobStatus(BaseModel):
     result_url: Optional[str] = None
 
 
+@app.on_event("startup")
+async def start_runners():
+    """Source the OpenFOAM environment once per worker slot at startup"""
+    if check_openfoam():
+        await runner_pool.start()
+
+
+@app.on_event("startup")
+async def start_janitor():
+    janitor.start()
+
+
+@app.on_event("startup")
+async def start_scheduler():
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_runners():
+    await scheduler.stop()
+    await runner_pool.close()
+    await janitor.stop()
+
+
 @app.get("/")
 async def root():
     return {
@@ -86,6 +166,15 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body = await asyncio.to_thread(
+        render, jobs, scheduler.depth, scheduler.running, runner_pool.busy, runner_pool.resident_memory
+    )
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health():
     # Check OpenFOAM availability
@@ -93,7 +182,10 @@ async def health():
     return {
         "status": "healthy" if openfoam_ok else "degraded",
         "openfoam": openfoam_ok,
-        "python_fallback": True
+        "python_fallback": True,
+        "runners": runner_pool.status(),
+        "queue": scheduler.status(),
+        "solve_cache": solve_cache.stats()
     }
 
 
@@ -101,7 +193,7 @@ def check_openfoam() -> bool:
     """Check if OpenFOAM is available"""
     try:
         result = subprocess.run(
-            ["bash", "-c", "source /usr/lib/openfoam/openfoam2312/etc/bashrc && blockMesh -help"],
+            ["bash", "-c", f"source {OPENFOAM_BASHRC} && blockMesh -help"],
             capture_output=True,
             timeout=10
         )
@@ -110,9 +202,54 @@ def check_openfoam() -> bool:
         return False
 
 
+def select_backend(request: CFDRequest) -> str:
+    return "openfoam" if request.solver == "openfoam" and check_openfoam() else "python"
+
+
+@app.post("/api/cfd/estimate")
+async def estimate_cfd(request: CFDRequest):
+    """Predict peak memory, disk footprint and wall time of a request on both backends"""
+    params = request.model_dump()
+    backend = select_backend(request)
+    limits = cost_model.limits(CFD_WORKERS, CASES_DIR)
+    return {
+        "backend": backend,
+        "estimates": {name: cost_model.predict(params, name) for name in ("openfoam", "python")},
+        "admission": cost_model.admit(params, backend, limits, request.allow_downscale),
+        "layout": layout_cells(params, *openfoam_cells(params)),
+        "queue_depth": scheduler.depth,
+        "model": cost_model.status()
+    }
+
+
+def admit_request(params: dict, backend: str, allow_downscale: bool) -> dict:
+    """Size a request against the container limits, shrinking its mesh in place when downscaled"""
+    admission = cost_model.admit(params, backend, cost_model.limits(CFD_WORKERS, CASES_DIR),
+                                 allow_downscale)
+    if admission["decision"] == "rejected":
+        raise HTTPException(status_code=422, detail={
+            "message": f"Job exceeds limits ({', '.join(admission['exceeded'])})",
+            "admission": admission
+        })
+    if admission["decision"] == "downscaled":
+        params["downscaled_from"] = [params["nx"], params["ny"]]
+        params["nx"], params["ny"] = admission["nx"], admission["ny"]
+    return admission
+
+
 @app.post("/api/cfd/run", response_model=JobStatus)
-async def run_cfd(request: CFDRequest, background_tasks: BackgroundTasks):
+async def run_cfd(request: CFDRequest):
     """Start a CFD simulation"""
+    use_openfoam = select_backend(request) == "openfoam"
+    backend = "openfoam" if use_openfoam else "python"
+    params = request.model_dump()
+    
+    # Pre-flight sizing against the container limits
+    admission = admit_request(params, backend, request.allow_downscale)
+    note = ""
+    if admission["decision"] == "downscaled":
+        note = f", mesh reduced to {params['nx']}x{params['ny']}"
+    
     job_id = str(uuid.uuid4())[:8]
     
     # Create directories
@@ -122,7 +259,6 @@ async def run_cfd(request: CFDRequest, background_tasks: BackgroundTasks):
     result_dir.mkdir(parents=True, exist_ok=True)
     
     # Save parameters
-    params = request.model_dump()
     params["job_id"] = job_id
     
     with open(case_dir / "params.json", 'w') as f:
@@ -135,67 +271,100 @@ async def run_cfd(request: CFDRequest, background_tasks: BackgroundTasks):
         "message": "Job queued",
         "params": params,
         "case_dir": str(case_dir),
-        "result_dir": str(result_dir)
+        "result_dir": str(result_dir),
+        "estimate": admission["prediction"],
+        "backend": backend,
+        "submitted": time.time(),
+        "timings": {}
     }
     
-    # Determine solver
-    use_openfoam = request.solver == "openfoam" and check_openfoam()
-    
     if use_openfoam:
-        background_tasks.add_task(run_openfoam_simulation, job_id, params, case_dir, result_dir)
+        run = lambda: run_openfoam_simulation(job_id, params, case_dir, result_dir)
     else:
-        background_tasks.add_task(run_python_simulation, job_id, params, result_dir)
+        run = lambda: run_python_simulation(job_id, params, result_dir)
+    scheduler.submit(job_id, admission["prediction"]["wall"], run)
     
+    message = f"Job queued (using {'OpenFOAM' if use_openfoam else 'Python'} solver{note})"
+    jobs[job_id]["message"] = message
     return JobStatus(
         job_id=job_id,
         status="pending",
         progress=0.0,
-        message=f"Job queued (using {'OpenFOAM' if use_openfoam else 'Python'} solver)"
+        message=message
     )
 async def run_openfoam_simulation(job_id: str, params: dict, case_dir: Path, result_dir: Path):
     """Run OpenFOAM rhoCentralFoam simulation"""
     import traceback
+    log_file = result_dir / "openfoam.log"
+    jobs[job_id]["log_file"] = str(log_file)
+    timings = jobs[job_id].setdefault("timings", {})
     try:
-        print(f"[Job {job_id}] Starting OpenFOAM simulation...")
-        jobs[job_id]["status"] = "running"
-        jobs[job_id]["message"] = "Generating case files..."
-        jobs[job_id]["progress"] = 0.05
-        
-        # Generate OpenFOAM case
-        generate_openfoam_case(params, case_dir)
-        print(f"[Job {job_id}] Case files generated")
-        
-        jobs[job_id]["message"] = "Running blockMesh..."
-        jobs[job_id]["progress"] = 0.1
-        
-        # Run blockMesh
-        returncode, output = await run_openfoam_command("blockMesh", case_dir)
-        if returncode != 0:
-            raise Exception(f"blockMesh failed:\n{output[-500:]}")
-        print(f"[Job {job_id}] blockMesh completed successfully")
-        
-        jobs[job_id]["message"] = "Running rhoCentralFoam solver..."
-        jobs[job_id]["progress"] = 0.2
-        
-        # Run solver
-        print(f"[Job {job_id}] Starting rhoCentralFoam...")
-        returncode, output = await run_openfoam_command("rhoCentralFoam", case_dir, job_id)
-        print(f"[Job {job_id}] rhoCentralFoam finished with return code: {returncode}")
-        
-        if returncode != 0:
-            raise Exception(f"rhoCentralFoam failed:\n{output[-500:]}")
+        jobs[job_id]["message"] = "Waiting for a free solver slot..."
+        async with runner_pool.acquire() as runner:
+            print(f"[Job {job_id}] Starting OpenFOAM simulation on runner {runner.slot}...")
+            started = time.time()
+            # Every utility of the job shares its wall-time budget
+            deadline = started + MAX_WALL_SECONDS
+            QUEUE_WAIT_SECONDS.labels("openfoam").observe(started - jobs[job_id].get("submitted", started))
+            peak_rss = 0
+            jobs[job_id]["status"] = "running"
+            jobs[job_id]["message"] = "Generating case files..."
+            jobs[job_id]["progress"] = 0.05
+            
+            nodes = None
+            if params.get("adapt_cycles"):
+                nodes = await adapt_openfoam_mesh(job_id, runner, params, case_dir, log_file, timings,
+                                                   deadline)
+            
+            # Generate OpenFOAM case (polyMesh included)
+            with span("case_generation", "openfoam", timings, job_id):
+                generate_openfoam_case(params, case_dir, nodes)
+            print(f"[Job {job_id}] Case files generated")
+            
+            if nodes is not None:
+                # Warm start from the last coarse solution
+                with span("mapFields", "openfoam", timings, job_id):
+                    result = await run_openfoam_command(
+                        runner, "mapFields coarse -consistent -sourceTime latestTime", case_dir, log_file,
+                        deadline=deadline)
+                peak_rss = max(peak_rss, result.peak_rss)
+                if not result.ok:
+                    print(f"[Job {job_id}] warning: mapFields failed, starting from the uniform initial fields")
+                shutil.rmtree(case_dir / "coarse", ignore_errors=True)
             
-        jobs[job_id]["message"] = "Post-processing (CellCentres)..."
-        returncode, output = await run_openfoam_command("postProcess -func writeCellCentres", case_dir, job_id)
-        if returncode != 0:
-             print(f"[Job {job_id}] warning: postProcess (writeCellCentres) failed, geometry might be inaccurate.")
+            jobs[job_id]["message"] = "Running rhoCentralFoam solver..."
+            jobs[job_id]["progress"] = 0.2
+            
+            # Run solver
+            print(f"[Job {job_id}] Starting rhoCentralFoam...")
+            with span("solver", "openfoam", timings, job_id):
+                result = await run_openfoam_command(runner, "rhoCentralFoam", case_dir, log_file, job_id,
+                                                     deadline)
+            print(f"[Job {job_id}] rhoCentralFoam finished with return code: {result.returncode}")
+            peak_rss = max(peak_rss, result.peak_rss)
+            
+            if not result.ok:
+                raise Exception(f"rhoCentralFoam failed:\n{result.tail[-500:]}")
+                
+            jobs[job_id]["message"] = "Post-processing (CellCentres)..."
+            with span("postProcess", "openfoam", timings, job_id):
+                result = await run_openfoam_command(runner, "postProcess -func writeCellCentres", case_dir, log_file,
+                                                     job_id, deadline)
+            peak_rss = max(peak_rss, result.peak_rss)
+            if not result.ok:
+                 print(f"[Job {job_id}] warning: postProcess (writeCellCentres) failed, geometry might be inaccurate.")
         
         jobs[job_id]["message"] = "Post-processing results..."
         jobs[job_id]["progress"] = 0.9
         
         # Post-process and convert to JSON
         print(f"[Job {job_id}] Extracting results...")
-        extract_openfoam_results(params, case_dir, result_dir)
+        with span("extract", "openfoam", timings, job_id):
+            result = extract_openfoam_results(params, case_dir, result_dir)
+        with span("serialize", "openfoam", timings, job_id):
+            write_result(result, result_dir)
+            # Before the job completes: the janitor may release the case afterwards
+            copy_monitors(case_dir, result_dir)
         print(f"[Job {job_id}] Results extracted successfully")
         
         jobs[job_id]["status"] = "completed"
@@ -203,62 +372,109 @@ async def run_openfoam_simulation(job_id: str, params: dict, case_dir: Path, res
         jobs[job_id]["message"] = "Simulation completed"
         jobs[job_id]["result_url"] = f"/api/cfd/result/{job_id}"
         print(f"[Job {job_id}] Simulation completed successfully!")
+        JOBS_FINISHED.labels("openfoam", "completed").inc()
+        
+        disk = await asyncio.to_thread(lambda: dir_size(case_dir) + dir_size(result_dir))
+        cost_model.record("openfoam", params, time.time() - started, peak_rss, disk)
+        
+        # Raw case is no longer needed once results are extracted (unless pinned)
+        freed = await asyncio.to_thread(janitor.release_case, job_id)
+        if freed:
+            print(f"[Job {job_id}] Case directory released ({freed / 1e6:.1f} MB)")
         
     except Exception as e:
         print(f"[Job {job_id}] ERROR: {str(e)}")
         print(f"[Job {job_id}] Traceback:\n{traceback.format_exc()}")
         jobs[job_id]["status"] = "failed"
         jobs[job_id]["message"] = f"Error: {str(e)}"
+        JOBS_FINISHED.labels("openfoam", "failed").inc()
 
 
-async def run_openfoam_command(command: str, case_dir: Path, job_id: str = None) -> tuple:
-    """Run an OpenFOAM command with proper environment. Returns (returncode, output)"""
-    cmd = f"source /usr/lib/openfoam/openfoam2312/etc/bashrc && cd {case_dir} && {command}"
-    
-    process = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-        executable="/bin/bash"
-    )
-    
-    output_lines = []
-    
-    # Read all output
-    while True:
-        line = await process.stdout.readline()
-        if not line:
-            break
-        line_str = line.decode().strip()
-        output_lines.append(line_str)
-        
-        # Update progress for solver
-        if job_id and command == "rhoCentralFoam" and "Time =" in line_str:
-            try:
-                time_val = float(line_str.split("=")[1].strip())
-                progress = min(0.85, 0.2 + 0.65 * (time_val / 0.001))
-                jobs[job_id]["progress"] = progress
-            except:
-                pass
+async def adapt_openfoam_mesh(job_id: str, runner, params: dict, case_dir: Path, log_file: Path,
+                              timings: dict, deadline: float = None):
+    """
+    Adapt cycles of an OpenFOAM job: solve on a coarse mesh in case_dir/coarse,
+    redistribute the nodes on the gradients of its p/U/T solution, repeat.
+    Returns the normalized (x, eta) node positions of the final mesh.
+    """
+    coarse_dir = case_dir / "coarse"
+    nx_total, ny_total = openfoam_cells(params)
+    nodes = None
+    strength = params.get("adapt_strength")
+    if strength is None:
+        strength = ADAPT_STRENGTH
+    for cycle in range(int(params["adapt_cycles"])):
+        jobs[job_id]["message"] = f"Adapt cycle {cycle + 1}/{params['adapt_cycles']}: coarse solve..."
+        shutil.rmtree(coarse_dir, ignore_errors=True)
+        coarse_dir.mkdir()
+        # First cycle on a coarser single-block mesh, later ones on the previous adapted mesh
+        cycle_params = dict(coarse_params(params), mesh_layout="single") if nodes is None else params
+        with span("adapt", "openfoam", timings, job_id):
+            generate_openfoam_case(cycle_params, coarse_dir, nodes)
+            for command in ("rhoCentralFoam", "postProcess -func writeCellCentres"):
+                result = await run_openfoam_command(runner, command, coarse_dir, log_file,
+                                                     deadline=deadline)
+                if not result.ok:
+                    raise Exception(f"{command} (adapt cycle {cycle + 1}) failed:\n{result.tail[-500:]}")
+            fields = read_structured_solution(cycle_params, coarse_dir)
+            x, eta = adapted_nodes(fields, nx_total + 1, ny_total + 1, strength)
+        # Positions span the first to the last cell centre: stretch them onto the whole domain
+        nodes = ((x - x[0]) / (x[-1] - x[0]), (eta - eta[0]) / (eta[-1] - eta[0]))
+        print(f"[Job {job_id}] adapt cycle {cycle + 1}: axial cell ratio {cell_ratio(x):.2f}, "
+              f"radial {cell_ratio(eta):.2f}")
+    return nodes
+
+
+async def run_openfoam_command(runner, command: str, case_dir: Path, log_file: Path,
+                               job_id: str = None, deadline: float = None):
+    """
+    Run an OpenFOAM utility on a persistent runner.
+    Full output goes to log_file; returns a CommandResult (returncode, elapsed, tail).
+    deadline: time.time() by which the job must finish; the utility is killed past it.
+    """
+    on_line = None
+    if job_id and command == "rhoCentralFoam":
+        def on_line(line_str: str):
+            # Update progress for solver
+            if line_str.startswith("Time ="):
+                try:
+                    time_val = float(line_str.split("=")[1].strip())
+                    progress = min(0.85, 0.2 + 0.65 * (time_val / 0.001))
+                    jobs[job_id]["progress"] = progress
+                except:
+                    pass
     
-    await process.wait()
+    try:
+        timeout = max(0.0, deadline - time.time()) if deadline is not None else None
+        result = await runner.run(command, case_dir, log_file, on_line, timeout)
+    except RunnerError as e:
+        raise Exception(f"{command}: {e}")
     
-    # Log output for debugging
-    output_text = "\n".join(output_lines[-50:])  # Last 50 lines
-    print(f"[{command}] Exit code: {process.returncode}")
-    if process.returncode != 0:
-        print(f"[{command}] Output:\n{output_text}")
+    print(f"[{command}] Exit code: {result.returncode} ({result.elapsed:.1f}s, runner {runner.slot})")
+    if not result.ok:
+        print(f"[{command}] Output (full log: {log_file}):\n{result.tail}")
     
-    return process.returncode, output_text
+    return result
 
 
-def generate_openfoam_case(params: dict, case_dir: Path):
-    """Generate OpenFOAM case structure for rocket nozzle"""
-    
-    # Create directories
-    (case_dir / "0").mkdir(exist_ok=True)
-    (case_dir / "constant").mkdir(exist_ok=True)
-    (case_dir / "system").mkdir(exist_ok=True)
+def openfoam_cells(params: dict) -> tuple:
+    """Axial and radial cell counts of the OpenFOAM mesh (minimum 80 x 40)"""
+    return max(80, params["nx"]), max(40, params["ny"])
+
+
+def generate_openfoam_case(params: dict, case_dir: Path, nodes: tuple = None):
+    """
+    Generate OpenFOAM case structure for rocket nozzle
+    nodes: (x, eta) node positions normalized to [0, 1] (adapted mesh);
+    by default from throat_grading / radial_grading, or the multi-block
+    layout when mesh_layout is "multiblock" (adapted meshes are single-block)
+    """
+    import numpy as np
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+    from generate_mesh import generate_structured_mesh, generate_multiblock_mesh, graded_distribution, throat_grading
+    from polymesh import write_polymesh
+    from case_templates import write_case_files, write_monitors, patches
     
     # Extract parameters
     r_throat = params["r_throat"]
@@ -292,372 +508,52 @@ def generate_openfoam_case(params: dict, case_dir: Path):
     Cp = max(800, min(6000, Cp))
     
     # ================================
-    # blockMeshDict - SINGLE BLOCK: Extended domain
+    # constant/polyMesh - written directly (no blockMesh run)
     # ================================
-    # Simplified: One block from inlet through far-field
-    # Top edge follows nozzle contour, then expands to far-field radius
+    # Single structured block from inlet through far-field; the top edge
+    # follows the nozzle contour at every node, then expands to far-field radius.
+    # Multi-block: see multiblock.py
     
     x_exit = l_chamber + l_nozzle
-    r_inlet = r_chamber  # Inlet radius = chamber radius
     
     # Far-field dimensions (EXTENDED for longer plume visualization)
-    farfield_length = 8 * r_exit  # Extended from 4x to 8x
-    farfield_radius = 3.0 * r_exit  # Wider far-field
+    farfield_length = FARFIELD_LENGTH * r_exit  # Extended from 4x to 8x
+    farfield_radius = FARFIELD_RADIUS * r_exit  # Wider far-field
     x_end = x_exit + farfield_length
     
     # Mesh sizing (adjusted for single block)
-    nx_total = max(80, nx)
-    ny_total = max(40, ny)
+    nx_total, ny_total = openfoam_cells(params)
     
-    # Wedge angle
+    # Wedge half-angle (front at -2.5 deg, back at +2.5 deg)
     wedge_angle = 2.5
-    theta = math.radians(wedge_angle)
     
-    def wedge_coords(r):
-        return r * math.cos(theta), r * math.sin(theta)
-    
-    # Nozzle contour function
-    def get_wall_radius(xi):
-        if xi <= l_chamber * 0.8:
-            return r_chamber
-        elif xi <= l_chamber:
-            t = (xi - l_chamber * 0.8) / (l_chamber * 0.2)
-            return r_throat + (r_chamber - r_throat) * 0.5 * (1 + math.cos(t * math.pi))
-        elif xi <= x_exit:
-            t = (xi - l_chamber) / l_nozzle
-            return r_throat + (r_exit - r_throat) * t
+    if nodes is None and params.get("mesh_layout") == "multiblock":
+        blocks = block_layout(params, nx_total, ny_total)
+        mesh = generate_multiblock_mesh(
+            blocks, lambda x: nozzle_radius(x, r_chamber, r_throat, r_exit, l_chamber, l_nozzle))
+        print(f"Multi-block mesh: {sum(mesh['blocks'].values())} cells "
+              f"({', '.join(f'{name} {cells}' for name, cells in mesh['blocks'].items())}), "
+              f"single block: {nx_total * ny_total}")
+    else:
+        # Axial nodes clustered at the throat, radial grading (last/first cell) towards the top
+        if nodes is not None:
+            x, eta = x_end * np.asarray(nodes[0]), np.asarray(nodes[1])
         else:
-            # Far-field: expand from exit radius to farfield radius
-            t = (xi - x_exit) / farfield_length
-            return r_exit + (farfield_radius - r_exit) * t
-    
-    # Generate polyLine for top edge (inlet -> end)
-    n_edge_pts = 35  # More points for smoother extended domain
-    edge_pts_front = ""
-    edge_pts_back = ""
-    for i in range(1, n_edge_pts):
-        xi = (i / n_edge_pts) * x_end
-        ri = get_wall_radius(xi)
-        yi, zi = wedge_coords(ri)
-        edge_pts_front += f"        ({xi:.6f} {yi:.6f} {-zi:.6f})\n"
-        edge_pts_back += f"        ({xi:.6f} {yi:.6f} {zi:.6f})\n"
-    
-    # Vertex coords
-    y_in, z_in = wedge_coords(r_inlet)
-    y_out, z_out = wedge_coords(farfield_radius)
-    
-    blockmesh = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      blockMeshDict;
-}}
-
-scale 1;
-
-vertices
-(
-    // Front face (z < 0)
-    (0 0 0)                                 // 0 - inlet axis
-    ({x_end:.6f} 0 0)                       // 1 - outlet axis
-    ({x_end:.6f} {y_out:.6f} {-z_out:.6f})  // 2 - outlet top
-    (0 {y_in:.6f} {-z_in:.6f})              // 3 - inlet top
-    
-    // Back face (z > 0)
-    (0 0 0)                                 // 4 - inlet axis
-    ({x_end:.6f} 0 0)                       // 5 - outlet axis
-    ({x_end:.6f} {y_out:.6f} {z_out:.6f})   // 6 - outlet top
-    (0 {y_in:.6f} {z_in:.6f})               // 7 - inlet top
-);
-
-blocks
-(
-    hex (0 1 2 3 4 5 6 7) ({nx_total} {ny_total} 1) simpleGrading (1 3 1)
-);
-
-edges
-(
-    polyLine 3 2
-    (
-{edge_pts_front}    )
-    polyLine 7 6
-    (
-{edge_pts_back}    )
-);
-
-boundary
-(
-    inlet
-    {{
-        type patch;
-        faces ((0 4 7 3));
-    }}
-    outlet
-    {{
-        type patch;
-        faces ((1 2 6 5));
-    }}
-    top
-    {{
-        type patch;
-        faces ((3 7 6 2));
-    }}
-    axis
-    {{
-        type empty;
-        faces ((0 1 5 4));
-    }}
-    front
-    {{
-        type wedge;
-        faces ((0 3 2 1));
-    }}
-    back
-    {{
-        type wedge;
-        faces ((4 5 6 7));
-    }}
-);
-
-mergePatchPairs
-();
-"""
-    with open(case_dir / "system" / "blockMeshDict", 'w') as f:
-        f.write(blockmesh)
-    
-    # ================================
-    # controlDict
-    # ================================
-    controldict = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      controlDict;
-}}
-
-application     rhoCentralFoam;
-
-startFrom       startTime;
-startTime       0;
-
-stopAt          endTime;
-endTime         1e-5;
-
-deltaT          1e-8;
-
-writeControl    adjustableRunTime;
-writeInterval   2e-6;
-
-purgeWrite      3;
-
-writeFormat     ascii;
-writePrecision  8;
-writeCompression off;
-
-timeFormat      general;
-timePrecision   6;
-
-runTimeModifiable true;
-
-adjustTimeStep  yes;
-maxCo           0.3;
-
-functions
-{{
-    fieldAverage1
-    {{
-        type            fieldAverage;
-        libs            (fieldFunctionObjects);
-        writeControl    writeTime;
-        fields
-        (
-            U
-            {{
-                mean        on;
-                prime2Mean  off;
-                base        time;
-            }}
-            p
-            {{
-                mean        on;
-                prime2Mean  off;
-                base        time;
-            }}
-        );
-    }}
-}}
-"""
-    
-    with open(case_dir / "system" / "controlDict", 'w') as f:
-        f.write(controldict)
-    
-    # ================================
-    # fvSchemes
-    # ================================
-    fvschemes = """FoamFile
-{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      fvSchemes;
-}
-
-ddtSchemes
-{
-    default         Euler;
-}
-
-gradSchemes
-{
-    default         Gauss linear;
-}
-
-divSchemes
-{
-    default         none;
-    div(tauMC)      Gauss linear;
-}
-
-laplacianSchemes
-{
-    default         Gauss linear corrected;
-}
-
-interpolationSchemes
-{
-    default         linear;
-    reconstruct(rho) vanLeer;
-    reconstruct(U)   vanLeerV;
-    reconstruct(T)   vanLeer;
-}
-
-snGradSchemes
-{
-    default         corrected;
-}
-"""
-    
-    with open(case_dir / "system" / "fvSchemes", 'w') as f:
-        f.write(fvschemes)
-    
-    # ================================
-    # fvSolution
-    # ================================
-    fvsolution = """FoamFile
-{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      fvSolution;
-}
-
-solvers
-{
-    "(rho|rhoU|rhoE)"
-    {
-        solver          diagonal;
-    }
-
-    U
-    {
-        solver          smoothSolver;
-        smoother        GaussSeidel;
-        tolerance       1e-06;
-        relTol          0.1;
-    }
-
-    e
-    {
-        solver          smoothSolver;
-        smoother        GaussSeidel;
-        tolerance       1e-06;
-        relTol          0.1;
-    }
-
-    h
-    {
-        $U;
-        tolerance       1e-06;
-        relTol          0.1;
-    }
-}
-"""
-    
-    with open(case_dir / "system" / "fvSolution", 'w') as f:
-        f.write(fvsolution)
+            x = x_end * graded_distribution(nx_total, throat_grading(l_chamber, x_end, params.get("throat_grading", 1.0)))
+            eta = graded_distribution(ny_total, ((1.0, 1.0, params.get("radial_grading", 3.0)),))
+        r_wall = np.where(x <= x_exit,
+                          nozzle_radius(x, r_chamber, r_throat, r_exit, l_chamber, l_nozzle),
+                          r_exit + (farfield_radius - r_exit) * (x - x_exit) / farfield_length)
+        mesh = generate_structured_mesh(x, r_wall, ny_total + 1, eta=eta)
+    write_polymesh(mesh, case_dir / "constant" / "polyMesh", 2 * wedge_angle, patches=patches(CASE_PROFILE))
     
     # ================================
-    # thermophysicalProperties
+    # system/, constant/ and 0/ from the case templates (case_templates.py)
     # ================================
     # Using fixed values for robustness - avoid calculation errors
-    # rhoCentralFoam works well with sensibleInternalEnergy
     fixed_Cp = 1200.0  # Typical for combustion gases
     fixed_molWeight = 25.0  # Typical for combustion products
     
-    thermoprops = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      thermophysicalProperties;
-}}
-
-thermoType
-{{
-    type            hePsiThermo;
-    mixture         pureMixture;
-    transport       const;
-    thermo          hConst;
-    equationOfState perfectGas;
-    specie          specie;
-    energy          sensibleEnthalpy;
-}}
-
-mixture
-{{
-    specie
-    {{
-        molWeight   {fixed_molWeight:.1f};
-    }}
-    thermodynamics
-    {{
-        Cp          {fixed_Cp:.1f};
-        Hf          0;
-    }}
-    transport
-    {{
-        mu          1.8e-5;
-        Pr          0.7;
-    }}
-}}
-"""
-    
-    with open(case_dir / "constant" / "thermophysicalProperties", 'w') as f:
-        f.write(thermoprops)
-    
-    # ================================
-    # turbulenceProperties
-    # ================================
-    turbprops = """FoamFile
-{
-    version     2.0;
-    format      ascii;
-    class       dictionary;
-    object      turbulenceProperties;
-}
-
-simulationType  laminar;
-"""
-    
-    with open(case_dir / "constant" / "turbulenceProperties", 'w') as f:
-        f.write(turbprops)
-    
-    # ================================
-    # Initial conditions (0/)
-    # ================================
-    
     # Calculate inlet velocity (subsonic)
     rho_chamber = p_chamber / (R_specific * t_chamber)
     a_chamber = math.sqrt(gamma * R_specific * t_chamber)
@@ -676,155 +572,57 @@ simulationType  laminar;
     print(f"  a_chamber = {a_chamber:.1f} m/s")
     print(f"  u_inlet = {u_inlet:.1f} m/s")
     
-    # Format numbers explicitly to avoid scientific notation issues
-    p_chamber_str = f"{p_chamber:.1f}"
-    t_chamber_str = f"{t_chamber:.1f}"
-    p_ambient_str = f"{p_ambient:.1f}"
-    u_inlet_str = f"{u_inlet:.1f}"
-    gamma_str = f"{gamma:.4f}"
-    
-    # Pressure field - all initialized to chamber pressure for stable startup
-    p_file = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       volScalarField;
-    object      p;
-}}
-
-dimensions      [1 -1 -2 0 0 0 0];
-
-internalField   uniform {p_chamber_str};
-
-boundaryField
-{{
-    inlet
-    {{
-        type            fixedValue;
-        value           uniform {p_chamber_str};
-    }}
-    outlet
-    {{
-        type            zeroGradient;
-    }}
-    top
-    {{
-        type            zeroGradient;
-    }}
-    axis
-    {{
-        type            empty;
-    }}
-    front
-    {{
-        type            wedge;
-    }}
-    back
-    {{
-        type            wedge;
-    }}
-}}
-"""
-    
-    with open(case_dir / "0" / "p", 'w') as f:
-        f.write(p_file)
-    
-    # Temperature field - ambient far-field
-    t_ambient_str = "300.0"  # Ambient temperature
-    t_file = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       volScalarField;
-    object      T;
-}}
-
-dimensions      [0 0 0 1 0 0 0];
-
-internalField   uniform {t_ambient_str};
-
-boundaryField
-{{
-    inlet
-    {{
-        type            fixedValue;
-        value           uniform {t_chamber_str};
-    }}
-    outlet
-    {{
-        type            zeroGradient;
-    }}
-    top
-    {{
-        type            fixedValue;
-        value           uniform {t_ambient_str};
-    }}
-    axis
-    {{
-        type            empty;
-    }}
-    front
-    {{
-        type            wedge;
-    }}
-    back
-    {{
-        type            wedge;
-    }}
-}}
-"""
-    
-    with open(case_dir / "0" / "T", 'w') as f:
-        f.write(t_file)
-    
-    # Velocity field - ambient is still air
-    u_file = f"""FoamFile
-{{
-    version     2.0;
-    format      ascii;
-    class       volVectorField;
-    object      U;
-}}
-
-dimensions      [0 1 -1 0 0 0 0];
-
-internalField   uniform (0 0 0);
-
-boundaryField
-{{
-    inlet
-    {{
-        type            fixedValue;
-        value           uniform ({u_inlet_str} 0 0);
-    }}
-    outlet
-    {{
-        type            zeroGradient;
-    }}
-    top
-    {{
-        type            pressureInletOutletVelocity;
-        value           uniform (0 0 0);
-    }}
-    axis
-    {{
-        type            empty;
-    }}
-    front
-    {{
-        type            wedge;
-    }}
-    back
-    {{
-        type            wedge;
-    }}
-}}
-"""
-    
-    with open(case_dir / "0" / "U", 'w') as f:
-        f.write(u_file)
-    
-    # NOTE: Do NOT create explicit 'e' file - rhoCentralFoam computes it from T and p
+    # Pressure initialized to chamber pressure for stable startup, ambient is still air at 300 K
+    # NOTE: no explicit 'e' file - rhoCentralFoam computes it from T and p
+    write_case_files(case_dir, CASE_PROFILE, {
+        "p_chamber": round(p_chamber, 1),
+        "t_chamber": round(t_chamber, 1),
+        "t_ambient": 300.0,
+        "u_inlet": round(u_inlet, 1),
+        "mol_weight": fixed_molWeight,
+        "cp": fixed_Cp,
+    }, CASES_DIR / CASE_TEMPLATE_SUBDIR)
+    
+    # Monitors (function objects): probes on the axis at the throat and just
+    # upstream of the exit, lines along the axis and inside the wall, exit-plane integrals
+    r_axis = 0.01 * r_throat
+    plane_x = x_exit - MONITOR_PLANE_OFFSET * l_nozzle
+    x_wall = np.linspace(0.0, x_exit, MONITOR_WALL_POINTS)
+    r_wall_line = 0.98 * nozzle_radius(x_wall, r_chamber, r_throat, r_exit, l_chamber, l_nozzle)
+    write_monitors(
+        case_dir, CASE_PROFILE,
+        probes={"throat": (l_chamber, r_axis), "exit": (plane_x, r_axis)},
+        axis=(0.0, x_end, r_axis, nx_total + 1),
+        wall=zip(x_wall, r_wall_line),
+        plane_x=plane_x,
+        meta={
+            # Function objects integrate over the wedge only
+            "scale": 360.0 / (2 * wedge_angle),
+            "plane_x": plane_x,
+            "plane_radius": float(nozzle_radius(np.array([plane_x]), r_chamber, r_throat, r_exit, l_chamber, l_nozzle)[0]),
+            "p_ambient": p_ambient,
+            "x_throat": l_chamber,
+            "x_exit": x_exit,
+        })
+
+
+def read_structured_solution(params: dict, case_dir: Path) -> dict:
+    """
+    Latest p/U/T solution of a single-block case (cells row by row, centres
+    from writeCellCentres) as x-major fields with density and Mach
+    """
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+    from postprocess import read_openfoam_output, x_major
+
+    nx, ny = openfoam_cells(params)
+    fields = read_openfoam_output(case_dir)
+    missing = [f for f in ("x", "r", "pressure", "mach") if f not in fields]
+    if missing:
+        raise Exception(f"{case_dir.name}: no {', '.join(missing)} in the latest time directory")
+    if len(fields["x"]) != nx * ny:
+        raise Exception(f"{case_dir.name}: {len(fields['x'])} cells, expected {nx} x {ny}")
+    return x_major(fields, nx, ny)
 
 
 def extract_openfoam_results(params: dict, case_dir: Path, result_dir: Path):
@@ -1162,18 +960,18 @@ def extract_openfoam_results(params: dict, case_dir: Path, result_dir: Path):
     # ==========================================================================
     result = {
         # Grid information (CRITICAL for mesh visualization)
-        "x": X.tolist(),
-        "r": R.tolist(),
+        "x": X,
+        "r": R,
         "nx": int(nx),
         "ny": int(ny),
         
         # Flow fields
-        "mach": mach.tolist(),
-        "pressure": pressure.tolist(),
-        "temperature": temperature.tolist(),
-        "velocity_x": vel_x.tolist(),
-        "velocity_r": velocity_r.tolist(),
-        "density": rho.tolist(),
+        "mach": mach,
+        "pressure": pressure,
+        "temperature": temperature,
+        "velocity_x": vel_x,
+        "velocity_r": velocity_r,
+        "density": rho,
         
         # Solver metadata
         "converged": True,
@@ -1196,122 +994,62 @@ def extract_openfoam_results(params: dict, case_dir: Path, result_dir: Path):
     # Log statistics
     print(f"[extract_openfoam_results] Results summary:")
     print(f"   Grid: {nx} x {ny} = {nx*ny} cells")
-    print(f"   Mach: {min(mach):.3f} - {max(mach):.3f}")
-    print(f"   Pressure: {min(pressure)/1e5:.2f} - {max(pressure)/1e5:.2f} bar")
-    print(f"   Temperature: {min(temperature):.0f} - {max(temperature):.0f} K")
-    print(f"   Velocity: {min(vel_x):.0f} - {max(vel_x):.0f} m/s")
-    
-    with open(result_dir / "cfd_result.json", 'w') as f:
-        json.dump(result, f, indent=2)
+    print(f"   Mach: {mach.min():.3f} - {mach.max():.3f}")
+    print(f"   Pressure: {pressure.min()/1e5:.2f} - {pressure.max()/1e5:.2f} bar")
+    print(f"   Temperature: {temperature.min():.0f} - {temperature.max():.0f} K")
+    print(f"   Velocity: {vel_x.min():.0f} - {vel_x.max():.0f} m/s")
     
-    print(f"[extract_openfoam_results] Results saved to {result_dir / 'cfd_result.json'}")
+    return result
+
+
+def write_result(result: dict, result_dir: Path):
+    """Validate a job result and store it in the columnar format (cfd_result.bin)"""
+    write_columnar(validate_result(result), result_dir / COLUMNAR_FILE)
+    print(f"[write_result] Results saved to {result_dir / COLUMNAR_FILE}")
 
 
 async def run_python_simulation(job_id: str, params: dict, result_dir: Path):
-    """Run Python fallback solver (MUSCL-HLLC)"""
+    """Run Python fallback solver (vectorized quasi-1D area-Mach solution)"""
+    started = time.time()
+    QUEUE_WAIT_SECONDS.labels("python").observe(started - jobs[job_id].get("submitted", started))
+    timings = jobs[job_id].setdefault("timings", {})
+    peak_rss = [0]
     try:
         jobs[job_id]["status"] = "running"
         jobs[job_id]["message"] = "Running Python CFD solver..."
         jobs[job_id]["progress"] = 0.1
         
-        # Import numpy
-        import numpy as np
-        
-        # Extract parameters
-        nx = params["nx"]
-        ny = params["ny"]
-        gamma = params["gamma"]
-        R_gas = 8314.0 / (params["molar_mass"] * 1000)
-        p_chamber = params["p_chamber"]
-        t_chamber = params["t_chamber"]
-        r_throat = params["r_throat"]
-        r_exit = params["r_exit"]
-        l_chamber = params["l_chamber"]
-        l_nozzle = params["l_nozzle"]
-        
-        # Generate grid
-        x = np.linspace(0, l_chamber + l_nozzle, nx)
-        r = np.linspace(0, r_exit, ny)
-        X, R = np.meshgrid(x, r, indexing='ij')
-        
-        # Initialize fields with quasi-1D solution
-        mach = np.zeros((nx, ny))
-        pressure = np.zeros((nx, ny))
-        temperature = np.zeros((nx, ny))
-        
-        for i, xi in enumerate(x):
-            # Nozzle contour
-            if xi <= l_chamber:
-                local_r = params["r_chamber"]
-                M = 0.2 + 0.6 * (xi / l_chamber)
-            else:
-                t = (xi - l_chamber) / l_nozzle
-                local_r = r_throat + (r_exit - r_throat) * t
-                M = 1.0 + 2.5 * t
-            
-            M = max(0.1, min(M, 4.0))
-            
-            # Isentropic relations
-            T_ratio = 1 + (gamma - 1) / 2 * M * M
-            p_ratio = T_ratio ** (gamma / (gamma - 1))
-            
-            for j in range(ny):
-                mach[i, j] = M
-                temperature[i, j] = t_chamber / T_ratio
-                pressure[i, j] = p_chamber / p_ratio
-            
-            # Update progress
-            if i % 10 == 0:
-                jobs[job_id]["progress"] = 0.1 + 0.7 * (i / nx)
-        
-        # Add shock diamonds in exhaust
-        for i in range(nx):
-            xi = x[i]
-            if xi > l_chamber + l_nozzle * 0.9:
-                for j in range(ny):
-                    # Oscillating pattern
-                    phase = (xi - l_chamber - l_nozzle) / (0.02)
-                    r_norm = r[j] / r_exit
-                    diamond_effect = 0.1 * np.sin(phase * np.pi) * np.exp(-r_norm * 2)
-                    mach[i, j] *= (1 + diamond_effect)
-        
-        # Calculate derived quantities
-        rho = pressure / (R_gas * temperature)
-        a = np.sqrt(gamma * R_gas * temperature)
-        vel_x = mach * a
-        vel_r = np.zeros_like(vel_x)
+        with span("solver", "python", timings, job_id), traced_peak(peak_rss):
+            fields = solve_fields_adaptive(params, shock_diamonds=True)
         
         jobs[job_id]["progress"] = 0.9
         jobs[job_id]["message"] = "Writing results..."
         
         # Build result
-        result = {
-            "x": X.flatten().tolist(),
-            "r": R.flatten().tolist(),
-            "pressure": pressure.flatten().tolist(),
-            "temperature": temperature.flatten().tolist(),
-            "mach": mach.flatten().tolist(),
-            "velocity_x": vel_x.flatten().tolist(),
-            "velocity_r": vel_r.flatten().tolist(),
-            "density": rho.flatten().tolist(),
-            "nx": nx,
-            "ny": ny,
-            "converged": True,
-            "iterations": nx * ny,
-            "solver": "python"
-        }
+        result = dict(
+            fields,
+            nx=params["nx"],
+            ny=params["ny"],
+            converged=True,
+            iterations=params["nx"] * params["ny"],
+            solver="python"
+        )
+        
+        with span("serialize", "python", timings, job_id), traced_peak(peak_rss):
+            write_result(result, result_dir)
         
-        with open(result_dir / "cfd_result.json", 'w') as f:
-            json.dump(result, f)
+        cost_model.record("python", params, time.time() - started, peak_rss[0], dir_size(result_dir))
         
         jobs[job_id]["status"] = "completed"
         jobs[job_id]["progress"] = 1.0
         jobs[job_id]["message"] = "Simulation completed"
         jobs[job_id]["result_url"] = f"/api/cfd/result/{job_id}"
+        JOBS_FINISHED.labels("python", "completed").inc()
         
     except Exception as e:
         jobs[job_id]["status"] = "failed"
         jobs[job_id]["message"] = f"Error: {str(e)}"
+        JOBS_FINISHED.labels("python", "failed").inc()
 
 
 @app.get("/api/cfd/status/{job_id}", response_model=JobStatus)
@@ -1321,36 +1059,114 @@ async def get_status(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     
     job = jobs[job_id]
+    message = job["message"]
+    if job["status"] == "pending":
+        position = scheduler.position(job_id)
+        if position:
+            message = f"{message}, position {position} in queue"
     return JobStatus(
         job_id=job_id,
         status=job["status"],
         progress=job["progress"],
-        message=job["message"],
+        message=message,
         result_url=job.get("result_url")
     )
 
 
 @app.get("/api/cfd/result/{job_id}")
-async def get_result(job_id: str):
-    """Get simulation results"""
+async def get_result(job_id: str, format: str = "json"):
+    """
+    Get simulation results
+    format=json (default) or columnar (cfd_result.bin, see result_format.py)
+    """
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
     
     if jobs[job_id]["status"] != "completed":
         raise HTTPException(status_code=400, detail="Job not completed")
+    if format not in ("json", "columnar"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'columnar'")
     
-    result_file = RESULTS_DIR / job_id / "cfd_result.json"
-    
-    if not result_file.exists():
+    path = result_path(RESULTS_DIR / job_id)
+    if path is None:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    with open(result_file) as f:
-        return json.load(f)
+    if format == "columnar" and path.name.startswith(COLUMNAR_FILE):
+        # Stored file served as is
+        headers = {"Content-Encoding": "gzip"} if path.suffix == ".gz" else None
+        return FileResponse(path, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+    
+    result = await asyncio.to_thread(read_result, RESULTS_DIR / job_id)
+    if format == "columnar":
+        return Response(content=encode_columnar(validate_result(result)), media_type=COLUMNAR_MEDIA_TYPE)
+    return Response(content=encode_json(result), media_type="application/json")
+
+
+def job_monitors(job_id: str) -> Path:
+    """Monitor directory of a job (live case while running, saved copy afterwards)"""
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    directory = monitor_dir(CASES_DIR / job_id, RESULTS_DIR / job_id)
+    if directory is None:
+        raise HTTPException(status_code=404, detail="No monitors for this job (OpenFOAM jobs only)")
+    return directory
+
+
+@app.get("/api/cfd/monitors/{job_id}")
+async def get_monitors(job_id: str):
+    """Latest probe values, exit mass flow / thrust and mass-flow drift of a job"""
+    directory = job_monitors(job_id)
+    body = await asyncio.to_thread(lambda: summary(directory, read_meta(directory)))
+    return Response(content=encode_json(dict(body, status=jobs[job_id]["status"])), media_type="application/json")
+
+
+@app.get("/api/cfd/monitors/{job_id}/probes")
+async def get_monitor_probes(job_id: str):
+    """Time series of p, T, U and Mach at the throat and exit probes"""
+    directory = job_monitors(job_id)
+    body = await asyncio.to_thread(lambda: read_probes(directory, read_meta(directory)))
+    return Response(content=encode_json(body), media_type="application/json")
+
+
+@app.get("/api/cfd/monitors/{job_id}/exit")
+async def get_monitor_exit(job_id: str):
+    """Time series of the exit-plane mass flow [kg/s] and thrust [N]"""
+    directory = job_monitors(job_id)
+    body = await asyncio.to_thread(lambda: read_exit(directory, read_meta(directory)))
+    return Response(content=encode_json(body), media_type="application/json")
+
+
+@app.get("/api/cfd/monitors/{job_id}/lines")
+async def get_monitor_lines(job_id: str, time: Optional[str] = None):
+    """Axis and wall samples (x, p, T, U, Ma) at one sample time, the latest by default"""
+    directory = job_monitors(job_id)
+    try:
+        body = await asyncio.to_thread(read_lines, directory, time)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No line samples at time {time}")
+    return Response(content=encode_json(body), media_type="application/json")
+
+
+@app.get("/api/cfd/log/{job_id}")
+async def get_log(job_id: str):
+    """Get the full OpenFOAM log of a job (all utilities, untruncated)"""
+    log_file = RESULTS_DIR / job_id / "openfoam.log"
+    
+    if log_file.exists():
+        return FileResponse(log_file, media_type="text/plain")
+    
+    # Cold logs are compressed by the janitor: serve them as-is, gzip-encoded
+    packed = log_file.with_name(log_file.name + ".gz")
+    if packed.exists():
+        return FileResponse(packed, media_type="text/plain", headers={"Content-Encoding": "gzip"})
+    
+    raise HTTPException(status_code=404, detail="Log not found")
 
 
 @app.delete("/api/cfd/job/{job_id}")
 async def delete_job(job_id: str):
     """Delete job and cleanup"""
+    scheduler.cancel(job_id)
     if job_id in jobs:
         del jobs[job_id]
     
@@ -1361,6 +1177,34 @@ async def delete_job(job_id: str):
     return {"message": "Job deleted"}
 
 
+@app.post("/api/cfd/job/{job_id}/pin")
+async def pin_job(job_id: str):
+    """Keep a job's case and results out of the retention policy"""
+    if job_id not in jobs and not (RESULTS_DIR / job_id).exists():
+        raise HTTPException(status_code=404, detail="Job not found")
+    janitor.pin(job_id)
+    return {"job_id": job_id, "pinned": True}
+
+
+@app.delete("/api/cfd/job/{job_id}/pin")
+async def unpin_job(job_id: str):
+    """Hand a job back to the retention policy"""
+    janitor.unpin(job_id)
+    return {"job_id": job_id, "pinned": False}
+
+
+@app.get("/api/cfd/storage")
+async def get_storage():
+    """Disk usage of the cases/results volumes and retention settings"""
+    return await asyncio.to_thread(janitor.usage)
+
+
+@app.post("/api/cfd/storage/sweep")
+async def sweep_storage():
+    """Run the retention policy now instead of waiting for the next cycle"""
+    return await janitor.run_sweep()
+
+
 @app.get("/api/cfd/jobs")
 async def list_jobs():
     """List all jobs"""
@@ -1368,7 +1212,8 @@ async def list_jobs():
         job_id: {
             "status": job["status"],
             "progress": job["progress"],
-            "message": job["message"]
+            "message": job["message"],
+            "timings": job.get("timings", {})
         }
         for job_id, job in jobs.items()
     }
@@ -1378,65 +1223,33 @@ async def list_jobs():
 @app.post("/api/cfd/solve")
 async def solve_direct(request: CFDRequest):
     """Direct synchronous CFD solve (returns results immediately)"""
-    import numpy as np
-    
-    params = request.dict()
-    
-    # Quick quasi-1D + 2D correction solution
-    nx = params["nx"]
-    ny = params["ny"]
-    gamma = params["gamma"]
-    R_gas = 8314.0 / (params["molar_mass"] * 1000)
-    p_chamber = params["p_chamber"]
-    t_chamber = params["t_chamber"]
-    r_throat = params["r_throat"]
-    r_exit = params["r_exit"]
-    l_chamber = params["l_chamber"]
-    l_nozzle = params["l_nozzle"]
-    
-    x = np.linspace(0, l_chamber + l_nozzle, nx)
-    r = np.linspace(0, r_exit, ny)
-    X, R = np.meshgrid(x, r, indexing='ij')
-    
-    mach = np.zeros((nx, ny))
-    pressure = np.zeros((nx, ny))
-    temperature = np.zeros((nx, ny))
-    
-    for i, xi in enumerate(x):
-        if xi <= l_chamber:
-            M = 0.2 + 0.6 * (xi / l_chamber)
-        else:
-            t = (xi - l_chamber) / l_nozzle
-            M = 1.0 + 2.5 * t
-        
-        M = max(0.1, min(M, 4.0))
-        T_ratio = 1 + (gamma - 1) / 2 * M * M
-        p_ratio = T_ratio ** (gamma / (gamma - 1))
-        
-        for j in range(ny):
-            mach[i, j] = M
-            temperature[i, j] = t_chamber / T_ratio
-            pressure[i, j] = p_chamber / p_ratio
-    
-    rho = pressure / (R_gas * temperature)
-    a = np.sqrt(gamma * R_gas * temperature)
-    vel_x = mach * a
-    
-    return {
-        "x": X.flatten().tolist(),
-        "r": R.flatten().tolist(),
-        "pressure": pressure.flatten().tolist(),
-        "temperature": temperature.flatten().tolist(),
-        "mach": mach.flatten().tolist(),
-        "velocity_x": vel_x.flatten().tolist(),
-        "velocity_r": np.zeros(nx * ny).tolist(),
-        "density": rho.flatten().tolist(),
-        "nx": nx,
-        "ny": ny,
-        "converged": True,
-        "iterations": 1,
-        "solver": "python-direct"
-    }
+    params = request.model_dump()
+    # Same sizing as queued jobs: the solve runs in this process
+    admit_request(params, "python", request.allow_downscale)
+    key = geometry_key(params)
+    
+    body = solve_cache.get(key)
+    cache_lookup("fast_solve", body is not None)
+    if body is None:
+        body = await asyncio.to_thread(render_direct_solution, params)
+        solve_cache.put(key, body)
+    
+    return Response(content=body, media_type="application/json")
+
+
+def render_direct_solution(params: dict) -> bytes:
+    """Quasi-1D solution encoded as the /api/cfd/solve JSON body"""
+    with span("solver", "direct"):
+        fields = solve_fields_adaptive(params)
+    with span("serialize", "direct"):
+        return encode_json(dict(
+            fields,
+            nx=params["nx"],
+            ny=params["ny"],
+            converged=True,
+            iterations=1,
+            solver="python-direct"
+        ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Disk quota, retention and compaction for the cases/results volumes
+A background janitor periodically:
+  - deletes raw case directories once their results are extracted (unless pinned)
+  - compresses cold result files
+  - enforces a maximum age and a total-size quota (oldest unpinned jobs first)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from result_format import COLUMNAR_FILE, read_columnar
+
+
+# Markers and file names shared with server.py
+PIN_FILE = ".pinned"
+RESULT_FILE = "cfd_result.json"
+COMPRESSIBLE_FILES = (COLUMNAR_FILE, RESULT_FILE, "openfoam.log")
+# Stored result, newest format first (cfd_result.json: jobs from older versions)
+RESULT_FILES = (COLUMNAR_FILE, RESULT_FILE)
+
+# Never evict or compress anything touched more recently than this
+MIN_AGE_SECONDS = 60.0
+
+
+def dir_size(path: Path) -> int:
+    """Total size in bytes of all files below path"""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return total
+
+
+def last_modified(path: Path) -> float:
+    """Most recent mtime of path and its direct children"""
+    latest = 0.0
+    try:
+        latest = path.stat().st_mtime
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    latest = max(latest, entry.stat(follow_symlinks=False).st_mtime)
+                except FileNotFoundError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return latest
+
+
+def is_job_dir(path: Path) -> bool:
+    """Job directories; dot-directories (e.g. the case templates) are not jobs"""
+    return path.is_dir() and not path.name.startswith(".")
+
+
+def result_path(result_dir: Path) -> Optional[Path]:
+    """Stored result file of a job (columnar or JSON, plain or compressed)"""
+    for name in RESULT_FILES:
+        for path in (result_dir / name, result_dir / (name + ".gz")):
+            if path.exists():
+                return path
+    return None
+
+
+def read_result(result_dir: Path) -> Optional[dict]:
+    """Load the stored result, transparently handling the compressed variants"""
+    path = result_path(result_dir)
+    if path is None:
+        return None
+    if path.name.startswith(COLUMNAR_FILE):
+        return read_columnar(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, 'rt') as f:
+            return json.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def has_result(result_dir: Path) -> bool:
+    return result_path(result_dir) is not None
+
+
+class StorageJanitor:
+    """Applies the retention policy to CASES_DIR and RESULTS_DIR"""
+
+    def __init__(self, cases_dir: Path, results_dir: Path,
+                 is_active: Callable[[str], bool],
+                 on_evict: Callable[[str], None] = None,
+                 max_bytes: int = 20 * 1024**3,
+                 max_age_hours: float = 168.0,
+                 compress_after_hours: float = 24.0,
+                 interval: float = 600.0):
+        self.cases_dir = cases_dir
+        self.results_dir = results_dir
+        self.is_active = is_active
+        self.on_evict = on_evict
+        self.max_bytes = max_bytes
+        self.max_age = max_age_hours * 3600.0
+        self.compress_after = compress_after_hours * 3600.0
+        self.interval = interval
+        self.last_sweep: Dict = {}
+        self._task: Optional[asyncio.Task] = None
+        # The background loop and POST /api/cfd/storage/sweep both sweep from worker threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cases_dir: Path, results_dir: Path, **kwargs) -> "StorageJanitor":
+        return cls(
+            cases_dir, results_dir,
+            max_bytes=int(float(os.environ.get("STORAGE_MAX_GB", "20")) * 1024**3),
+            max_age_hours=float(os.environ.get("STORAGE_MAX_AGE_HOURS", "168")),
+            compress_after_hours=float(os.environ.get("STORAGE_COMPRESS_AFTER_HOURS", "24")),
+            interval=float(os.environ.get("STORAGE_SWEEP_INTERVAL", "600")),
+            **kwargs
+        )
+
+    # ------------------------------------------------------------------
+    # Pinning
+    # ------------------------------------------------------------------
+    def is_pinned(self, job_id: str) -> bool:
+        return (self.results_dir / job_id / PIN_FILE).exists()
+
+    def pin(self, job_id: str):
+        result_dir = self.results_dir / job_id
+        result_dir.mkdir(parents=True, exist_ok=True)
+        (result_dir / PIN_FILE).touch()
+
+    def unpin(self, job_id: str):
+        (self.results_dir / job_id / PIN_FILE).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Individual actions
+    # ------------------------------------------------------------------
+    def release_case(self, job_id: str) -> int:
+        """Delete the raw case directory of a finished job. Returns bytes freed."""
+        case_dir = self.cases_dir / job_id
+        if not case_dir.exists() or self.is_pinned(job_id) or self.is_active(job_id):
+            return 0
+        if not has_result(self.results_dir / job_id):
+            return 0
+        freed = dir_size(case_dir)
+        shutil.rmtree(case_dir, ignore_errors=True)
+        return freed
+
+    def compress_results(self, job_id: str) -> int:
+        """Gzip the result and log files of a job. Returns bytes saved."""
+        saved = 0
+        result_dir = self.results_dir / job_id
+        for name in COMPRESSIBLE_FILES:
+            src = result_dir / name
+            if not src.exists():
+                continue
+            dst = result_dir / (name + ".gz")
+            before = src.stat().st_size
+            with open(src, 'rb') as f_in, gzip.open(dst, 'wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            os.utime(dst, (src.stat().st_atime, src.stat().st_mtime))
+            src.unlink()
+            saved += before - dst.stat().st_size
+        return saved
+
+    def evict(self, job_id: str) -> int:
+        """Delete everything stored for a job. Returns bytes freed."""
+        freed = 0
+        for base in (self.cases_dir, self.results_dir):
+            path = base / job_id
+            if path.exists():
+                freed += dir_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+        return freed
+
+    # ------------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------------
+    def _job_ids(self) -> List[str]:
+        ids = set()
+        for base in (self.cases_dir, self.results_dir):
+            if base.exists():
+                ids.update(d.name for d in base.iterdir() if is_job_dir(d))
+        return sorted(ids)
+
+    def _candidates(self, now: float) -> List[Dict]:
+        """Inactive, unpinned jobs with their size and last activity, oldest first"""
+        out = []
+        for job_id in self._job_ids():
+            if self.is_active(job_id) or self.is_pinned(job_id):
+                continue
+            case_dir = self.cases_dir / job_id
+            result_dir = self.results_dir / job_id
+            mtime = max(last_modified(case_dir), last_modified(result_dir))
+            if now - mtime < MIN_AGE_SECONDS:
+                # Directories of a job being submitted right now
+                continue
+            out.append({
+                "job_id": job_id,
+                "mtime": mtime,
+                "bytes": dir_size(case_dir) + dir_size(result_dir),
+            })
+        out.sort(key=lambda c: c["mtime"])
+        return out
+
+    def sweep(self, evicted: Optional[List[str]] = None) -> Dict:
+        """Run one full pass of the retention policy, appending evicted job ids to evicted"""
+        if evicted is None:
+            evicted = []
+        with self._lock:
+            start = time.time()
+            now = start
+            stats = {"cases_released": 0, "compressed": 0, "expired": 0, "evicted_for_quota": 0,
+                     "bytes_freed": 0}
+
+            # 1. Raw case directories whose results are already extracted
+            for job_id in self._job_ids():
+                freed = self.release_case(job_id)
+                if freed:
+                    stats["cases_released"] += 1
+                    stats["bytes_freed"] += freed
+
+            candidates = self._candidates(now)
+
+            # 2. Age limit
+            remaining = []
+            for cand in candidates:
+                if self.max_age > 0 and now - cand["mtime"] > self.max_age:
+                    stats["bytes_freed"] += self.evict(cand["job_id"])
+                    evicted.append(cand["job_id"])
+                    stats["expired"] += 1
+                else:
+                    remaining.append(cand)
+
+            # 3. Compress cold results
+            for cand in remaining:
+                if self.compress_after > 0 and now - cand["mtime"] > self.compress_after:
+                    saved = self.compress_results(cand["job_id"])
+                    if saved:
+                        stats["compressed"] += 1
+                        stats["bytes_freed"] += saved
+                        cand["bytes"] -= saved
+
+            # 4. Total-size quota, oldest first
+            total = dir_size(self.cases_dir) + dir_size(self.results_dir)
+            for cand in remaining:
+                if self.max_bytes <= 0 or total <= self.max_bytes:
+                    break
+                freed = self.evict(cand["job_id"])
+                evicted.append(cand["job_id"])
+                total -= freed
+                stats["bytes_freed"] += freed
+                stats["evicted_for_quota"] += 1
+
+            stats["duration"] = round(time.time() - start, 3)
+            stats["timestamp"] = now
+            self.last_sweep = stats
+            if any(stats[k] for k in ("cases_released", "compressed", "expired", "evicted_for_quota")):
+                print(f"[StorageJanitor] sweep: {stats}")
+            return stats
+
+    def usage(self) -> Dict:
+        """Current usage of both volumes, for /api/cfd/storage"""
+        def volume(base: Path) -> Dict:
+            dirs = [d for d in base.iterdir() if is_job_dir(d)] if base.exists() else []
+            disk = shutil.disk_usage(base)
+            return {
+                "path": str(base),
+                "bytes": dir_size(base),
+                "jobs": len(dirs),
+                "disk_total": disk.total,
+                "disk_free": disk.free,
+            }
+
+        cases = volume(self.cases_dir)
+        results = volume(self.results_dir)
+        compressed = sum(
+            1 for d in self.results_dir.iterdir()
+            if d.is_dir() and any((d / (name + ".gz")).exists() for name in RESULT_FILES)
+        ) if self.results_dir.exists() else 0
+        pinned = [job_id for job_id in self._job_ids() if self.is_pinned(job_id)]
+        total = cases["bytes"] + results["bytes"]
+        return {
+            "cases": cases,
+            "results": dict(results, compressed=compressed),
+            "total_bytes": total,
+            "quota_used": round(total / self.max_bytes, 4) if self.max_bytes > 0 else None,
+            "pinned": pinned,
+            "limits": {
+                "max_bytes": self.max_bytes,
+                "max_age_hours": self.max_age / 3600.0,
+                "compress_after_hours": self.compress_after / 3600.0,
+                "sweep_interval": self.interval,
+            },
+            "last_sweep": self.last_sweep,
+        }
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+    async def run_sweep(self) -> Dict:
+        """Sweep in a worker thread, then call on_evict on the event loop"""
+        evicted: List[str] = []
+        try:
+            return await asyncio.to_thread(self.sweep, evicted)
+        finally:
+            if self.on_evict:
+                for job_id in evicted:
+                    self.on_evict(job_id)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_sweep()
+            except Exception as e:
+                print(f"[StorageJanitor] sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
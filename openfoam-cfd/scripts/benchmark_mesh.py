@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Mesh resolution benchmark
+Runs a family of meshes (nx, ny, stretch_factor, wedge angle) through the
+mesh generator, the polyMesh writer and the Python solvers, and records per
+case the wall time and peak memory of every stage, the mesh quality, the
+iterations to convergence and the exit error against the isentropic
+area-Mach solution: mean exit state, and mass flow and thrust summed over
+the discrete cells the exit plane crosses (which converge with the mesh).
+Writes benchmark_mesh.json and, with matplotlib, benchmark_mesh.png;
+--baseline compares against an earlier report and exits with status 1 on
+a regression. Runs that diverged, in either report, are not compared.
+
+Family: BENCH_NX x BENCH_NY at the first stretch factor and wedge angle,
+then the other BENCH_STRETCH and BENCH_WEDGE values at the middle resolution.
+Every stage runs in a fresh process: its peak memory is the peak RSS above
+the RSS before it. The allocation peak (tracemalloc) comes from a second,
+traced run, so tracing never slows the timed one; the traced Euler run stops
+after BENCH_TRACE_ITER iterations.
+
+Usage: benchmark_mesh.py [output_dir] [--quick] [--solvers euler,fast]
+                         [--params params.json] [--baseline report.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from generate_mesh import create_nozzle_geometry, generate_structured_mesh, stretched_distribution
+from polymesh import write_polymesh
+from python_cfd_solver import EulerSolver2D
+
+# Quasi-1D solver of the API (api/fast_solver.py)
+API_DIR = Path(os.environ.get("CFD_API_DIR", Path(__file__).resolve().parent.parent / "api"))
+if str(API_DIR) not in sys.path:
+    sys.path.append(str(API_DIR))
+from fast_solver import area_mach, solve_fields
+
+
+def _values(name: str, default: str) -> List[float]:
+    return [float(v) for v in os.environ.get(name, default).split(",") if v.strip()]
+
+
+BENCH_NX = [int(v) for v in _values("BENCH_NX", "50,100,200")]
+BENCH_NY = [int(v) for v in _values("BENCH_NY", "15,30,60")]
+BENCH_STRETCH = _values("BENCH_STRETCH", "1.0,1.05,1.1")
+# Total wedge angle in degrees (write_polymesh); convert_to_openfoam writes 10
+BENCH_WEDGE = _values("BENCH_WEDGE", "10,5,2.5")
+BENCH_MAX_ITER = int(os.environ.get("BENCH_MAX_ITER", "2000"))
+BENCH_TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "1e-6"))
+# Iterations to convergence also counted as a drop of the residual by this many decades
+BENCH_RESIDUAL_DROP = float(os.environ.get("BENCH_RESIDUAL_DROP", "3"))
+# Iterations of the traced Euler run; its working set peaks in the first one
+BENCH_TRACE_ITER = int(os.environ.get("BENCH_TRACE_ITER", "5"))
+# Regression: a stage more than this factor slower or larger than in the baseline
+BENCH_REGRESSION = float(os.environ.get("BENCH_REGRESSION", "1.25"))
+# Values below these are timing noise and never compared
+REGRESSION_FLOORS = {"wall": 0.05, "peak_rss": 16 << 20, "peak_traced": 1 << 18, "iterations": 1}
+# Relative exit errors below this are round-off and never compared
+ERROR_FLOOR = 1e-6
+
+QUICK = {"nx": [40, 80], "ny": [10, 20], "stretch": [1.0, 1.1], "wedge": [10.0, 5.0], "max_iter": 200}
+
+DEFAULT_PARAMS = {
+    "r_throat": 0.02, "r_chamber": 0.04, "r_exit": 0.06,
+    "l_chamber": 0.1, "l_nozzle": 0.15,
+    "p_chamber": 1e6, "p_ambient": 101325.0, "t_chamber": 3000.0, "gamma": 1.2, "molar_mass": 0.025,
+}
+
+CASE_KEYS = ("nx", "ny", "stretch_factor", "wedge_angle")
+EXIT_FIELDS = ("mach", "pressure", "temperature")
+FLUX_FIELDS = ("mass_flow", "thrust")
+# Nodal fields the exit fluxes are built from
+FLUX_INPUTS = ("density", "velocity_x", "pressure")
+# Universal gas constant [J/(mol K)], molar_mass is in kg/mol
+R_UNIVERSAL = 8.31446
+REPORT_FILE = "benchmark_mesh.json"
+PLOT_FILE = "benchmark_mesh.png"
+
+
+class Diverged(Exception):
+    """Raised from the progress callback to stop a solver whose residual is no longer finite"""
+
+    def __init__(self, iteration: int):
+        super().__init__(f"diverged at iteration {iteration}")
+        self.iteration = iteration
+
+
+def mesh_family(nx_values, ny_values, stretch_values, wedge_values) -> List[Dict]:
+    """Resolution sweep at the base stretch and wedge, then stretch and wedge sweeps at the middle resolution"""
+    base_stretch, base_wedge = stretch_values[0], wedge_values[0]
+    mid = (nx_values[len(nx_values) // 2], ny_values[len(ny_values) // 2])
+    cases = [(nx, ny, base_stretch, base_wedge) for nx in nx_values for ny in ny_values]
+    cases += [(*mid, s, base_wedge) for s in stretch_values[1:]]
+    cases += [(*mid, base_stretch, w) for w in wedge_values[1:]]
+    return [dict(zip(CASE_KEYS, case)) for case in dict.fromkeys(cases)]
+
+
+def case_key(case: Dict) -> tuple:
+    return tuple(case[k] for k in CASE_KEYS)
+
+
+def case_name(case: Dict) -> str:
+    return f"{case['nx']}x{case['ny']} stretch={case['stretch_factor']:g} wedge={case['wedge_angle']:g}"
+
+
+def analytic_exit(params: Dict) -> Dict:
+    """Isentropic exit state for the exit/throat area ratio, supersonic branch, with its mass flow and thrust"""
+    gamma = params["gamma"]
+    r_gas = R_UNIVERSAL / params["molar_mass"]
+    area_ratio = (params["r_exit"] / params["r_throat"]) ** 2
+    mach = float(area_mach(np.array([area_ratio]), gamma, np.array([True]))[0])
+    t_ratio = 1 + (gamma - 1) / 2 * mach * mach
+    pressure = params["p_chamber"] / t_ratio ** (gamma / (gamma - 1))
+    temperature = params["t_chamber"] / t_ratio
+    velocity = mach * np.sqrt(gamma * r_gas * temperature)
+    area = np.pi * params["r_exit"] ** 2
+    mass_flow = pressure / (r_gas * temperature) * velocity * area
+    return {
+        "area_ratio": area_ratio,
+        "mach": mach,
+        "pressure": pressure,
+        "temperature": temperature,
+        "mass_flow": float(mass_flow),
+        "thrust": float(mass_flow * velocity + (pressure - params["p_ambient"]) * area),
+    }
+
+
+def exit_state(x: np.ndarray, r: np.ndarray, fields: Dict, x_exit: float) -> Dict:
+    """
+    Area-weighted mean of fields over the cross-section at x_exit, interpolated
+    between the two neighbouring columns. x: (nx,), r and fields: (nx, ny)
+    """
+    weights = r * np.gradient(r, axis=1)
+    total = weights.sum(axis=1)
+    return {name: float(np.interp(x_exit, x, (values * weights).sum(axis=1) / total))
+            for name, values in fields.items()}
+
+
+def exit_fluxes(x: np.ndarray, r: np.ndarray, fields: Dict, x_exit: float, p_ambient: float) -> Dict:
+    """
+    Mass flow and thrust through the exit plane, summed over the column of
+    cells it crosses: cell-centre values (mean of the four nodes) times the
+    annulus of each cell at x_exit. x: (nx,), r and fields: (nx, ny) nodal
+    """
+    i = int(np.clip(np.searchsorted(x, x_exit) - 1, 0, len(x) - 2))
+    w = (x_exit - x[i]) / (x[i + 1] - x[i])
+    area = np.pi * np.diff(((1 - w) * r[i] + w * r[i + 1]) ** 2)
+    rho, u, p = (0.25 * (v[i, :-1] + v[i, 1:] + v[i + 1, :-1] + v[i + 1, 1:])
+                 for v in (fields[name] for name in FLUX_INPUTS))
+    return {"mass_flow": float((rho * u * area).sum()),
+            "thrust": float(((rho * u * u + p - p_ambient) * area).sum())}
+
+
+def iterations_to_drop(samples, orders: float) -> Optional[int]:
+    """Iterations until the residual is 10^-orders times the first one; samples: (iteration, residual)"""
+    if not samples:
+        return None
+    target = samples[0][1] * 10.0 ** -orders
+    return next((it + 1 for it, res in samples if np.isfinite(res) and res <= target), None)
+
+
+def mesh_quality(mesh: Dict, wedge_angle: float) -> Dict:
+    """Cell shape statistics of a structured mesh (nodes row by row) and its wedge"""
+    nx, ny = mesh["nx"], mesh["ny"]
+    x = mesh["nodes_x"].reshape(ny, nx)
+    r = mesh["nodes_r"].reshape(ny, nx)
+    dx = np.diff(x, axis=1)[:-1]
+    dr = 0.5 * (np.diff(r, axis=0)[:, :-1] + np.diff(r, axis=0)[:, 1:])
+    r_centre = 0.25 * (r[:-1, :-1] + r[:-1, 1:] + r[1:, :-1] + r[1:, 1:])
+    thickness = r_centre * np.radians(wedge_angle)
+    # Cells of the first row are prisms on the axis: checkMesh sees them as very thin
+    sizes = np.stack((dx, dr, thickness))
+    return {
+        "cells": int((nx - 1) * (ny - 1)),
+        "max_aspect_ratio": float((np.maximum(dx, dr) / np.minimum(dx, dr)).max()),
+        "max_wedge_aspect_ratio": float((sizes.max(axis=0) / sizes.min(axis=0)).max()),
+        "max_radial_expansion": float(np.maximum(dr[1:] / dr[:-1], dr[:-1] / dr[1:]).max()) if ny > 2 else 1.0,
+        "max_axial_expansion": float(np.maximum(dx[:, 1:] / dx[:, :-1], dx[:, :-1] / dx[:, 1:]).max()) if nx > 2 else 1.0,
+        # Axial grid lines follow the contour: angle of the cell faces to a right angle
+        "max_skew_deg": float(np.degrees(np.arctan(np.abs(np.diff(r, axis=1)) / np.diff(x, axis=1))).max()),
+        "wall_cell_height": float(dr[-1].min()),
+        "min_volume": float((dx * dr * thickness).min()),
+    }
+
+
+def mesh_stage(case: Dict, params: Dict, settings: Dict) -> Dict:
+    """generate_structured_mesh, then write_polymesh at the case wedge angle (convert_to_openfoam)"""
+    start = time.perf_counter()
+    x_wall, r_wall = create_nozzle_geometry(dict(params, nx=case["nx"]))
+    mesh = generate_structured_mesh(x_wall, r_wall, case["ny"], case["stretch_factor"])
+    generated = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        counts = write_polymesh(mesh, Path(tmp) / "polyMesh", case["wedge_angle"])
+        written = time.perf_counter()
+        size = sum(f.stat().st_size for f in Path(tmp).rglob("*") if f.is_file())
+    return {
+        "generate_wall": generated - start,
+        "polymesh_wall": written - generated,
+        "polymesh_bytes": size,
+        "polymesh": counts,
+        "quality": mesh_quality(mesh, case["wedge_angle"]),
+    }
+
+
+def euler_stage(case: Dict, params: Dict, settings: Dict) -> Dict:
+    """2D Euler solver of python_cfd_solver.py (run_cfd.sh fallback), stopped when it diverges"""
+    solver = EulerSolver2D(case["nx"], case["ny"], params["gamma"])
+    sampled = []
+
+    def progress(info):
+        sampled.append((info["iteration"], float(info["residual"])))
+        if not np.isfinite(info["residual"]):
+            raise Diverged(info["iteration"])
+
+    run = dict(params, nx=case["nx"], ny=case["ny"], stretch_factor=case["stretch_factor"],
+               max_iter=settings["max_iter"], tolerance=settings["tolerance"])
+    out = {"converged": False, "diverged": False}
+    with np.errstate(all="ignore"), contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = solver.solve(run, progress)
+        except Diverged as e:
+            return dict(out, diverged=True, iterations=e.iteration + 1,
+                        residual=None, iterations_to_drop=iterations_to_drop(sampled, settings["residual_drop"]))
+
+    history = np.asarray(result["residual_history"], dtype=np.float64)
+    out.update(converged=bool(result["converged"]), iterations=int(result["iterations"]),
+               residual=float(history[-1]),
+               iterations_to_drop=iterations_to_drop(list(enumerate(history)), settings["residual_drop"]))
+    if not np.all(np.isfinite(history)):
+        out["diverged"] = True
+        return out
+    # Solver arrays are (ny, nx)
+    shape = (case["ny"], case["nx"])
+    fields = {name: np.asarray(result[name]).reshape(shape).T for name in EXIT_FIELDS + FLUX_INPUTS}
+    r = np.asarray(result["r"]).reshape(shape).T
+    x = np.asarray(result["x"]).reshape(shape)[0]
+    out["exit"] = exit_values(x, r, fields, params)
+    return out
+
+
+def fast_stage(case: Dict, params: Dict, settings: Dict) -> Dict:
+    """Quasi-1D area-Mach solution of fast_solver.py (API python backend) on the stretched grid"""
+    eta = stretched_distribution(case["ny"], case["stretch_factor"])
+    result = solve_fields(dict(params, nx=case["nx"], ny=case["ny"]), eta=eta)
+    # Result arrays are (nx, ny), x-major
+    shape = (case["nx"], case["ny"])
+    fields = {name: result[name].reshape(shape) for name in EXIT_FIELDS + FLUX_INPUTS}
+    x = result["x"].reshape(shape)[:, 0]
+    return {"converged": True, "diverged": False, "iterations": None, "residual": None,
+            "iterations_to_drop": None, "exit": exit_values(x, result["r"].reshape(shape), fields, params)}
+
+
+def exit_values(x: np.ndarray, r: np.ndarray, fields: Dict, params: Dict) -> Dict:
+    """Mean exit state and exit fluxes of x-major nodal fields"""
+    x_exit = params["l_chamber"] + params["l_nozzle"]
+    state = exit_state(x, r, {name: fields[name] for name in EXIT_FIELDS}, x_exit)
+    return dict(state, **exit_fluxes(x, r, fields, x_exit, params["p_ambient"]))
+
+
+STAGES = {"mesh": mesh_stage, "euler": euler_stage, "fast": fast_stage}
+SOLVERS = ("euler", "fast")
+
+
+def _rss() -> int:
+    """Current resident set size of this process [bytes]"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _max_rss() -> int:
+    """Peak resident set size of this process [bytes] (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _measured(stage: str, case: Dict, params: Dict, settings: Dict, traced: bool) -> Dict:
+    """Runs in a fresh process: stage output plus its wall time, peak RSS growth and allocation peak"""
+    before = _rss()
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    out = STAGES[stage](case, params, settings)
+    out["wall"] = time.perf_counter() - start
+    out["peak_rss"] = max(0, _max_rss() - before)
+    if traced:
+        out["peak_traced"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return out
+
+
+def _in_process(stage: str, case: Dict, params: Dict, settings: Dict, traced: bool) -> Dict:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_measured, (stage, case, params, settings, traced))
+
+
+def run_stage(stage: str, case: Dict, params: Dict, settings: Dict) -> Dict:
+    """Timed run, then a traced run for the allocation peak"""
+    out = _in_process(stage, case, params, settings, False)
+    short = dict(settings, max_iter=min(BENCH_TRACE_ITER, settings["max_iter"]))
+    out["peak_traced"] = _in_process(stage, case, params, short, True)["peak_traced"]
+    return out
+
+
+def exit_errors(state: Optional[Dict], analytic: Dict) -> Optional[Dict]:
+    """Relative errors of the exit state and fluxes against the analytic ones"""
+    if not state:
+        return None
+    return {name: abs(state[name] - analytic[name]) / abs(analytic[name]) for name in EXIT_FIELDS + FLUX_FIELDS}
+
+
+def run_case(case: Dict, params: Dict, settings: Dict, solvers, analytic: Dict) -> Dict:
+    mesh = run_stage("mesh", case, params, settings)
+    record = dict(case, cells=mesh["quality"]["cells"], mesh=mesh, solvers={})
+    notes = [f"mesh {mesh['generate_wall'] + mesh['polymesh_wall']:.2f}s"]
+    for name in solvers:
+        out = run_stage(name, case, params, settings)
+        out["error"] = exit_errors(out.get("exit"), analytic)
+        record["solvers"][name] = out
+        if out["diverged"]:
+            notes.append(f"{name} diverged at {out['iterations']} ({out['wall']:.2f}s)")
+        else:
+            notes.append(f"{name} {out['wall']:.2f}s Mach err {out['error']['mach']:.2e}, "
+                         f"mass flow err {out['error']['mass_flow']:.2e}")
+    print(f"[Bench] {case_name(case)}: " + ", ".join(notes))
+    return record
+
+
+def _stages(record: Dict) -> Dict:
+    return {"mesh": record["mesh"], **record["solvers"]}
+
+
+def regressions(report: Dict, baseline: Dict, threshold: float = BENCH_REGRESSION) -> List[Dict]:
+    """
+    Stages of cases present in both reports whose wall time, peak RSS,
+    iterations or exit errors grew past threshold. A solver run that
+    diverged in either report measures the blow-up, not the solver: skipped.
+    """
+    previous = {case_key(c): c for c in baseline.get("cases", [])}
+    found = []
+    for record in report["cases"]:
+        before = previous.get(case_key(record))
+        if before is None:
+            continue
+        old_stages = _stages(before)
+        for stage, values in _stages(record).items():
+            old_values = old_stages.get(stage, {})
+            if values.get("diverged") or old_values.get("diverged"):
+                continue
+            floors = dict(REGRESSION_FLOORS, **{f"{field}_error": ERROR_FLOOR for field in EXIT_FIELDS + FLUX_FIELDS})
+            for metric, floor in floors.items():
+                if metric.endswith("_error"):
+                    old = (old_values.get("error") or {}).get(metric[:-len("_error")])
+                    new = (values.get("error") or {}).get(metric[:-len("_error")])
+                else:
+                    old, new = old_values.get(metric), values.get(metric)
+                if old is None or new is None or old < floor:
+                    continue
+                if new > threshold * old:
+                    found.append({"case": case_name(record), "stage": stage, "metric": metric,
+                                  "baseline": old, "current": new, "ratio": new / old})
+    return found
+
+
+def plot_report(report: Dict, path: Path) -> Optional[Path]:
+    """Cost, accuracy and mesh quality against the family parameters (None without matplotlib)"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("[Bench] matplotlib not installed, no plots")
+        return None
+
+    base_stretch, base_wedge = report["family"]["stretch"][0], report["family"]["wedge"][0]
+    cases = report["cases"]
+    sweep = sorted((c for c in cases if c["stretch_factor"] == base_stretch and c["wedge_angle"] == base_wedge),
+                   key=lambda c: c["cells"])
+    mid = report["family"]["mid"]
+    at_mid = [c for c in cases if (c["nx"], c["ny"]) == tuple(mid)]
+    solvers = report["settings"]["solvers"]
+    cells = [c["cells"] for c in sweep]
+
+    def series(stage, metric, finished_only=False):
+        values = [_stages(c).get(stage, {}).get(metric) for c in sweep]
+        if finished_only:
+            values = [v if not c["solvers"][stage]["diverged"] else None for c, v in zip(sweep, values)]
+        return [n for n, v in zip(cells, values) if v], [v for v in values if v]
+
+    def label(name):
+        diverged = sum(c["solvers"][name]["diverged"] for c in sweep)
+        return f"{name} ({diverged} diverged)" if diverged else name
+
+    fig, axes = plt.subplots(2, 3, figsize=(15, 8))
+    ax = axes[0, 0]
+    ax.loglog(cells, [c["mesh"]["generate_wall"] for c in sweep], "o-", label="generate_mesh")
+    ax.loglog(cells, [c["mesh"]["polymesh_wall"] for c in sweep], "o-", label="polyMesh")
+    for name in solvers:
+        ax.loglog(*series(name, "wall"), "s-", label=label(name))
+    ax.set(xlabel="cells", ylabel="wall time [s]", title="Wall time")
+    ax.legend()
+
+    ax = axes[0, 1]
+    for name in ("mesh",) + tuple(solvers):
+        for metric, style in (("peak_rss", "o-"), ("peak_traced", "s--")):
+            n, peak = series(name, metric)
+            if n:
+                ax.loglog(n, np.array(peak) / 1e6, style, label=f"{name} {metric.split('_')[1]}")
+    ax.set(xlabel="cells", ylabel="peak [MB]", title="Peak memory (RSS growth, allocations)")
+    ax.legend()
+
+    ax = axes[0, 2]
+    drop = report["settings"]["residual_drop"]
+    for name in solvers:
+        for metric, style, text in (("iterations", "o-", "iterations"), ("iterations_to_drop", "s--", f"residual / 1e{drop:g}")):
+            n, iterations = series(name, metric, finished_only=True)
+            if n:
+                ax.loglog(n, iterations, style, label=f"{label(name)} {text}")
+    ax.set(xlabel="cells", ylabel="iterations", title="Iterations (runs that did not diverge)")
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend()
+    else:
+        ax.text(0.5, 0.5, "no finished run", ha="center", va="center", transform=ax.transAxes)
+
+    ax = axes[1, 0]
+    for name in solvers:
+        for field, style in zip(EXIT_FIELDS + FLUX_FIELDS, ("o-", "s--", "^:", "v-", "d--")):
+            errors = [((c["solvers"][name].get("error") or {}).get(field)) for c in sweep]
+            points = [(n, e) for n, e in zip(cells, errors) if e]
+            if points:
+                ax.loglog(*zip(*points), style, label=f"{name} {field}")
+    ax.set(xlabel="cells", ylabel="relative error", title="Exit state and flux error vs area-Mach")
+    ax.legend()
+
+    ax = axes[1, 1]
+    stretched = sorted((c for c in at_mid if c["wedge_angle"] == base_wedge), key=lambda c: c["stretch_factor"])
+    stretch = [c["stretch_factor"] for c in stretched]
+    for metric in ("max_aspect_ratio", "max_radial_expansion"):
+        ax.semilogy(stretch, [c["mesh"]["quality"][metric] for c in stretched], "o-", label=metric)
+    ax.set(xlabel="stretch factor", title=f"Quality at {mid[0]}x{mid[1]}")
+    ax.legend()
+
+    ax = axes[1, 2]
+    wedges = sorted((c for c in at_mid if c["stretch_factor"] == base_stretch), key=lambda c: c["wedge_angle"])
+    ax.semilogy([c["wedge_angle"] for c in wedges], [c["mesh"]["quality"]["max_wedge_aspect_ratio"] for c in wedges],
+                "o-", label="max_wedge_aspect_ratio")
+    ax.set(xlabel="wedge angle [deg]", title=f"Wedge cells at {mid[0]}x{mid[1]}")
+    ax.legend()
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path
+
+
+def _plain(value):
+    """Report value as strict JSON: numpy scalars as numbers, NaN and infinities as null"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mesh resolution against cost and exit accuracy")
+    parser.add_argument("output_dir", nargs="?", type=Path, default=Path("benchmark"))
+    parser.add_argument("--quick", action="store_true", help="small family and iteration count (smoke run)")
+    parser.add_argument("--solvers", default=",".join(SOLVERS), help=f"comma-separated, from {', '.join(SOLVERS)}")
+    parser.add_argument("--params", type=Path, help="nozzle parameters JSON (default: DEFAULT_PARAMS)")
+    parser.add_argument("--baseline", type=Path, help="earlier report: exit 1 on a regression")
+    args = parser.parse_args()
+
+    solvers = [s for s in args.solvers.split(",") if s]
+    unknown = set(solvers) - set(SOLVERS)
+    if unknown:
+        parser.error(f"unknown solvers: {', '.join(sorted(unknown))}")
+    params = dict(DEFAULT_PARAMS)
+    if args.params:
+        with open(args.params) as f:
+            params.update(json.load(f))
+
+    if args.quick:
+        family = {"nx": QUICK["nx"], "ny": QUICK["ny"], "stretch": QUICK["stretch"], "wedge": QUICK["wedge"]}
+        max_iter = QUICK["max_iter"]
+    else:
+        family = {"nx": BENCH_NX, "ny": BENCH_NY, "stretch": BENCH_STRETCH, "wedge": BENCH_WEDGE}
+        max_iter = BENCH_MAX_ITER
+    family["mid"] = [family["nx"][len(family["nx"]) // 2], family["ny"][len(family["ny"]) // 2]]
+    settings = {"max_iter": max_iter, "tolerance": BENCH_TOLERANCE,
+                "residual_drop": BENCH_RESIDUAL_DROP, "solvers": solvers}
+    cases = mesh_family(family["nx"], family["ny"], family["stretch"], family["wedge"])
+    analytic = analytic_exit(params)
+
+    print(f"[Bench] {len(cases)} meshes, solvers: {', '.join(solvers)}")
+    print(f"[Bench] Analytic exit: Mach {analytic['mach']:.4f}, p {analytic['pressure']:.0f} Pa, "
+          f"T {analytic['temperature']:.1f} K (A/A* = {analytic['area_ratio']:.3f}), "
+          f"mass flow {analytic['mass_flow']:.4f} kg/s, thrust {analytic['thrust']:.1f} N")
+    started = time.time()
+    records = [run_case(case, params, settings, solvers, analytic) for case in cases]
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": params,
+        "family": family,
+        "settings": settings,
+        "analytic": analytic,
+        "cases": records,
+    }
+    found = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f))
+        report["baseline"] = {"file": str(args.baseline), "threshold": BENCH_REGRESSION, "regressions": found}
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    report_file = args.output_dir / REPORT_FILE
+    with open(report_file, "w") as f:
+        json.dump(_plain(report), f, indent=2, allow_nan=False)
+    print(f"[Bench] Report: {report_file} ({time.time() - started:.1f}s)")
+    plot = plot_report(report, args.output_dir / PLOT_FILE)
+    if plot:
+        print(f"[Bench] Plots: {plot}")
+
+    for r in found:
+        print(f"[Bench] Regression: {r['case']} {r['stage']} {r['metric']} "
+              f"{r['baseline']:.3g} -> {r['current']:.3g} (x{r['ratio']:.2f})")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
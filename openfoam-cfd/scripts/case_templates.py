@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+OpenFOAM case dictionaries from templates
+Shared by api/server.py (generate_openfoam_case) and convert_to_openfoam.py;
+what differs between the two cases is a profile (PROFILES).
+
+- dictionaries that only depend on the profile (controlDict, fvSchemes,
+  fvSolution, turbulenceProperties) are rendered once into a template
+  directory and hard-linked into each case (copied when linking fails,
+  e.g. across filesystems). They are shared: treat them as read-only.
+- per-job files (thermophysicalProperties, 0/p, 0/T, 0/U) are built once
+  per profile as templates and only have their values substituted per job
+- system/monitors (optional, write_monitors): function objects placed on
+  the job geometry, included by controlDict when present
+
+Placeholders are @name (OpenFOAM itself uses $ and #).
+"""
+
+import json
+import os
+import shutil
+import string
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from polymesh import DEFAULT_PATCHES, PATCH_ORDER
+
+
+# Default directory of the rendered static dictionaries
+CASE_TEMPLATE_DIR = Path(os.environ.get("CASE_TEMPLATE_DIR",
+                                        Path(tempfile.gettempdir()) / "openfoam-case-templates"))
+
+# Monitors: probes and exit-plane values every MONITOR_INTERVAL time steps,
+# MONITOR_LINE_SAMPLES line samples over the run
+MONITOR_INTERVAL = int(os.environ.get("MONITOR_INTERVAL", "10"))
+MONITOR_LINE_SAMPLES = int(os.environ.get("MONITOR_LINE_SAMPLES", "20"))
+MONITOR_FIELDS = "(p T U Ma)"
+
+
+class FoamTemplate(string.Template):
+    delimiter = '@'
+
+
+HEADER = """FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       @cls;
+    object      @obj;
+}
+
+"""
+
+CONTROL_DICT = """application     rhoCentralFoam;
+
+startFrom       startTime;
+startTime       0;
+
+stopAt          endTime;
+endTime         @end_time;
+
+deltaT          1e-8;
+
+writeControl    adjustableRunTime;
+writeInterval   @write_interval;
+
+purgeWrite      @purge_write;
+
+writeFormat     ascii;
+writePrecision  8;
+writeCompression off;
+
+timeFormat      general;
+timePrecision   6;
+
+runTimeModifiable true;
+
+adjustTimeStep  yes;
+maxCo           @max_co;
+@max_delta_t
+functions
+{
+    fieldAverage1
+    {
+        type            fieldAverage;
+        libs            (fieldFunctionObjects);
+        writeControl    writeTime;
+        fields
+        (
+            U
+            {
+                mean        on;
+                prime2Mean  @prime2mean;
+                base        time;
+            }
+            p
+            {
+                mean        on;
+                prime2Mean  @prime2mean;
+                base        time;
+            }
+        );
+    }
+
+    #includeIfPresent "monitors"
+}
+"""
+
+FV_SCHEMES = """ddtSchemes
+{
+    default         Euler;
+}
+
+gradSchemes
+{
+    default         Gauss linear;
+}
+
+divSchemes
+{
+    default         none;
+    div(tauMC)      Gauss linear;
+}
+
+laplacianSchemes
+{
+    default         Gauss linear corrected;
+}
+
+interpolationSchemes
+{
+    default         linear;
+    reconstruct(rho) vanLeer;
+    reconstruct(U)   vanLeerV;
+    reconstruct(T)   vanLeer;
+}
+
+snGradSchemes
+{
+    default         corrected;
+}
+"""
+
+FV_SOLUTION = """solvers
+{
+    "(rho|rhoU|rhoE)"
+    {
+        solver          diagonal;
+    }
+
+    "(U|e|h)"
+    {
+        solver          smoothSolver;
+        smoother        GaussSeidel;
+        tolerance       @tolerance;
+        relTol          @rel_tol;
+    }
+}
+"""
+
+TURBULENCE_PROPERTIES = """simulationType  laminar;
+"""
+
+THERMOPHYSICAL_PROPERTIES = """thermoType
+{
+    type            hePsiThermo;
+    mixture         pureMixture;
+    transport       const;
+    thermo          hConst;
+    equationOfState perfectGas;
+    specie          specie;
+    energy          @energy;
+}
+
+mixture
+{
+    specie
+    {
+        molWeight   @mol_weight;
+    }
+    thermodynamics
+    {
+        Cp          @cp;
+        Hf          0;
+    }
+    transport
+    {
+        mu          1.8e-5;
+        Pr          0.7;
+    }
+}
+"""
+
+MONITORS = """// Job monitors (case_templates.write_monitors): Mach number, probes,
+// line samples and exit-plane integrals, written to postProcessing/
+
+Mach
+{
+    type            MachNo;
+    libs            (fieldFunctionObjects);
+    executeControl  timeStep;
+    writeControl    none;
+}
+
+probes
+{
+    type            probes;
+    libs            (sampling);
+    writeControl    timeStep;
+    writeInterval   @interval;
+    fields          @fields;
+    probeLocations
+    (
+@probe_locations    );
+}
+
+lines
+{
+    type            sets;
+    libs            (sampling);
+    writeControl    adjustableRunTime;
+    writeInterval   @line_interval;
+    interpolationScheme cellPoint;
+    setFormat       raw;
+    fields          @fields;
+    sets
+    {
+        axis
+        {
+            type        uniform;
+            axis        x;
+            start       (@axis_start);
+            end         (@axis_end);
+            nPoints     @axis_points;
+        }
+        wall
+        {
+            type        polyLine;
+            axis        x;
+            points
+            (
+@wall_points            );
+        }
+    }
+}
+
+@exit_values"""
+
+EXIT_VALUE = """@name
+{
+    type            surfaceFieldValue;
+    libs            (fieldFunctionObjects);
+    writeControl    timeStep;
+    writeInterval   @interval;
+    writeFields     false;
+    log             false;
+    regionType      sampledSurface;
+    name            exitPlane;
+    sampledSurfaceDict
+    {
+        type        plane;
+        point       (@plane_x 0 0);
+        normal      (1 0 0);
+    }
+    operation       @operation;
+@weight    fields          (@field);
+}
+
+"""
+
+# Exit-plane integrals: name -> (operation, weight field, field)
+#   massFlow: integral of rhoU . n, momentum: integral of (rhoU . n) U, pressureForce: integral of p
+EXIT_VALUES = {
+    'massFlow': ('areaNormalIntegrate', None, 'rhoU'),
+    'momentum': ('weightedAreaIntegrate', 'rhoU', 'U'),
+    'pressureForce': ('areaIntegrate', None, 'p'),
+}
+
+FIELD = """dimensions      @dimensions;
+
+internalField   @internal;
+
+boundaryField
+{
+@boundary}
+"""
+
+# Field -> (class, dimensions)
+FIELDS = {
+    'p': ('volScalarField', '[1 -1 -2 0 0 0 0]'),
+    'T': ('volScalarField', '[0 0 0 1 0 0 0]'),
+    'U': ('volVectorField', '[0 1 -1 0 0 0 0]'),
+}
+
+# Static files: path in the case -> (class, template, profile settings used)
+STATIC = {
+    'system/controlDict': ('dictionary', CONTROL_DICT, 'control'),
+    'system/fvSchemes': ('dictionary', FV_SCHEMES, None),
+    'system/fvSolution': ('dictionary', FV_SOLUTION, 'solution'),
+    'constant/turbulenceProperties': ('dictionary', TURBULENCE_PROPERTIES, None),
+}
+
+# Constraint patch types: the field boundary condition is the patch type itself
+CONSTRAINT_TYPES = ('empty', 'wedge', 'symmetryPlane', 'symmetry')
+
+PROFILES = {
+    # api/server.py: nozzle and plume, ambient on the top patch (nozzle wall + far-field)
+    'plume': {
+        'patches': {},
+        'control': {'end_time': '1e-5', 'write_interval': '2e-6', 'purge_write': 3, 'max_co': 0.3,
+                    'max_delta_t': None, 'prime2mean': 'off'},
+        'solution': {'tolerance': '1e-06', 'rel_tol': 0.1},
+        'energy': 'sensibleEnthalpy',
+        'fields': {
+            'p': {
+                'internal': 'uniform @p_chamber',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform @p_chamber'},
+                'outlet': {'type': 'zeroGradient'},
+                'wall': {'type': 'zeroGradient'},
+            },
+            'T': {
+                'internal': 'uniform @t_ambient',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform @t_chamber'},
+                'outlet': {'type': 'zeroGradient'},
+                'wall': {'type': 'fixedValue', 'value': 'uniform @t_ambient'},
+            },
+            'U': {
+                'internal': 'uniform (0 0 0)',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform (@u_inlet 0 0)'},
+                'outlet': {'type': 'zeroGradient'},
+                'wall': {'type': 'pressureInletOutletVelocity', 'value': 'uniform (0 0 0)'},
+            },
+        },
+    },
+    # convert_to_openfoam.py: internal nozzle flow, slip wall, symmetry axis
+    'nozzle': {
+        'patches': {'wall': ('wall', 'wall'), 'axis': ('axis', 'symmetryPlane')},
+        'control': {'end_time': '0.001', 'write_interval': '1e-4', 'purge_write': 5, 'max_co': 0.5,
+                    'max_delta_t': '1e-5', 'prime2mean': 'on'},
+        'solution': {'tolerance': '1e-09', 'rel_tol': 0.01},
+        'energy': 'sensibleInternalEnergy',
+        'fields': {
+            'p': {
+                'internal': 'uniform @p_chamber',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform @p_chamber'},
+                'outlet': {'type': 'waveTransmissive', 'field': 'p', 'psi': 'thermo:psi', 'gamma': '@gamma',
+                           'fieldInf': '@p_far', 'lInf': '0.1', 'value': 'uniform @p_far'},
+                'wall': {'type': 'zeroGradient'},
+            },
+            'T': {
+                'internal': 'uniform @t_chamber',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform @t_chamber'},
+                'outlet': {'type': 'zeroGradient'},
+                'wall': {'type': 'zeroGradient'},
+            },
+            'U': {
+                'internal': 'uniform (@u_inlet 0 0)',
+                'inlet': {'type': 'fixedValue', 'value': 'uniform (@u_inlet 0 0)'},
+                'outlet': {'type': 'zeroGradient'},
+                'wall': {'type': 'slip'},
+            },
+        },
+    },
+}
+
+
+def patches(profile: str) -> dict:
+    """Boundary roles -> (patch name, patch type) of a profile, for polymesh.write_polymesh"""
+    return dict(DEFAULT_PATCHES, **PROFILES[profile]['patches'])
+
+
+def _entries(entries: dict, indent: str) -> str:
+    return "".join(f"{indent}{key:<16}{value};\n" for key, value in entries.items())
+
+
+@lru_cache(maxsize=None)
+def _field_template(profile: str, field: str) -> FoamTemplate:
+    """0/<field> of a profile with the job values left as placeholders"""
+    spec = PROFILES[profile]['fields'][field]
+    names = patches(profile)
+    boundary = []
+    for role in PATCH_ORDER:
+        name, kind = names[role]
+        bc = {'type': kind} if kind in CONSTRAINT_TYPES else spec[role]
+        boundary.append(f"    {name}\n    {{\n{_entries(bc, ' ' * 8)}    }}\n")
+    cls, dimensions = FIELDS[field]
+    text = FoamTemplate(HEADER + FIELD).safe_substitute(
+        cls=cls, obj=field, dimensions=dimensions, internal=spec['internal'], boundary="".join(boundary))
+    return FoamTemplate(text)
+
+
+@lru_cache(maxsize=None)
+def _thermo_template(profile: str) -> FoamTemplate:
+    text = FoamTemplate(HEADER + THERMOPHYSICAL_PROPERTIES).safe_substitute(
+        cls='dictionary', obj='thermophysicalProperties', energy=PROFILES[profile]['energy'])
+    return FoamTemplate(text)
+
+
+def render_static(profile: str, path: str) -> str:
+    """Text of a static dictionary (STATIC key) for a profile"""
+    cls, body, settings = STATIC[path]
+    values = dict(PROFILES[profile][settings]) if settings else {}
+    if 'max_delta_t' in values:
+        values['max_delta_t'] = f"maxDeltaT       {values['max_delta_t']};\n" if values['max_delta_t'] else ""
+    return FoamTemplate(HEADER + body).substitute(values, cls=cls, obj=Path(path).name)
+
+
+def static_file(profile: str, path: str, template_dir: Path = None) -> Path:
+    """Rendered copy of a static dictionary in the template directory (written if missing or outdated)"""
+    target = Path(template_dir or CASE_TEMPLATE_DIR) / profile / path
+    text = render_static(profile, path)
+    if not target.exists() or target.read_text() != text:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic: concurrent jobs may render the same file; cases linked to
+        # an older version keep it
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    return target
+
+
+def _place(source: Path, target: Path) -> str:
+    """Hard-link source to target, or copy it; returns 'linked' or 'copied'"""
+    try:
+        target.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(source, target)
+        return 'linked'
+    except OSError:
+        shutil.copyfile(source, target)
+        return 'copied'
+
+
+def write_case_files(case_dir: Path, profile: str, values: dict, template_dir: Path = None) -> dict:
+    """
+    Write system/, constant/ (except polyMesh) and 0/ of a case
+    values: p_chamber, t_chamber, u_inlet, mol_weight, cp, plus the profile's
+    own placeholders (t_ambient for 'plume', gamma and p_far for 'nozzle')
+    Returns the case paths per action (linked, copied, rendered).
+    """
+    case_dir = Path(case_dir)
+    for sub in ('0', 'constant', 'system'):
+        (case_dir / sub).mkdir(parents=True, exist_ok=True)
+    done = {'linked': [], 'copied': [], 'rendered': []}
+
+    for path in STATIC:
+        done[_place(static_file(profile, path, template_dir), case_dir / path)].append(path)
+
+    rendered = {'constant/thermophysicalProperties': _thermo_template(profile).substitute(values)}
+    for field in FIELDS:
+        rendered[f'0/{field}'] = _field_template(profile, field).substitute(values)
+    for path, text in rendered.items():
+        with open(case_dir / path, 'w') as f:
+            f.write(text)
+        done['rendered'].append(path)
+    return done
+
+
+def _points(points, indent: str) -> str:
+    return "".join(f"{indent}({x:.6g} {r:.6g} 0)\n" for x, r in points)
+
+
+def write_monitors(case_dir: Path, profile: str, probes: dict, axis: tuple, wall, plane_x: float,
+                   meta: dict = None) -> Path:
+    """
+    Write system/monitors: probes (name -> (x, r)), a uniform line along the
+    axis ((x_start, x_end, r, n_points)), a polyline along the wall ((x, r)
+    points) and the exit-plane integrals at x = plane_x. meta (geometry
+    needed to scale the integrals) and the probe names go to
+    system/monitors.json for api/monitors.py.
+    """
+    end_time = float(PROFILES[profile]['control']['end_time'])
+    x_start, x_end, r_axis, n_axis = axis
+    exit_values = "".join(
+        FoamTemplate(EXIT_VALUE).substitute(
+            name=name, interval=MONITOR_INTERVAL, plane_x=f"{plane_x:.6g}", operation=operation,
+            weight=f"    weightField     {weight};\n" if weight else "", field=field)
+        for name, (operation, weight, field) in EXIT_VALUES.items())
+    text = FoamTemplate(HEADER + MONITORS).substitute(
+        cls='dictionary', obj='monitors', interval=MONITOR_INTERVAL, fields=MONITOR_FIELDS,
+        line_interval=f"{end_time / MONITOR_LINE_SAMPLES:.6g}",
+        probe_locations=_points(probes.values(), ' ' * 8),
+        axis_start=f"{x_start:.6g} {r_axis:.6g} 0", axis_end=f"{x_end:.6g} {r_axis:.6g} 0", axis_points=int(n_axis),
+        wall_points=_points(wall, ' ' * 16), exit_values=exit_values)
+    target = Path(case_dir) / 'system' / 'monitors'
+    target.write_text(text)
+    with open(target.with_suffix('.json'), 'w') as f:
+        json.dump(dict(meta or {}, probes=list(probes), exit_values=list(EXIT_VALUES)), f)
+    return target
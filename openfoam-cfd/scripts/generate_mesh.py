@@ -7,7 +7,6 @@ Generates axisymmetric mesh in UGRID format, then converts to VOG
 import numpy as np
 import json
 import sys
-import struct
 from pathlib import Path
 
 
@@ -57,71 +56,96 @@ def create_nozzle_geometry(params: dict) -> tuple:
     return x, r
 
 
+def graded_distribution(n_cells: int, regions=((1.0, 1.0, 1.0),)) -> np.ndarray:
+    """
+    Normalized node positions (n_cells + 1 values from 0 to 1), blockMesh
+    multi-grading style: regions of (length fraction, cell fraction,
+    expansion ratio), expansion = last cell / first cell of the region.
+    """
+    regions = [(float(l), float(c), float(e)) for l, c, e in regions]
+    lengths = np.array([l for l, _, _ in regions]) / sum(l for l, _, _ in regions)
+    # Cells per region, at least one each, total kept at n_cells
+    cells = np.maximum(1, np.round(np.array([c for _, c, _ in regions]) / sum(c for _, c, _ in regions)
+                                   * n_cells).astype(int))
+    cells[-1] = max(1, n_cells - cells[:-1].sum())
+    
+    parts = [np.zeros(1)]
+    start = 0.0
+    for (_, _, expansion), length, m in zip(regions, lengths, cells):
+        sizes = expansion ** (np.arange(m) / (m - 1)) if m > 1 else np.ones(1)
+        parts.append(start + length * np.cumsum(sizes) / sizes.sum())
+        start += length
+    eta = np.concatenate(parts)
+    eta[-1] = 1.0
+    return eta
+
+
+def throat_grading(x_throat: float, x_end: float, ratio: float) -> tuple:
+    """
+    Axial regions clustering cells at the throat: cells shrink towards
+    x_throat and grow after it, the largest being ratio times the smallest
+    """
+    if ratio == 1.0 or not 0 < x_throat < x_end:
+        return ((1.0, 1.0, 1.0),)
+    frac = x_throat / x_end
+    return ((frac, frac, 1.0 / ratio), (1.0 - frac, 1.0 - frac, ratio))
+
+
+def stretched_distribution(n_nodes: int, stretch_factor: float = 1.2) -> np.ndarray:
+    """
+    Normalized radial node positions (0 on the axis, 1 at the wall), each
+    cell stretch_factor times the one below it (uniform for 1.0)
+    """
+    j = np.arange(n_nodes, dtype=np.float64)
+    if stretch_factor == 1.0:
+        return j / (n_nodes - 1)
+    return (stretch_factor**j - 1) / (stretch_factor**(n_nodes-1) - 1)
+
+
 def generate_structured_mesh(x_wall: np.ndarray, r_wall: np.ndarray, 
-                             ny: int, stretch_factor: float = 1.2) -> dict:
+                             ny: int, stretch_factor: float = 1.2, eta: np.ndarray = None) -> dict:
     """
     Generate structured 2D axisymmetric mesh
     Uses geometric stretching near wall for boundary layer resolution
+    (or the given radial distribution eta, ny values from 0 on the axis to 1
+    at the wall, e.g. from graded_distribution).
+    Node numbering is row-major (node = j * nx + i, j=0 on the axis).
+    Coordinates are float64 arrays, connectivity int32 arrays (0-based).
     """
+    x_wall = np.asarray(x_wall, dtype=np.float64)
+    r_wall = np.asarray(r_wall, dtype=np.float64)
     nx = len(x_wall)
     
-    # Create node arrays
-    nodes_x = np.zeros((ny, nx))
-    nodes_r = np.zeros((ny, nx))
-    
-    for i in range(nx):
-        # Radial distribution with geometric stretching
-        # More points near wall (for boundary layer)
-        eta = np.zeros(ny)
-        for j in range(ny):
-            if stretch_factor != 1.0:
-                # Geometric stretching
-                eta[j] = (stretch_factor**j - 1) / (stretch_factor**(ny-1) - 1)
-            else:
-                eta[j] = j / (ny - 1)
-        
-        nodes_x[:, i] = x_wall[i]
-        nodes_r[:, i] = r_wall[i] * eta
-    
-    # Create quadrilateral cells (will be triangulated for UGRID)
-    cells = []
-    for j in range(ny - 1):
-        for i in range(nx - 1):
-            # Node indices (0-based)
-            n0 = j * nx + i
-            n1 = j * nx + (i + 1)
-            n2 = (j + 1) * nx + (i + 1)
-            n3 = (j + 1) * nx + i
-            
-            # Split quad into two triangles
-            cells.append([n0, n1, n2])
-            cells.append([n0, n2, n3])
-    
-    # Boundary faces
-    # BC1: Inlet (left, i=0)
-    inlet_faces = []
-    for j in range(ny - 1):
-        inlet_faces.append([j * nx, (j + 1) * nx])
-    
-    # BC2: Outlet (right, i=nx-1)
-    outlet_faces = []
-    for j in range(ny - 1):
-        outlet_faces.append([j * nx + (nx - 1), (j + 1) * nx + (nx - 1)])
-    
-    # BC3: Axis (bottom, j=0)
-    axis_faces = []
-    for i in range(nx - 1):
-        axis_faces.append([i, i + 1])
-    
-    # BC4: Wall (top, j=ny-1)
-    wall_faces = []
-    for i in range(nx - 1):
-        wall_faces.append([(ny - 1) * nx + i, (ny - 1) * nx + (i + 1)])
+    # Radial distribution with geometric stretching, the same for every column
+    # More points near wall (for boundary layer)
+    if eta is not None:
+        eta = np.asarray(eta, dtype=np.float64)
+        if len(eta) != ny:
+            raise ValueError(f"eta has {len(eta)} values, expected ny={ny}")
+    else:
+        eta = stretched_distribution(ny, stretch_factor)
+    
+    nodes_x = np.broadcast_to(x_wall, (ny, nx)).ravel()
+    nodes_r = np.outer(eta, r_wall).ravel()
+    
+    # Quadrilateral cells split into two triangles (for UGRID):
+    # lower-left corner n0 of every quad, then its other corners
+    n0 = (np.arange(ny - 1, dtype=np.int32)[:, None] * nx + np.arange(nx - 1, dtype=np.int32)).ravel()
+    cells = np.stack((n0, n0 + 1, n0 + nx + 1,
+                      n0, n0 + nx + 1, n0 + nx), axis=1).reshape(-1, 3)
+    
+    # Boundary faces (edges), as (n_faces, 2) arrays
+    rows = np.arange(ny - 1, dtype=np.int32) * nx
+    cols = np.arange(nx - 1, dtype=np.int32)
+    inlet_faces = np.column_stack((rows, rows + nx))  # BC1: left, i=0
+    outlet_faces = inlet_faces + (nx - 1)  # BC2: right, i=nx-1
+    axis_faces = np.column_stack((cols, cols + 1))  # BC3: bottom, j=0
+    wall_faces = axis_faces + (ny - 1) * nx  # BC4: top, j=ny-1
     
     return {
-        'nodes_x': nodes_x.flatten(),
-        'nodes_r': nodes_r.flatten(),
-        'cells': np.array(cells),
+        'nodes_x': nodes_x,
+        'nodes_r': nodes_r,
+        'cells': cells,
         'inlet_faces': inlet_faces,
         'outlet_faces': outlet_faces,
         'axis_faces': axis_faces,
@@ -131,85 +155,190 @@ def generate_structured_mesh(x_wall: np.ndarray, r_wall: np.ndarray,
     }
 
 
-def write_ugrid_ascii(mesh: dict, filename: str):
+def generate_multiblock_mesh(blocks: dict, wall_radius) -> dict:
     """
-    Write mesh in AFLR3 UGRID ASCII format
+    Multi-block axisymmetric mesh: chamber, nozzle and plume blocks side by
+    side (same radial nodes), farfield block above the plume (same axial nodes)
+    blocks: name -> x0, x1, r0, r1, nx, ny, x_grading, r_grading cell counts
+    and extents (as api/multiblock.block_layout); wall_radius(x) is the nozzle
+    contour, the top of the chamber and nozzle blocks.
+    Returns the fields of generate_structured_mesh (without nx/ny) plus
+    'quads', counter-clockwise node ids for polymesh.write_polymesh, and the
+    cells of each block. Interface nodes exist once, so the blocks are conformal.
     """
+    chamber, nozzle, plume, farfield = (blocks[name] for name in ('chamber', 'nozzle', 'plume', 'farfield'))
+
+    # Lower blocks: one structured grid whose axial nodes are graded block by block
+    x = [np.array([chamber['x0']])]
+    for block in (chamber, nozzle, plume):
+        eta = graded_distribution(block['nx'], ((1.0, 1.0, block['x_grading']),))
+        x.append(block['x0'] + (block['x1'] - block['x0']) * eta[1:])
+    x = np.concatenate(x)
+    i_exit = chamber['nx'] + nozzle['nx']
+    r_top = np.empty_like(x)
+    r_top[:i_exit + 1] = wall_radius(x[:i_exit + 1])
+    r_top[i_exit + 1:] = plume['r1']
+    eta = graded_distribution(plume['ny'], ((1.0, 1.0, plume['r_grading']),))
+    lower = generate_structured_mesh(x, r_top, plume['ny'] + 1, eta=eta)
+    nx = len(x)
+    n_lower = len(lower['nodes_x'])
+
+    # Farfield nodes: its bottom row is the top row of the plume block
+    ny_far = farfield['ny']
+    eta_far = graded_distribution(ny_far, ((1.0, 1.0, farfield['r_grading']),))
+    x_far = x[i_exit:]
+    n_cols = len(x_far)
+    grid = np.empty((ny_far + 1, n_cols), dtype=np.int32)
+    grid[0] = plume['ny'] * nx + i_exit + np.arange(n_cols, dtype=np.int32)
+    grid[1:] = n_lower + np.arange(ny_far * n_cols, dtype=np.int32).reshape(ny_far, n_cols)
+    far_x = np.broadcast_to(x_far, (ny_far, n_cols)).ravel()
+    far_r = np.repeat(farfield['r0'] + (farfield['r1'] - farfield['r0']) * eta_far[1:], n_cols)
+
+    n0 = (np.arange(plume['ny'], dtype=np.int32)[:, None] * nx + np.arange(nx - 1, dtype=np.int32)).ravel()
+    lower_quads = np.column_stack((n0, n0 + 1, n0 + nx + 1, n0 + nx))
+    far_quads = np.column_stack((grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel(),
+                                 grid[1:, 1:].ravel(), grid[1:, :-1].ravel()))
+    quads = np.concatenate((lower_quads, far_quads))
+
+    # Farfield boundaries: outlet on the right, wall (ambient) on top and on the lip face at x_exit
+    far_outlet = np.column_stack((grid[:-1, -1], grid[1:, -1]))
+    far_top = np.column_stack((grid[-1, :-1], grid[-1, 1:]))
+    lip = np.column_stack((grid[:-1, 0], grid[1:, 0]))
+
+    return {
+        'nodes_x': np.concatenate((lower['nodes_x'], far_x)),
+        'nodes_r': np.concatenate((lower['nodes_r'], far_r)),
+        'cells': np.concatenate((lower['cells'], far_quads[:, [0, 1, 2, 0, 2, 3]].reshape(-1, 3))),
+        'quads': quads,
+        'inlet_faces': lower['inlet_faces'],
+        'outlet_faces': np.concatenate((lower['outlet_faces'], far_outlet)),
+        'axis_faces': lower['axis_faces'],
+        'wall_faces': np.concatenate((lower['wall_faces'][:i_exit], far_top, lip)),
+        'blocks': {name: block['nx'] * block['ny'] for name, block in blocks.items()},
+    }
+
+
+# Boundary edge lists and their UGRID markers, in file order
+BOUNDARY_MARKERS = (('inlet_faces', 1), ('outlet_faces', 2), ('axis_faces', 3), ('wall_faces', 4))
+
+# Rows formatted/converted at a time: the writers never hold more than one
+# chunk of output on top of the mesh itself
+UGRID_CHUNK = 65536
+
+# AFLR3 binary grids: .b8.ugrid is big-endian, .lb8.ugrid little-endian
+UGRID_BYTE_ORDER = {'b8': '>', 'lb8': '<'}
+
+
+def _ugrid_sections(mesh: dict):
+    """Yield (kind, rows) chunks in file order: nodes (float64, x r 0), faces and triangles (int32, 1-based)"""
     nodes_x = mesh['nodes_x']
     nodes_r = mesh['nodes_r']
-    cells = mesh['cells']
-    n_nodes = len(nodes_x)
-    n_tris = len(cells)
-    
-    # Boundary faces
-    inlet = mesh['inlet_faces']
-    outlet = mesh['outlet_faces']
-    axis = mesh['axis_faces']
-    wall = mesh['wall_faces']
-    n_boundary_faces = len(inlet) + len(outlet) + len(axis) + len(wall)
+    for start in range(0, len(nodes_x), UGRID_CHUNK):
+        stop = min(start + UGRID_CHUNK, len(nodes_x))
+        rows = np.zeros((stop - start, 3), dtype=np.float64)
+        rows[:, 0] = nodes_x[start:stop]
+        rows[:, 1] = nodes_r[start:stop]
+        yield 'node', rows
+    
+    for key, marker in BOUNDARY_MARKERS:
+        faces = np.asarray(mesh[key], dtype=np.int32).reshape(-1, 2)
+        for start in range(0, len(faces), UGRID_CHUNK):
+            part = faces[start:start + UGRID_CHUNK]
+            rows = np.full((len(part), 3), marker, dtype=np.int32)
+            rows[:, :2] = part + 1
+            yield 'face', rows
+    
+    cells = np.asarray(mesh['cells'], dtype=np.int32)
+    for start in range(0, len(cells), UGRID_CHUNK):
+        yield 'cell', cells[start:start + UGRID_CHUNK] + 1
+
+
+def _ugrid_header(mesh: dict) -> tuple:
+    n_boundary_faces = sum(len(mesh[key]) for key, _ in BOUNDARY_MARKERS)
+    return (len(mesh['nodes_x']), n_boundary_faces, len(mesh['cells']), 0, 0, 0, 0)
+
+
+def write_ugrid_ascii(mesh: dict, filename: str):
+    """
+    Write mesh in AFLR3 UGRID ASCII format
+    Header, nodes (x, r, 0), boundary edges with markers
+    (BC1=inlet, BC2=outlet, BC3=axis, BC4=wall), then triangles, 1-indexed.
+    Each chunk is formatted with a single %-operation.
+    """
+    formats = {'node': "%.10e %.10e 0.0\n", 'face': "%d %d %d\n", 'cell': "%d %d %d\n"}
     
     with open(filename, 'w') as f:
-        # Header: n_nodes, n_tris, n_quads, n_tets, n_pyramids, n_prisms, n_hexes
-        f.write(f"{n_nodes} {n_boundary_faces} {n_tris} 0 0 0 0\n")
-        
-        # Nodes (x, y, z) - for 2D axisymmetric, z=0
-        for i in range(n_nodes):
-            f.write(f"{nodes_x[i]:.10e} {nodes_r[i]:.10e} 0.0\n")
-        
-        # Boundary faces (edges in 2D) with boundary markers
-        # BC1=inlet, BC2=outlet, BC3=axis, BC4=wall
-        for face in inlet:
-            f.write(f"{face[0]+1} {face[1]+1} 1\n")
-        for face in outlet:
-            f.write(f"{face[0]+1} {face[1]+1} 2\n")
-        for face in axis:
-            f.write(f"{face[0]+1} {face[1]+1} 3\n")
-        for face in wall:
-            f.write(f"{face[0]+1} {face[1]+1} 4\n")
-        
-        # Triangle cells (1-indexed)
-        for cell in cells:
-            f.write(f"{cell[0]+1} {cell[1]+1} {cell[2]+1}\n")
-
-
-def write_ugrid_binary(mesh: dict, filename: str):
+        # Header: n_nodes, n_boundary_faces, n_tris, then unused element counts
+        f.write(" ".join(str(n) for n in _ugrid_header(mesh)) + "\n")
+        for kind, rows in _ugrid_sections(mesh):
+            if kind == 'node':
+                rows = rows[:, :2]
+            f.write((formats[kind] * len(rows)) % tuple(rows.ravel().tolist()))
+
+
+def _byte_order(filename: str, byte_order: str = None) -> str:
+    if byte_order:
+        return byte_order
+    suffixes = Path(filename).suffixes
+    return UGRID_BYTE_ORDER.get(suffixes[-2].lstrip('.') if len(suffixes) > 1 else '', '>')
+
+
+def write_ugrid_binary(mesh: dict, filename: str, byte_order: str = None):
     """
     Write mesh in AFLR3 UGRID binary format (.b8.ugrid)
+    Same layout as the ASCII file: int32 header, float64 nodes, int32 edges
+    and triangles. Byte order from the name (.lb8.ugrid little-endian,
+    otherwise big-endian) unless byte_order ('>' or '<') is given.
     """
-    nodes_x = mesh['nodes_x']
-    nodes_r = mesh['nodes_r']
-    cells = mesh['cells']
-    n_nodes = len(nodes_x)
-    n_tris = len(cells)
-    
-    inlet = mesh['inlet_faces']
-    outlet = mesh['outlet_faces']
-    axis = mesh['axis_faces']
-    wall = mesh['wall_faces']
-    n_boundary_faces = len(inlet) + len(outlet) + len(axis) + len(wall)
+    byte_order = _byte_order(filename, byte_order)
+    dtypes = {'node': np.dtype(byte_order + 'f8'), 'face': np.dtype(byte_order + 'i4'),
+              'cell': np.dtype(byte_order + 'i4')}
     
     with open(filename, 'wb') as f:
-        # Header
-        header = struct.pack('7i', n_nodes, n_boundary_faces, n_tris, 0, 0, 0, 0)
-        f.write(header)
-        
-        # Nodes
-        for i in range(n_nodes):
-            f.write(struct.pack('3d', nodes_x[i], nodes_r[i], 0.0))
-        
-        # Boundary faces with markers
-        for face in inlet:
-            f.write(struct.pack('3i', face[0]+1, face[1]+1, 1))
-        for face in outlet:
-            f.write(struct.pack('3i', face[0]+1, face[1]+1, 2))
-        for face in axis:
-            f.write(struct.pack('3i', face[0]+1, face[1]+1, 3))
-        for face in wall:
-            f.write(struct.pack('3i', face[0]+1, face[1]+1, 4))
-        
-        # Triangles
-        for cell in cells:
-            f.write(struct.pack('3i', cell[0]+1, cell[1]+1, cell[2]+1))
+        np.asarray(_ugrid_header(mesh), dtype=byte_order + 'i4').tofile(f)
+        for kind, rows in _ugrid_sections(mesh):
+            rows.astype(dtypes[kind], copy=False).tofile(f)
+
+
+def _ugrid_mesh(nodes: np.ndarray, faces: np.ndarray, cells: np.ndarray) -> dict:
+    """Mesh dict (as generate_structured_mesh, without nx/ny) from the file sections"""
+    mesh = {
+        'nodes_x': np.ascontiguousarray(nodes[:, 0], dtype=np.float64),
+        'nodes_r': np.ascontiguousarray(nodes[:, 1], dtype=np.float64),
+        'cells': cells.astype(np.int32) - 1,
+    }
+    for key, marker in BOUNDARY_MARKERS:
+        mesh[key] = faces[faces[:, 2] == marker, :2].astype(np.int32) - 1
+    return mesh
+
+
+def read_ugrid_binary(filename: str, byte_order: str = None) -> dict:
+    """Read back a file of write_ugrid_binary (round-trip check)"""
+    byte_order = _byte_order(filename, byte_order)
+    int_type = np.dtype(byte_order + 'i4')
+    with open(filename, 'rb') as f:
+        header = np.fromfile(f, dtype=int_type, count=7)
+        n_nodes, n_faces, n_tris = (int(n) for n in header[:3])
+        nodes = np.fromfile(f, dtype=byte_order + 'f8', count=3 * n_nodes).reshape(-1, 3)
+        faces = np.fromfile(f, dtype=int_type, count=3 * n_faces).reshape(-1, 3)
+        cells = np.fromfile(f, dtype=int_type, count=3 * n_tris).reshape(-1, 3)
+    if len(cells) != n_tris:
+        raise ValueError(f"{filename}: truncated UGRID file")
+    return _ugrid_mesh(nodes, faces, cells)
+
+
+def read_ugrid_ascii(filename: str) -> dict:
+    """Read back a file of write_ugrid_ascii (round-trip check)"""
+    with open(filename, 'r') as f:
+        header = [int(n) for n in f.readline().split()]
+        tokens = f.read().split()
+    n_nodes, n_faces, n_tris = header[:3]
+    n_float = 3 * n_nodes
+    if len(tokens) != n_float + 3 * (n_faces + n_tris):
+        raise ValueError(f"{filename}: truncated UGRID file")
+    nodes = np.array(tokens[:n_float], dtype=np.float64).reshape(-1, 3)
+    ints = np.array(tokens[n_float:], dtype=np.int64).reshape(-1, 3)
+    return _ugrid_mesh(nodes, ints[:n_faces], ints[n_faces:])
 
 
 def generate_vars_file(params: dict, filename: str):
@@ -350,6 +479,9 @@ def main():
     }
     with open(output_path / f"{case_name}_mesh.json", 'w') as f:
         json.dump(mesh_json, f)
+    # Structured size alone, read by postprocess.py (nx * ny nodes, (nx-1) * (ny-1) cells)
+    with open(output_path / f"{case_name}_mesh_info.json", 'w') as f:
+        json.dump({'nx': int(mesh['nx']), 'ny': int(mesh['ny'])}, f)
     
     print("Mesh generation complete!")
 
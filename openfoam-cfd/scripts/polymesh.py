@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Native OpenFOAM polyMesh writer for axisymmetric nozzle meshes
+Turns the (x, r) quad mesh of generate_mesh.generate_structured_mesh or
+generate_multiblock_mesh into a one-cell-thick wedge and writes
+constant/polyMesh directly (points, faces, owner, neighbour, boundary),
+so no blockMesh run is needed and the wall follows the contour nodes exactly.
+
+Axis nodes (r=0) are shared by both wedge sides: the first cell row is made
+of prisms and the axis patch has no faces, as blockMesh produces for a
+collapsed block face.
+"""
+
+import numpy as np
+from pathlib import Path
+
+
+# Boundary roles -> (patch name, patch type); names match the 0/ field files
+DEFAULT_PATCHES = {
+    'inlet': ('inlet', 'patch'),
+    'outlet': ('outlet', 'patch'),
+    'wall': ('top', 'patch'),
+    'axis': ('axis', 'empty'),
+    'front': ('front', 'wedge'),
+    'back': ('back', 'wedge'),
+}
+PATCH_ORDER = ('inlet', 'outlet', 'wall', 'axis', 'front', 'back')
+
+# Binary lists are written little-endian with 32-bit labels
+ARCH = "LSB;label=32;scalar=64"
+LABEL = np.dtype('<i4')
+SCALAR = np.dtype('<f8')
+
+
+def build_wedge(mesh: dict, wedge_angle: float = 2.5) -> dict:
+    """
+    Wedge polyMesh arrays from a 2D quad mesh in the (x, r) plane
+    Either a structured mesh (nodes row-major, j=0 on the axis) or a
+    multi-block one giving 'quads' (counter-clockwise node ids) and the
+    boundary edges of each role ('inlet_faces', 'outlet_faces', 'wall_faces').
+    Nodes with r = 0 lie on the axis; edges between them get no faces.
+    wedge_angle: total wedge angle in degrees, split evenly around the x-y plane
+    Faces are returned as a compact list (offsets + flat point labels),
+    internal faces first in upper-triangular order, then one block per patch.
+    """
+    x = np.asarray(mesh['nodes_x'], dtype=np.float64).ravel()
+    r = np.asarray(mesh['nodes_r'], dtype=np.float64).ravel()
+    if 'quads' in mesh:
+        quads = np.asarray(mesh['quads'], dtype=np.int32)
+        edges = {role: np.asarray(mesh[role + '_faces'], dtype=np.int32).reshape(-1, 2)
+                 for role in ('inlet', 'outlet', 'wall')}
+    else:
+        quads, edges = _structured_quads(mesh['nx'], mesh['ny'])
+    half = np.radians(wedge_angle) / 2.0
+
+    # Points: axis nodes once, then the front (z < 0) and back (z > 0) copies of the others
+    on_axis = r <= 0.0
+    n_axis, n_off = int(on_axis.sum()), int((~on_axis).sum())
+    front = np.empty(len(x), dtype=np.int32)
+    front[on_axis] = np.arange(n_axis, dtype=np.int32)
+    front[~on_axis] = n_axis + np.arange(n_off, dtype=np.int32)
+    back = front.copy()
+    back[~on_axis] += n_off
+    points = np.empty((n_axis + 2 * n_off, 3), dtype=np.float64)
+    points[:n_axis] = np.column_stack((x[on_axis], np.zeros(n_axis), np.zeros(n_axis)))
+    for side, sign in ((0, -1.0), (1, 1.0)):
+        block = points[n_axis + side * n_off:n_axis + (side + 1) * n_off]
+        block[:, 0] = x[~on_axis]
+        block[:, 1] = r[~on_axis] * np.cos(half)
+        block[:, 2] = sign * r[~on_axis] * np.sin(half)
+
+    # Directed cell edges a -> b; the cell lies on their left in the (x, r) plane
+    n_cells = len(quads)
+    a = quads.ravel()
+    b = np.roll(quads, -1, axis=1).ravel()
+    edge_cell = np.repeat(np.arange(n_cells, dtype=np.int32), 4)
+    keys = _edge_keys(a, b, len(x))
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    shared = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+    if len(shared) and np.any(np.diff(shared) < 2):
+        raise ValueError("an edge is shared by more than two cells")
+
+    # Internal faces: oriented from the owner (lower cell id) towards the neighbour
+    e1, e2 = order[shared], order[shared + 1]
+    first = edge_cell[e1] < edge_cell[e2]
+    own_edge = np.where(first, e1, e2)
+    owner = edge_cell[own_edge]
+    neighbour = np.where(first, edge_cell[e2], edge_cell[e1])
+    sort = np.lexsort((neighbour, owner))
+    own_edge, owner, neighbour = own_edge[sort], owner[sort], neighbour[sort]
+    internal = _quads(front[a[own_edge]], front[b[own_edge]], back[b[own_edge]], back[a[own_edge]])
+
+    # Boundary faces, normals pointing out of the domain
+    lone = np.ones(len(keys), dtype=bool)
+    lone[shared] = lone[shared + 1] = False
+    lone_edges = order[lone]
+    lone_keys = sorted_keys[lone]
+    # Edges on the axis collapse: the axis patch has no faces
+    used = on_axis[a[lone_edges]] & on_axis[b[lone_edges]]
+    boundary = {'axis': (np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int32))}
+    for role in ('inlet', 'outlet', 'wall'):
+        pairs = edges[role]
+        wanted = _edge_keys(pairs[:, 0], pairs[:, 1], len(x))
+        pos = np.clip(np.searchsorted(lone_keys, wanted), 0, max(0, len(lone_keys) - 1))
+        if len(wanted) and (not len(lone_keys) or np.any(lone_keys[pos] != wanted) or np.any(used[pos])):
+            raise ValueError(f"{role} edges are not free boundary edges")
+        used[pos] = True
+        e = lone_edges[pos]
+        boundary[role] = (_quads(front[a[e]], front[b[e]], back[b[e]], back[a[e]]), edge_cell[e])
+    if not used.all():
+        raise ValueError(f"{int((~used).sum())} boundary edges belong to no patch")
+
+    q0, q1, q2, q3 = quads.T
+    cells = np.arange(n_cells, dtype=np.int32)
+    boundary['front'] = (_quads(front[q0], front[q3], front[q2], front[q1]), cells)
+    boundary['back'] = (_quads(back[q0], back[q1], back[q2], back[q3]), cells)
+
+    # The axis edge of first-row x-faces collapses: those faces are triangles
+    faces = np.concatenate([internal] + [boundary[role][0] for role in PATCH_ORDER])
+    owner = np.concatenate([owner] + [boundary[role][1] for role in PATCH_ORDER])
+    offsets, labels = _compact(faces)
+
+    patches, start = [], len(internal)
+    for role in PATCH_ORDER:
+        n = len(boundary[role][0])
+        patches.append((role, start, n))
+        start += n
+
+    return {
+        'points': points,
+        'face_offsets': offsets,
+        'face_labels': labels,
+        'owner': owner.astype(np.int32),
+        'neighbour': neighbour.astype(np.int32),
+        'patches': patches,
+        'n_cells': n_cells,
+    }
+
+
+def _structured_quads(nx: int, ny: int) -> tuple:
+    """Cells (c = j * (nx - 1) + i) and boundary edges of a structured nx x ny node grid"""
+    n0 = (np.arange(ny - 1, dtype=np.int32)[:, None] * nx + np.arange(nx - 1, dtype=np.int32)).ravel()
+    quads = np.column_stack((n0, n0 + 1, n0 + nx + 1, n0 + nx))
+    rows = np.arange(ny - 1, dtype=np.int32) * nx
+    cols = np.arange(nx - 1, dtype=np.int32)
+    inlet = np.column_stack((rows, rows + nx))
+    top = np.column_stack((cols, cols + 1)) + (ny - 1) * nx
+    edges = {'inlet': inlet, 'outlet': inlet + (nx - 1), 'wall': top}
+    return quads, edges
+
+
+def _edge_keys(a: np.ndarray, b: np.ndarray, n_nodes: int) -> np.ndarray:
+    """One int64 key per undirected edge"""
+    return np.minimum(a, b).astype(np.int64) * n_nodes + np.maximum(a, b)
+
+
+def _quads(a, b, c, d) -> np.ndarray:
+    return np.column_stack((np.ravel(a), np.ravel(b), np.ravel(c), np.ravel(d))).astype(np.int32)
+
+
+def _compact(quads: np.ndarray) -> tuple:
+    """Drop repeated consecutive points (collapsed axis edges) -> faceCompactList arrays"""
+    keep = np.ones(quads.shape, dtype=bool)
+    keep[:, 1:] = quads[:, 1:] != quads[:, :-1]
+    keep[:, 0] = quads[:, 0] != quads[:, -1]
+    sizes = keep.sum(axis=1)
+    offsets = np.zeros(len(quads) + 1, dtype=np.int32)
+    np.cumsum(sizes, out=offsets[1:])
+    return offsets, quads[keep].astype(np.int32)
+
+
+def _header(f, cls: str, obj: str, binary: bool, note: str = None):
+    f.write(b"FoamFile\n{\n")
+    f.write(b"    version     2.0;\n")
+    f.write(f"    format      {'binary' if binary else 'ascii'};\n".encode())
+    if binary:
+        f.write(f'    arch        "{ARCH}";\n'.encode())
+    f.write(f"    class       {cls};\n".encode())
+    if note:
+        f.write(f'    note        "{note}";\n'.encode())
+    f.write(b'    location    "constant/polyMesh";\n')
+    f.write(f"    object      {obj};\n}}\n\n".encode())
+
+
+def _write_list(f, values: np.ndarray, binary: bool, fmt: str = None):
+    """One OpenFOAM list: N then (raw bytes) or one entry per line"""
+    f.write(f"{len(values)}\n(".encode())
+    if binary:
+        f.write(np.ascontiguousarray(values).tobytes())
+        f.write(b")\n")
+    else:
+        f.write(b"\n")
+        if len(values):
+            f.write(((fmt + "\n") * len(values) % tuple(np.ravel(values).tolist())).encode())
+        f.write(b")\n")
+
+
+def write_polymesh(mesh: dict, polymesh_dir, wedge_angle: float = 2.5, patches: dict = None,
+                   binary: bool = True) -> dict:
+    """
+    Write constant/polyMesh for the wedge of a structured mesh
+    patches: overrides of DEFAULT_PATCHES (role -> (name, type))
+    Returns the mesh counts.
+    """
+    patches = dict(DEFAULT_PATCHES, **(patches or {}))
+    wedge = build_wedge(mesh, wedge_angle)
+    out = Path(polymesh_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    n_points = len(wedge['points'])
+    n_faces = len(wedge['owner'])
+    n_internal = len(wedge['neighbour'])
+    note = f"nPoints:{n_points} nCells:{wedge['n_cells']} nFaces:{n_faces} nInternalFaces:{n_internal}"
+
+    with open(out / 'points', 'wb') as f:
+        _header(f, 'vectorField', 'points', binary)
+        _write_list(f, wedge['points'].astype(SCALAR), binary, "(%.12g %.12g %.12g)")
+
+    with open(out / 'faces', 'wb') as f:
+        if binary:
+            _header(f, 'faceCompactList', 'faces', binary)
+            _write_list(f, wedge['face_offsets'].astype(LABEL), binary)
+            _write_list(f, wedge['face_labels'].astype(LABEL), binary)
+        else:
+            _header(f, 'faceList', 'faces', binary)
+            offsets, labels = wedge['face_offsets'], wedge['face_labels']
+            f.write(f"{n_faces}\n(\n".encode())
+            f.write("".join(
+                f"{offsets[k + 1] - offsets[k]}({' '.join(map(str, labels[offsets[k]:offsets[k + 1]]))})\n"
+                for k in range(n_faces)).encode())
+            f.write(b")\n")
+
+    for name, values in (('owner', wedge['owner']), ('neighbour', wedge['neighbour'])):
+        with open(out / name, 'wb') as f:
+            _header(f, 'labelList', name, binary, note)
+            _write_list(f, values.astype(LABEL), binary, "%d")
+
+    with open(out / 'boundary', 'wb') as f:
+        _header(f, 'polyBoundaryMesh', 'boundary', False)
+        f.write(f"{len(wedge['patches'])}\n(\n".encode())
+        for role, start, n in wedge['patches']:
+            name, kind = patches[role]
+            f.write(f"    {name}\n    {{\n        type            {kind};\n".encode())
+            if kind == 'wall':
+                f.write(b"        inGroups        List<word> 1(wall);\n")
+            f.write(f"        nFaces          {n};\n        startFace       {start};\n    }}\n".encode())
+        f.write(b")\n")
+
+    return {'points': n_points, 'cells': wedge['n_cells'], 'faces': n_faces, 'internal_faces': n_internal}
@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 """
 Post-processing script for CFD results
-Converts solver output to JSON format for the web interface
+Converts solver output (Loci-STREAM, OpenFOAM or the Python solver) to the
+columnar result format the API serves (cfd_result.bin, api/result_format.py).
+Fields stay numpy arrays from the solver files to the output; nx/ny come from
+the solution file or the mesh (<case>_mesh_info.json from generate_mesh.py).
 """
 
 import numpy as np
 import json
+import os
+import re
 import sys
 from pathlib import Path
 
+from tecplot import DEFAULT_VARIABLES, GAMMA, R_GAS, derived_fields, read_tecplot, tecplot_fields
+
+# Shared result format (api/result_format.py)
+API_DIR = Path(os.environ.get("CFD_API_DIR", Path(__file__).resolve().parent.parent / "api"))
+if str(API_DIR) not in sys.path:
+    sys.path.append(str(API_DIR))
+from result_format import COLUMNAR_FILE, validate_result, write_columnar
+
+# Universal gas constant [J/(kmol K)]
+R_UNIVERSAL = 8314.46
+
 
 def read_loci_stream_output(output_dir: Path, case_name: str) -> dict:
     """
@@ -17,18 +33,14 @@ def read_loci_stream_output(output_dir: Path, case_name: str) -> dict:
     # Loci-STREAM outputs to ./output directory with .dat files
     output_path = output_dir / 'output'
     
-    # Try to find the latest solution file
-    solution_files = list(output_path.glob(f'{case_name}*.dat'))
-    
-    if not solution_files:
-        # Try Tecplot format
-        solution_files = list(output_path.glob(f'{case_name}*.plt'))
+    # Solution files, ASCII (.dat) or Tecplot (.plt, ASCII or binary)
+    solution_files = list(output_path.glob(f'{case_name}*.dat')) + list(output_path.glob(f'{case_name}*.plt'))
     
     if not solution_files:
         raise FileNotFoundError(f"No solution files found in {output_path}")
     
-    # Read the latest file
-    latest_file = sorted(solution_files)[-1]
+    # Read the latest file: highest iteration number in the name, then newest
+    latest_file = max(solution_files, key=solution_order)
     print(f"Reading solution from: {latest_file}")
     
     # Parse based on file type
@@ -40,181 +52,158 @@ def read_loci_stream_output(output_dir: Path, case_name: str) -> dict:
         raise ValueError(f"Unknown file format: {latest_file.suffix}")
 
 
+def solution_order(filepath: Path) -> tuple:
+    """Sort key of solution files: last number in the name (iteration), then mtime"""
+    numbers = re.findall(r'\d+', filepath.stem)
+    return (int(numbers[-1]) if numbers else -1, filepath.stat().st_mtime)
+
+
 def parse_dat_file(filepath: Path) -> dict:
-    """Parse Loci-STREAM .dat output file"""
-    data = {
-        'x': [], 'r': [],
-        'pressure': [], 'temperature': [],
-        'mach': [], 'velocity_x': [], 'velocity_r': [],
-        'density': []
-    }
-    
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    
-    # Skip header lines
-    data_started = False
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('#') or line.startswith('VARIABLES'):
-            continue
-        if line.startswith('ZONE'):
-            data_started = True
-            continue
-        
-        if data_started:
-            values = line.split()
-            if len(values) >= 6:
-                data['x'].append(float(values[0]))
-                data['r'].append(float(values[1]))
-                data['density'].append(float(values[2]))
-                data['velocity_x'].append(float(values[3]))
-                data['velocity_r'].append(float(values[4]))
-                data['pressure'].append(float(values[5]))
-                
-                # Calculate derived quantities
-                rho = float(values[2])
-                u = float(values[3])
-                v = float(values[4])
-                p = float(values[5])
-                
-                gamma = 1.2
-                c = np.sqrt(gamma * p / max(rho, 1e-10))
-                mach = np.sqrt(u**2 + v**2) / c
-                data['mach'].append(mach)
-                
-                # Temperature (assuming ideal gas)
-                R = 332.0  # Approximate for combustion products
-                T = p / (rho * R)
-                data['temperature'].append(T)
-    
-    return data
+    """Parse Loci-STREAM .dat output file (Tecplot ASCII, read in chunks)"""
+    return parse_tecplot_file(filepath)
 
 
 def parse_tecplot_file(filepath: Path) -> dict:
-    """Parse Tecplot .plt file"""
-    # Simplified Tecplot ASCII parser
-    data = {
-        'x': [], 'r': [],
-        'pressure': [], 'temperature': [],
-        'mach': [], 'velocity_x': [], 'velocity_r': [],
-        'density': []
-    }
-    
-    with open(filepath, 'r') as f:
-        content = f.read()
-    
-    # Find data section
-    lines = content.split('\n')
-    reading_data = False
-    
-    for line in lines:
-        line = line.strip()
-        if 'ZONE' in line:
-            reading_data = True
-            continue
-        
-        if reading_data and line:
-            try:
-                values = [float(x) for x in line.split()]
-                if len(values) >= 2:
-                    data['x'].append(values[0])
-                    data['r'].append(values[1])
-                    if len(values) >= 3:
-                        data['pressure'].append(values[2])
-                    if len(values) >= 4:
-                        data['temperature'].append(values[3])
-                    if len(values) >= 5:
-                        data['mach'].append(values[4])
-            except ValueError:
-                continue
-    
+    """Parse a Tecplot file, ASCII or binary (.plt); fields are numpy arrays"""
+    variables, zones, values = read_tecplot(filepath)
+    data = tecplot_fields(variables, values)
+    if ('x' not in data or 'r' not in data) and len(variables) >= len(DEFAULT_VARIABLES):
+        # Unknown names: Loci-STREAM column order
+        data = tecplot_fields(list(DEFAULT_VARIABLES) + variables[len(DEFAULT_VARIABLES):], values)
+    
+    # Structured size of a single ordered zone (I fastest, I along x)
+    if len(zones) == 1 and zones[0]['type'] == 'ORDERED' and zones[0]['dims'][1] > 1:
+        data = x_major(data, zones[0]['dims'][0], zones[0]['dims'][1])
     return data
 
 
+def x_major(fields: dict, nx: int, ny: int) -> dict:
+    """Fields stored row by row (index j * nx + i) in the result order (i * ny + j)"""
+    out = dict(fields, nx=nx, ny=ny)
+    for key, values in fields.items():
+        if isinstance(values, np.ndarray) and values.shape == (nx * ny,):
+            out[key] = values.reshape(ny, nx).T.ravel()
+    return out
+
+
+def read_mesh_info(input_dir: Path, case_name: str):
+    """(nx, ny) nodes of the generated mesh, or None"""
+    info_file = input_dir / f'{case_name}_mesh_info.json'
+    if not info_file.exists():
+        return None
+    with open(info_file) as f:
+        info = json.load(f)
+    return int(info['nx']), int(info['ny'])
+
+
+def structured(result: dict, mesh) -> dict:
+    """
+    Result with its true nx/ny: kept when the source gave them, otherwise
+    from the mesh nodes (nodal data) or cells (cell data), both row by row
+    """
+    if result.get('nx') and result.get('ny') or mesh is None:
+        return result
+    n_points = len(result.get('x', ()))
+    for nx, ny in (mesh, (mesh[0] - 1, mesh[1] - 1)):
+        if nx * ny == n_points:
+            return x_major(result, nx, ny)
+    return result
+
+
 def read_openfoam_output(case_dir: Path) -> dict:
-    """Read OpenFOAM results"""
-    # Find latest time directory
-    time_dirs = [d for d in case_dir.iterdir() if d.is_dir() and d.name.replace('.', '').isdigit()]
+    """Read OpenFOAM results (cell data, in cell order)"""
+    # Find latest time directory (0 only if it is the only one)
+    time_dirs = []
+    for d in case_dir.iterdir():
+        try:
+            if d.is_dir():
+                time_dirs.append((float(d.name), d))
+        except ValueError:
+            continue
     
     if not time_dirs:
         raise FileNotFoundError("No time directories found in OpenFOAM case")
     
-    latest_time = sorted(time_dirs, key=lambda x: float(x.name))[-1]
+    latest_time = max(time_dirs, key=lambda t: t[0] if t[0] > 0 else -1)[1]
     print(f"Reading OpenFOAM results from: {latest_time}")
     
-    data = {
-        'x': [], 'r': [],
-        'pressure': [], 'temperature': [],
-        'mach': [], 'velocity_x': [], 'velocity_r': [],
-        'density': []
-    }
+    data = {}
+    
+    # Cell centres: postProcess -func writeCellCentres, or a mesh export
+    for centres_file in (latest_time / 'C', case_dir / 'constant' / 'polyMesh' / 'cellCentres'):
+        if centres_file.exists():
+            centres = parse_openfoam_vector_field(centres_file)
+            data['x'] = centres[:, 0]
+            data['r'] = np.hypot(centres[:, 1], centres[:, 2])
+            break
+    n_cells = len(data['x']) if 'x' in data else None
     
-    # Read pressure
     p_file = latest_time / 'p'
     if p_file.exists():
-        data['pressure'] = parse_openfoam_field(p_file)
+        data['pressure'] = parse_openfoam_field(p_file, n_cells)
     
-    # Read velocity
     U_file = latest_time / 'U'
     if U_file.exists():
-        U = parse_openfoam_vector_field(U_file)
-        data['velocity_x'] = [u[0] for u in U]
-        data['velocity_r'] = [u[1] for u in U]
+        U = parse_openfoam_vector_field(U_file, n_cells)
+        data['velocity_x'] = U[:, 0]
+        data['velocity_r'] = U[:, 1]
     
-    # Read temperature
     T_file = latest_time / 'T'
     if T_file.exists():
-        data['temperature'] = parse_openfoam_field(T_file)
-    
-    # Read cell centers for coordinates
-    mesh_file = case_dir / 'constant' / 'polyMesh' / 'cellCentres'
-    if mesh_file.exists():
-        centers = parse_openfoam_vector_field(mesh_file)
-        data['x'] = [c[0] for c in centers]
-        data['r'] = [c[1] for c in centers]
+        data['temperature'] = parse_openfoam_field(T_file, n_cells)
     
-    return data
+    # Density and Mach from the case gas properties
+    return derived_fields(data, *openfoam_gas(case_dir))
 
 
-def parse_openfoam_field(filepath: Path) -> list:
-    """Parse OpenFOAM scalar field file"""
-    with open(filepath, 'r') as f:
-        content = f.read()
-    
-    # Find the data between ( and )
-    start = content.find('(')
-    end = content.rfind(')')
-    
-    if start == -1 or end == -1:
-        return []
-    
-    data_str = content[start+1:end]
-    values = [float(x) for x in data_str.split() if x.replace('.', '').replace('-', '').replace('e', '').isdigit()]
-    
-    return values
+def openfoam_gas(case_dir: Path) -> tuple:
+    """(gamma, R) of the case from constant/thermophysicalProperties (molWeight, Cp)"""
+    thermo_file = case_dir / 'constant' / 'thermophysicalProperties'
+    if not thermo_file.exists():
+        return GAMMA, R_GAS
+    content = thermo_file.read_text()
+    mol_weight = re.search(r'molWeight\s+([\d.eE+-]+)\s*;', content)
+    cp = re.search(r'Cp\s+([\d.eE+-]+)\s*;', content)
+    if not mol_weight or not cp:
+        return GAMMA, R_GAS
+    r_gas = R_UNIVERSAL / float(mol_weight.group(1))
+    return float(cp.group(1)) / (float(cp.group(1)) - r_gas), r_gas
 
 
-def parse_openfoam_vector_field(filepath: Path) -> list:
-    """Parse OpenFOAM vector field file"""
-    with open(filepath, 'r') as f:
+def _internal_field(filepath: Path, components: int, n_cells: int = None) -> np.ndarray:
+    """internalField of an ASCII OpenFOAM field file, (n,) or (n, components)"""
+    with open(filepath, 'rb') as f:
         content = f.read()
     
-    vectors = []
-    # Find vector entries (x y z)
-    import re
-    pattern = r'\(([^)]+)\)'
-    matches = re.findall(pattern, content)
-    
-    for match in matches:
-        try:
-            components = [float(x) for x in match.split()]
-            if len(components) == 3:
-                vectors.append(components)
-        except ValueError:
-            continue
-    
-    return vectors
+    match = re.search(rb'internalField\s+(nonuniform\s+List<\w+>\s*(\d+)\s*\(|uniform\s+)', content)
+    if match is None:
+        raise ValueError(f"{filepath}: no internalField")
+    start = match.end()
+    if match.group(2) is None:
+        # uniform value, one per cell
+        end = content.index(b';', start)
+        value = np.fromstring(content[start:end].translate(None, b'()'), sep=' ')
+        n = n_cells or 1
+        return np.full(n, value[0]) if components == 1 else np.tile(value, (n, 1))
+    
+    n = int(match.group(2))
+    # The list ends at the first ')' (scalars) or at the ')' closing the last vector
+    closing = re.compile(rb'\)' if components == 1 else rb'\)\s*\)').search(content, start)
+    end = closing.start() + (0 if components == 1 else 1)
+    values = np.fromstring(content[start:end].translate(None, b'()'), sep=' ')
+    if len(values) != n * components:
+        raise ValueError(f"{filepath}: expected {n * components} values, found {len(values)}")
+    return values if components == 1 else values.reshape(n, components)
+
+
+def parse_openfoam_field(filepath: Path, n_cells: int = None) -> np.ndarray:
+    """Parse OpenFOAM scalar field file"""
+    return _internal_field(filepath, 1, n_cells)
+
+
+def parse_openfoam_vector_field(filepath: Path, n_cells: int = None) -> np.ndarray:
+    """Parse OpenFOAM vector field file, (n, 3)"""
+    return _internal_field(filepath, 3, n_cells)
 
 
 def read_python_solver_output(output_dir: Path) -> dict:
@@ -229,13 +218,16 @@ def read_python_solver_output(output_dir: Path) -> dict:
 
 
 def main():
-    if len(sys.argv) < 4:
-        print("Usage: postprocess.py <input_dir> <output_dir> <case_name>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(args) < 3:
+        print("Usage: postprocess.py <input_dir> <output_dir> <case_name> [--json]")
+        print("  --json: also write cfd_result.json (same content)")
         sys.exit(1)
     
-    input_dir = Path(sys.argv[1])
-    output_dir = Path(sys.argv[2])
-    case_name = sys.argv[3]
+    input_dir = Path(args[0])
+    output_dir = Path(args[1])
+    case_name = args[2]
+    write_json = '--json' in sys.argv[1:]
     
     print(f"Post-processing CFD results...")
     print(f"  Input: {input_dir}")
@@ -273,39 +265,30 @@ def main():
         print("ERROR: No CFD results found!")
         sys.exit(1)
     
-    # Validate and fill missing fields
-    required_fields = ['x', 'r', 'pressure', 'temperature', 'mach', 
-                       'velocity_x', 'velocity_r', 'density']
-    
-    n_points = len(result.get('x', []))
-    
-    for field in required_fields:
-        if field not in result or len(result[field]) != n_points:
-            print(f"  Warning: Missing or incomplete field '{field}', filling with zeros")
-            result[field] = [0.0] * n_points
+    # Shapes checked before anything is written; missing fields zero-filled
+    try:
+        result = validate_result(structured(result, read_mesh_info(input_dir, case_name)))
+    except ValueError as e:
+        print(f"ERROR: Invalid result: {e}")
+        sys.exit(1)
     
     # Add metadata if missing
-    if 'nx' not in result:
-        result['nx'] = int(np.sqrt(n_points))
-    if 'ny' not in result:
-        result['ny'] = n_points // result['nx']
-    if 'converged' not in result:
-        result['converged'] = True
-    if 'iterations' not in result:
-        result['iterations'] = 0
-    if 'residual_history' not in result:
-        result['residual_history'] = []
+    result.setdefault('converged', True)
+    result.setdefault('iterations', 0)
+    result.setdefault('residual_history', [])
     
     # Save final result
     output_dir.mkdir(parents=True, exist_ok=True)
-    output_file = output_dir / 'cfd_result.json'
-    
-    with open(output_file, 'w') as f:
-        json.dump(result, f)
-    
+    output_file = output_dir / COLUMNAR_FILE
+    write_columnar(result, output_file)
     print(f"  Saved: {output_file}")
-    print(f"  Points: {n_points}")
-    print(f"  Mach range: {min(result['mach']):.2f} - {max(result['mach']):.2f}")
+    if write_json:
+        from fast_solver import encode_json
+        (output_dir / 'cfd_result.json').write_bytes(encode_json(result))
+        print(f"  Saved: {output_dir / 'cfd_result.json'}")
+    
+    print(f"  Points: {result['nx']} x {result['ny']}")
+    print(f"  Mach range: {result['mach'].min():.2f} - {result['mach'].max():.2f}")
     print("Post-processing complete!")
 
 
@@ -15,6 +15,8 @@ from dataclasses import dataclass
 from typing import Tuple, Callable
 import time
 
+from generate_mesh import stretched_distribution
+
 
 @dataclass
 class FlowState:
@@ -64,25 +66,28 @@ class EulerSolver2D:
         # CFL number
         self.cfl = 0.4
         
-    def setup_grid(self, x_wall: np.ndarray, r_wall: np.ndarray):
-        """Setup computational grid"""
+    def setup_grid(self, x_wall: np.ndarray, r_wall: np.ndarray, eta: np.ndarray = None):
+        """
+        Setup computational grid
+        eta: ny + 1 radial cell faces normalized to [0, 1] (uniform by default)
+        """
         self.nx = len(x_wall)
         self.dx = x_wall[1] - x_wall[0] if len(x_wall) > 1 else 0.001
+        if eta is None:
+            eta = np.linspace(0.0, 1.0, self.ny + 1)
         
-        # Create 2D grid
+        # Create 2D grid, cell centres between the radial faces
         self.x = np.zeros((self.ny, self.nx))
         self.r = np.zeros((self.ny, self.nx))
         
         for i in range(self.nx):
             self.x[:, i] = x_wall[i]
-            # Radial distribution (linear for now)
             for j in range(self.ny):
-                eta = (j + 0.5) / self.ny
-                self.r[j, i] = r_wall[i] * eta
+                self.r[j, i] = r_wall[i] * 0.5 * (eta[j] + eta[j + 1])
         
         self.dr = np.zeros((self.ny, self.nx))
         for i in range(self.nx):
-            self.dr[:, i] = r_wall[i] / self.ny
+            self.dr[:, i] = r_wall[i] * np.diff(eta)
             
         # Initialize solution arrays
         self.U = np.zeros((4, self.ny, self.nx))
@@ -369,6 +374,7 @@ class EulerSolver2D:
         molar_mass = params.get('molar_mass', 0.025)
         nx = params.get('nx', 200)
         ny = params.get('ny', 60)
+        stretch_factor = params.get('stretch_factor', 1.0)
         max_iter = params.get('max_iter', 10000)
         tolerance = params.get('tolerance', 1e-6)
         
@@ -401,8 +407,8 @@ class EulerSolver2D:
             else:
                 r_wall[i] = r_exit + (xi - exit_x) * 0.3
         
-        # Setup grid
-        self.setup_grid(x_wall, r_wall)
+        # Setup grid, radial cells stretched as in generate_mesh
+        self.setup_grid(x_wall, r_wall, stretched_distribution(ny + 1, stretch_factor))
         
         # Initial conditions (chamber conditions everywhere)
         rho0 = p_chamber / (R_gas * t_chamber)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Streaming Tecplot readers (Loci-STREAM solution files)
+- ASCII (.dat, or .plt written as text): ZONE headers are located line by
+  line, numeric blocks are parsed CHUNK_BYTES at a time with np.fromstring,
+  so memory stays at the result plus about two chunks
+- binary .plt (#!TDV112): read straight into arrays with np.fromfile
+
+Both yield one (zone header, (n_vars, n_points) array) per zone; only
+nodal variables are supported. tecplot_fields maps the variables onto
+the result fields and derives Mach / temperature / density when missing.
+"""
+
+import re
+import warnings
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Bytes of text parsed at a time
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Gas constants used for derived fields (combustion products)
+GAMMA = 1.2
+R_GAS = 332.0
+
+# Result field -> Tecplot variable names (case-insensitive)
+ALIASES = {
+    'x': ('x', 'coordinatex'),
+    'r': ('r', 'y', 'coordinatey', 'radius'),
+    'density': ('rho', 'density'),
+    'velocity_x': ('u', 'ux', 'vx', 'velocity_x', 'x-velocity', 'velocityx', 'u_x'),
+    'velocity_r': ('v', 'uy', 'vy', 'velocity_r', 'velocity_y', 'y-velocity', 'velocityy', 'u_y'),
+    'pressure': ('p', 'pressure', 'pg'),
+    'temperature': ('t', 'temperature', 'temp'),
+    'mach': ('m', 'mach', 'mach_number', 'machnumber'),
+}
+# Column order of Loci-STREAM .dat files written without VARIABLES
+DEFAULT_VARIABLES = ('x', 'r', 'rho', 'u', 'v', 'p')
+
+# Finite-element zone types -> nodes per element
+FE_NODES = {'FELINESEG': 2, 'FETRIANGLE': 3, 'FEQUADRILATERAL': 4, 'FETETRAHEDRON': 4, 'FEBRICK': 8}
+# Binary zone type codes
+ZONE_TYPES = ('ORDERED', 'FELINESEG', 'FETRIANGLE', 'FEQUADRILATERAL', 'FETETRAHEDRON', 'FEBRICK',
+              'FEPOLYGON', 'FEPOLYHEDRON')
+# Binary variable formats: 1=Float, 2=Double, 3=LongInt, 4=ShortInt, 5=Byte
+BINARY_FORMATS = {1: 'f4', 2: 'f8', 3: 'i4', 4: 'i2', 5: 'u1'}
+
+NUMERIC_START = b'+-.0123456789'
+
+
+def is_binary(filepath: Path) -> bool:
+    with open(filepath, 'rb') as f:
+        return f.read(5) == b'#!TDV'
+
+
+def iter_zones(filepath: Path) -> Iterator[Tuple[Dict, np.ndarray]]:
+    """(zone header, (n_vars, n_points) float64 array) for each zone of an ASCII or binary file"""
+    if is_binary(filepath):
+        return _iter_binary(filepath)
+    return _iter_ascii(filepath)
+
+
+def read_tecplot(filepath: Path) -> Tuple[List[str], List[Dict], np.ndarray]:
+    """Variables, zone headers and the point data of all zones, (n_vars, n_points)"""
+    zones, blocks = [], []
+    for zone, data in iter_zones(filepath):
+        zones.append(zone)
+        blocks.append(data)
+    if not zones:
+        raise ValueError(f"{filepath}: no data")
+    variables = zones[0]['variables']
+    return variables, zones, blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
+
+
+# ----------------------------------------------------------------------
+# ASCII
+# ----------------------------------------------------------------------
+class _TextStream:
+    """Lines and numbers of a text file, read CHUNK_BYTES at a time"""
+
+    def __init__(self, f, chunk_bytes: int = CHUNK_BYTES):
+        self.f = f
+        self.chunk_bytes = chunk_bytes
+        self.buf = b''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.chunk_bytes)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def readline(self) -> Optional[bytes]:
+        while self.buf.find(b'\n', self.pos) < 0 and not self.eof:
+            self._fill()
+        if self.pos >= len(self.buf):
+            return None
+        end = self.buf.find(b'\n', self.pos)
+        end = len(self.buf) if end < 0 else end + 1
+        line = self.buf[self.pos:end]
+        self.pos = end
+        return line
+
+    def unread(self, line: bytes):
+        self.pos -= len(line)
+
+    def numbers(self, count: Optional[int] = None) -> np.ndarray:
+        """The next count numbers (all numbers up to the next word or the end when None)"""
+        # Known size: filled in place, no copy of the chunks at the end
+        out = np.empty(count) if count is not None else None
+        parts, got = [], 0
+        while count is None or got < count:
+            if len(self.buf) - self.pos < self.chunk_bytes and not self.eof:
+                self._fill()
+            # Whole tokens only: stop at the last whitespace unless at the end of the file
+            end = len(self.buf) if self.eof else max(self.buf.rfind(b'\n', self.pos), self.buf.rfind(b' ', self.pos)) + 1
+            if end <= self.pos:
+                if self.eof:
+                    break
+                self.chunk_bytes *= 2
+                continue
+            text = self.buf[self.pos:end]
+            cut, word = len(text), False
+            values = _parse(text)
+            if values is None:
+                # Numbers end at the next header: the first token starting with a letter or a quote
+                cut, word = _word_start(text), True
+                values = _parse(text[:cut])
+                if values is None:
+                    raise ValueError(f"bad numeric data near {text[:40]!r}")
+            if count is not None and len(values) > count - got:
+                # Block boundary inside this chunk
+                cut = _token_starts(text)[count - got]
+                values = values[:count - got]
+            if out is not None:
+                out[got:got + len(values)] = values
+            else:
+                parts.append(values)
+            got += len(values)
+            self.pos += cut
+            if word or (self.eof and self.pos >= len(self.buf)):
+                break
+        if count is not None and got != count:
+            raise ValueError(f"expected {count} values, found {got}")
+        if out is not None:
+            return out
+        return np.concatenate(parts) if len(parts) != 1 else (parts[0] if parts else np.empty(0))
+
+
+def _parse(text: bytes) -> Optional[np.ndarray]:
+    """All numbers of text, or None if it holds anything else"""
+    if not text.strip():
+        return np.empty(0)
+    with warnings.catch_warnings():
+        # Trailing garbage is only a DeprecationWarning for np.fromstring
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            return np.fromstring(text, sep=' ')
+        except (DeprecationWarning, ValueError):
+            return None
+
+
+def _word_start(text: bytes) -> int:
+    """Offset of the first token of text starting with a letter or a quote"""
+    b = np.frombuffer(text, dtype=np.uint8)
+    lower = b | 0x20
+    word = ((lower >= ord('a')) & (lower <= ord('z'))) | (b == ord('"'))
+    word[1:] &= b[:-1] <= 32
+    found = np.flatnonzero(word)
+    return int(found[0]) if len(found) else len(text)
+
+
+def _token_starts(text: bytes) -> np.ndarray:
+    """Offsets of the whitespace-separated tokens of text"""
+    space = np.frombuffer(text, dtype=np.uint8) <= 32
+    starts = np.flatnonzero(space[:-1] & ~space[1:]) + 1
+    return starts if space[0] else np.concatenate(([0], starts))
+
+
+def _names(text: bytes) -> List[str]:
+    return [(q or w).decode(errors='replace') for q, w in re.findall(rb'"([^"]*)"|([^\s,"=]+)', text)]
+
+
+def _zone_params(text: bytes) -> Dict[str, str]:
+    params = {}
+    for key, value in re.findall(rb'(\w+)\s*=\s*("[^"]*"|\([^)]*\)|[^,\s]+)', text):
+        params[key.decode().upper()] = value.decode(errors='replace').strip('"')
+    return params
+
+
+def _ascii_zone(params: Dict[str, str], variables: List[str]) -> Dict:
+    """Zone header: type, packing, point and element counts"""
+    old_format = params.get('F', '').upper()  # Tecplot 7-9: F=POINT/BLOCK/FEPOINT/FEBLOCK
+    zone_type = params.get('ZONETYPE', '').upper()
+    if not zone_type and 'ET' in params:
+        zone_type = 'FE' + params['ET'].upper()
+    zone_type = zone_type or 'ORDERED'
+    packing = params.get('DATAPACKING', old_format.replace('FE', '') or 'POINT').upper()
+    if 'CELLCENTERED' in params.get('VARLOCATION', '').upper():
+        raise ValueError("cell-centered variables are not supported")
+
+    zone = {'title': params.get('T', ''), 'type': zone_type, 'packing': packing, 'variables': variables}
+    if zone_type == 'ORDERED':
+        dims = [int(params.get(k, 1)) for k in ('I', 'J', 'K')]
+        zone['dims'] = dims
+        zone['points'] = dims[0] * dims[1] * dims[2] if any(k in params for k in ('I', 'J', 'K')) else None
+    elif zone_type in FE_NODES:
+        zone['points'] = int(params.get('N', params.get('NODES', 0)))
+        zone['elements'] = int(params.get('E', params.get('ELEMENTS', 0)))
+    else:
+        raise ValueError(f"unsupported zone type {zone_type}")
+    return zone
+
+
+def _iter_ascii(filepath: Path) -> Iterator[Tuple[Dict, np.ndarray]]:
+    variables = None
+    with open(filepath, 'rb') as f:
+        stream = _TextStream(f)
+        while True:
+            line = stream.readline()
+            if line is None:
+                return
+            text = line.strip()
+            upper = text.upper()
+            if not text or text.startswith(b'#') or upper.startswith(b'TITLE') or upper.startswith(b'DATASETAUXDATA'):
+                continue
+
+            if upper.startswith(b'VARIABLES'):
+                names = text.split(b'=', 1)[1] if b'=' in text else b''
+                # Names may continue on the following lines
+                while True:
+                    nxt = stream.readline()
+                    if nxt is None:
+                        break
+                    if not nxt.strip().startswith(b'"'):
+                        stream.unread(nxt)
+                        break
+                    names += b' ' + nxt
+                variables = _names(names)
+                continue
+
+            if upper.startswith(b'ZONE') or text[:1] in NUMERIC_START:
+                header = b''
+                if upper.startswith(b'ZONE'):
+                    header = text[4:]
+                    # Zone header lines up to the first line of numbers
+                    while True:
+                        nxt = stream.readline()
+                        if nxt is None:
+                            break
+                        if nxt.strip()[:1] in NUMERIC_START and nxt.strip():
+                            stream.unread(nxt)
+                            break
+                        header += b' ' + nxt
+                else:
+                    stream.unread(line)
+
+                if variables is None:
+                    first = stream.readline()
+                    stream.unread(first)
+                    n = len(first.split())
+                    variables = list(DEFAULT_VARIABLES[:n]) + [f'V{k + 1}' for k in range(len(DEFAULT_VARIABLES), n)]
+                zone = _ascii_zone(_zone_params(header), variables)
+                n_vars = len(variables)
+
+                if zone['points'] is None:
+                    # No size given: everything up to the next header
+                    values = stream.numbers()
+                    zone['points'] = len(values) // n_vars
+                    values = values[:zone['points'] * n_vars]
+                else:
+                    values = stream.numbers(zone['points'] * n_vars)
+                if zone['packing'] == 'POINT':
+                    data = values.reshape(zone['points'], n_vars).T
+                else:
+                    data = values.reshape(n_vars, zone['points'])
+
+                # Connectivity of FE zones is not needed: skipped in slices
+                remaining = zone.get('elements', 0) * FE_NODES.get(zone['type'], 0)
+                while remaining:
+                    step = min(remaining, 1 << 20)
+                    stream.numbers(step)
+                    remaining -= step
+                yield zone, np.ascontiguousarray(data)
+
+
+# ----------------------------------------------------------------------
+# Binary (Tecplot 360 data format, #!TDV112)
+# ----------------------------------------------------------------------
+def _iter_binary(filepath: Path) -> Iterator[Tuple[Dict, np.ndarray]]:
+    with open(filepath, 'rb') as f:
+        magic = f.read(8)
+        if magic != b'#!TDV112':
+            raise ValueError(f"unsupported Tecplot binary version {magic[2:].decode(errors='replace')}")
+        endian = '<' if np.frombuffer(f.read(4), '<i4')[0] == 1 else '>'
+        i4, f4, f8 = np.dtype(endian + 'i4'), np.dtype(endian + 'f4'), np.dtype(endian + 'f8')
+
+        def ints(n=1):
+            values = np.fromfile(f, i4, n)
+            if len(values) != n:
+                raise ValueError(f"{filepath}: truncated header")
+            return values if n > 1 else int(values[0])
+
+        def string():
+            chars = []
+            while True:
+                c = ints()
+                if c == 0:
+                    return ''.join(chars)
+                chars.append(chr(c))
+
+        ints()  # file type (full, grid, solution)
+        string()  # title
+        variables = [string() for _ in range(ints())]
+        n_vars = len(variables)
+
+        # Header section: zone records up to the end-of-header marker
+        zones = []
+        while True:
+            marker = float(np.fromfile(f, f4, 1)[0])
+            if marker == 357.0:
+                break
+            if marker == 299.0:
+                zones.append(_binary_zone_header(f, ints, string, f8, n_vars, variables))
+            elif marker == 799.0:  # dataset auxiliary data
+                string(); ints(); string()
+            elif marker == 899.0:  # variable auxiliary data
+                ints(); string(); ints(); string()
+            else:
+                raise ValueError(f"unsupported Tecplot header record (marker {marker})")
+
+        # Data section
+        previous = []
+        for zone in zones:
+            if float(np.fromfile(f, f4, 1)[0]) != 299.0:
+                raise ValueError(f"{filepath}: bad zone marker in data section")
+            formats = ints(n_vars) if n_vars > 1 else np.array([ints()])
+            passive = ints(n_vars) if ints() else np.zeros(n_vars, dtype=int)
+            shared = ints(n_vars) if ints() else np.full(n_vars, -1)
+            shared_connectivity = ints()
+            if n_vars == 1:
+                passive, shared = np.atleast_1d(passive), np.atleast_1d(shared)
+            stored = [k for k in range(n_vars) if not passive[k] and shared[k] < 0]
+            np.fromfile(f, f8, 2 * len(stored))  # min/max pairs
+
+            n = zone['points']
+            data = np.zeros((n_vars, n), dtype=np.float64)
+            for k in range(n_vars):
+                if passive[k]:
+                    continue
+                if shared[k] >= 0:
+                    data[k] = previous[shared[k]][k]
+                    continue
+                fmt = BINARY_FORMATS.get(int(formats[k]))
+                if fmt is None:
+                    raise ValueError(f"unsupported variable format {formats[k]}")
+                values = np.fromfile(f, np.dtype(endian + fmt), n)
+                if len(values) != n:
+                    raise ValueError(f"{filepath}: truncated zone data")
+                data[k] = values
+
+            if zone['type'] in FE_NODES and shared_connectivity < 0:
+                f.seek(4 * zone['elements'] * FE_NODES[zone['type']], 1)
+            previous.append(data)
+            yield zone, data
+
+
+def _binary_zone_header(f, ints, string, f8, n_vars: int, variables: List[str]) -> Dict:
+    title = string()
+    ints()  # parent zone
+    ints()  # strand id
+    np.fromfile(f, f8, 1)  # solution time
+    ints()  # not used (-1)
+    zone_type = ZONE_TYPES[ints()]
+    if zone_type not in ('ORDERED',) + tuple(FE_NODES):
+        raise ValueError(f"unsupported zone type {zone_type}")
+    if ints() and np.any(ints(n_vars)):
+        raise ValueError("cell-centered variables are not supported")
+    if ints():
+        raise ValueError("raw face neighbours are not supported")
+    if ints():
+        raise ValueError("user-defined face neighbours are not supported")
+    zone = {'title': title, 'type': zone_type, 'packing': 'BLOCK', 'variables': variables}
+    if zone_type == 'ORDERED':
+        dims = [int(v) for v in ints(3)]
+        zone['dims'] = dims
+        zone['points'] = dims[0] * dims[1] * dims[2]
+    else:
+        zone['points'] = ints()
+        zone['elements'] = ints()
+        ints(3)  # cell dimensions (unused)
+    while ints():  # auxiliary name/value pairs
+        string(); ints(); string()
+    return zone
+
+
+# ----------------------------------------------------------------------
+# Result fields
+# ----------------------------------------------------------------------
+def tecplot_fields(variables: List[str], data: np.ndarray, gamma: float = GAMMA,
+                   r_gas: float = R_GAS) -> Dict[str, np.ndarray]:
+    """
+    Result fields (x, r, density, velocity_x, velocity_r, pressure,
+    temperature, mach) from the Tecplot variables; missing ones are derived
+    (ideal gas, gamma and r_gas) or left out when they cannot be
+    """
+    index = {name.strip().lower(): k for k, name in enumerate(variables)}
+    fields = {}
+    for field, names in ALIASES.items():
+        for name in names:
+            if name in index:
+                fields[field] = data[index[name]]
+                break
+    return derived_fields(fields, gamma, r_gas)
+
+
+def derived_fields(fields: Dict[str, np.ndarray], gamma: float = GAMMA,
+                   r_gas: float = R_GAS) -> Dict[str, np.ndarray]:
+    """Adds density, temperature and Mach to fields when they can be derived (ideal gas)"""
+    p = fields.get('pressure')
+    if p is not None:
+        if 'density' not in fields and 'temperature' in fields:
+            fields['density'] = p / (r_gas * np.maximum(fields['temperature'], 1e-10))
+        if 'temperature' not in fields and 'density' in fields:
+            fields['temperature'] = p / (np.maximum(fields['density'], 1e-10) * r_gas)
+        if 'mach' not in fields and 'density' in fields and 'velocity_x' in fields:
+            speed = np.hypot(fields['velocity_x'], fields.get('velocity_r', 0.0))
+            fields['mach'] = speed / np.sqrt(gamma * p / np.maximum(fields['density'], 1e-10))
+    return fields